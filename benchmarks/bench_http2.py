@@ -0,0 +1,218 @@
+"""
+HTTP/2 Multiplexing Benchmark
+
+Runs N concurrent streamGenerateContent calls through AntigravityClient
+against a local stub server and reports how many TCP connections the server
+accepted and the p50/p99 stream completion latency, for HTTP/1.1 and HTTP/2.
+
+The stub speaks cleartext HTTP/1.1 and HTTP/2 (prior knowledge, no TLS), so the
+HTTP/2 run uses a client subclass that disables HTTP/1.1 to skip ALPN.
+
+Requires the h2 package:  pip install -e .[http2]
+
+Usage:
+    python benchmarks/bench_http2.py
+    python benchmarks/bench_http2.py --streams 50 200 --events 5 --delay-ms 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import h2.config
+import h2.connection
+import h2.events
+import h2.settings
+
+from antigravity_auth.client import AntigravityClient, prepare_request
+
+
+H2_PREFACE = b"PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n"
+
+SSE_EVENT = b'data: {"response": {"candidates": [{"content": {"parts": [{"text": "chunk "}]}}]}}\r\n\r\n'
+
+
+class StubServer:
+    """Cleartext HTTP/1.1 + HTTP/2 server that streams a fixed SSE response."""
+
+    def __init__(self, events: int, delay_ms: int):
+        self.events = events
+        self.delay = delay_ms / 1000
+        self.connections = 0
+        self._server = None
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0, backlog=4096)
+        port = self._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            first = await reader.readexactly(len(H2_PREFACE))
+            if first == H2_PREFACE:
+                await self._serve_h2(first, reader, writer)
+            else:
+                await self._serve_h1(first, reader, writer)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _serve_h1(self, head: bytes, reader, writer) -> None:
+        buffer = head
+        while True:
+            while b"\r\n\r\n" not in buffer:
+                data = await reader.read(65536)
+                if not data:
+                    return
+                buffer += data
+            header_blob, buffer = buffer.split(b"\r\n\r\n", 1)
+            length = 0
+            for line in header_blob.split(b"\r\n")[1:]:
+                name, _, value = line.partition(b":")
+                if name.strip().lower() == b"content-length":
+                    length = int(value)
+            while len(buffer) < length:
+                buffer += await reader.read(65536)
+            buffer = buffer[length:]
+
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: text/event-stream\r\n"
+                b"Transfer-Encoding: chunked\r\n\r\n"
+            )
+            for _ in range(self.events):
+                await asyncio.sleep(self.delay)
+                writer.write(b"%x\r\n%s\r\n" % (len(SSE_EVENT), SSE_EVENT))
+                await writer.drain()
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+
+    async def _serve_h2(self, preface: bytes, reader, writer) -> None:
+        conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False))
+        conn.initiate_connection()
+        conn.update_settings({h2.settings.SettingCodes.MAX_CONCURRENT_STREAMS: 10000})
+        writer.write(conn.data_to_send())
+        lock = asyncio.Lock()
+        tasks = set()
+
+        async def respond(stream_id: int) -> None:
+            async with lock:
+                conn.send_headers(stream_id, [(":status", "200"), ("content-type", "text/event-stream")])
+                writer.write(conn.data_to_send())
+            for i in range(self.events):
+                await asyncio.sleep(self.delay)
+                async with lock:
+                    conn.send_data(stream_id, SSE_EVENT, end_stream=i == self.events - 1)
+                    writer.write(conn.data_to_send())
+            await writer.drain()
+
+        pending = preface
+        while True:
+            for event in conn.receive_data(pending):
+                if isinstance(event, h2.events.StreamEnded):
+                    task = asyncio.create_task(respond(event.stream_id))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                elif isinstance(event, h2.events.DataReceived):
+                    conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                elif isinstance(event, h2.events.ConnectionTerminated):
+                    return
+            async with lock:
+                writer.write(conn.data_to_send())
+            pending = await reader.read(65536)
+            if not pending:
+                return
+
+
+class PriorKnowledgeClient(AntigravityClient):
+    """AntigravityClient that speaks HTTP/2 over cleartext without ALPN."""
+
+    def _build_http_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        return httpx.AsyncClient(timeout=self.timeout, limits=limits, http1=False, http2=True)
+
+
+async def run_streams(client: AntigravityClient, endpoint: str, streams: int) -> List[float]:
+    """Run concurrent streams and return per-stream latencies in ms."""
+    request = prepare_request(
+        model="gemini-3-pro",
+        contents=[{"role": "user", "parts": [{"text": "bench"}]}],
+        access_token="bench",
+    )
+
+    async def one() -> float:
+        start = time.perf_counter()
+        async for event in client.stream_execute(request, fallback_endpoints=[endpoint]):
+            if "error" in event:
+                raise RuntimeError(event)
+        return (time.perf_counter() - start) * 1000
+
+    return await asyncio.gather(*(one() for _ in range(streams)))
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def bench(streams: int, mode: str, events: int, delay_ms: int) -> Dict[str, float]:
+    server = StubServer(events=events, delay_ms=delay_ms)
+    endpoint = await server.start()
+    if mode == "http2":
+        client = PriorKnowledgeClient(http2=True, http2_max_concurrent_streams=None)
+    else:
+        client = AntigravityClient()
+    try:
+        # Warm the pool so both modes start from an established connection
+        await run_streams(client, endpoint, 1)
+        server.connections = 0
+        latencies = await run_streams(client, endpoint, streams)
+    finally:
+        await client.aclose()
+        await server.stop()
+    return {
+        "connections": server.connections,
+        "p50": statistics.median(latencies),
+        "p99": percentile(latencies, 99),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--streams", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--events", type=int, default=5, help="SSE events per stream")
+    parser.add_argument("--delay-ms", type=int, default=20, help="Delay between SSE events")
+    args = parser.parse_args()
+
+    print(f"{'streams':>8} {'mode':>7} {'new conns':>10} {'p50 ms':>9} {'p99 ms':>9}")
+    for streams in args.streams:
+        for mode in ("http1", "http2"):
+            result = await bench(streams, mode, args.events, args.delay_ms)
+            print(
+                f"{streams:>8} {mode:>7} {result['connections']:>10} "
+                f"{result['p50']:>9.1f} {result['p99']:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+"""
+Account Selection Benchmark
+
+Measures the per-request cost of account selection and min-wait queries as the
+pool grows, using the heap/Fenwick availability index in AccountManager and
+the previous linear scan over every account.
+
+Each operation selects an account, rate-limits it and frees a random one, with
+about 95% of the pool rate-limited, so the search cannot stop early.
+
+Usage:
+    python benchmarks/bench_selection.py
+    python benchmarks/bench_selection.py --accounts 10 1000 --ops 5000
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from antigravity_auth.accounts import AccountManager, ManagedAccount
+from antigravity_auth.storage import AccountMetadata, AccountStorage
+
+
+FAMILY = "claude"
+STYLE = "antigravity"
+
+
+def build_manager(accounts: int, limited_fraction: float) -> AccountManager:
+    """Build a pool where most accounts are rate-limited for a long time."""
+    storage = AccountStorage(
+        accounts=[AccountMetadata(refresh_token=f"refresh-{i}") for i in range(accounts)]
+    )
+    manager = AccountManager(storage=storage)
+    rng = random.Random(0)
+    for account in manager.get_accounts():
+        if rng.random() < limited_fraction:
+            manager.mark_rate_limited(account, 3_600_000, FAMILY, STYLE)
+    return manager
+
+
+def legacy_next(manager: AccountManager) -> Optional[ManagedAccount]:
+    """The previous get_next_for_family loop."""
+    accounts = manager.get_accounts()
+    current_index = manager._active_index_by_family.get(FAMILY, 0)
+    for offset in range(len(accounts)):
+        index = (current_index + offset) % len(accounts)
+        account = accounts[index]
+        if not manager.is_rate_limited(account, FAMILY):
+            manager._active_index_by_family[FAMILY] = index
+            return account
+    return None
+
+
+def legacy_min_wait(manager: AccountManager) -> int:
+    """The previous get_min_wait_time_for_family loop."""
+    now = int(time.time() * 1000)
+    min_wait = float("inf")
+    for account in manager.get_accounts():
+        if not manager.is_rate_limited(account, FAMILY):
+            return 0
+        for key, reset_time in account.rate_limit_reset_times.items():
+            if key.startswith("claude"):
+                min_wait = min(min_wait, max(0, reset_time - now))
+    return int(min_wait) if min_wait != float("inf") else 60000
+
+
+def time_selection(accounts: int, ops: int, legacy: bool) -> float:
+    """Microseconds per rate-limit + select operation."""
+    manager = build_manager(accounts, limited_fraction=0.95)
+    pool = manager.get_accounts()
+    select = (lambda: legacy_next(manager)) if legacy else (
+        lambda: manager.get_current_or_next_for_family(FAMILY, header_style=STYLE)
+    )
+    rng = random.Random(1)
+    released = [rng.choice(pool) for _ in range(ops)]
+    manager.get_next_for_family(FAMILY, header_style=STYLE)  # Build the index outside the timed loop
+
+    start = time.perf_counter()
+    for i in range(ops):
+        # Free a random account, then select one and rate-limit it, keeping ~5% available
+        manager.mark_rate_limited(released[i], 0, FAMILY, STYLE)
+        account = select()
+        manager.mark_rate_limited(account, 3_600_000, FAMILY, STYLE)
+    return (time.perf_counter() - start) / ops * 1e6
+
+
+def time_min_wait(accounts: int, ops: int, legacy: bool) -> float:
+    """Microseconds per min-wait query with every account rate-limited."""
+    manager = build_manager(accounts, limited_fraction=1.0)
+    query = (lambda: legacy_min_wait(manager)) if legacy else (
+        lambda: manager.get_min_wait_time_for_family(FAMILY)
+    )
+    query()  # Build the index outside the timed loop
+
+    start = time.perf_counter()
+    for _ in range(ops):
+        query()
+    return (time.perf_counter() - start) / ops * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--ops", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'accounts':>8} {'select us':>10} {'legacy us':>10} {'min-wait us':>12} {'legacy us':>10}")
+    for accounts in args.accounts:
+        select_new = time_selection(accounts, args.ops, legacy=False)
+        select_old = time_selection(accounts, args.ops, legacy=True)
+        wait_new = time_min_wait(accounts, args.ops, legacy=False)
+        wait_old = time_min_wait(accounts, args.ops, legacy=True)
+        print(f"{accounts:>8} {select_new:>10.1f} {select_old:>10.1f} {wait_new:>12.1f} {wait_old:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
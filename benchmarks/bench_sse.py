@@ -0,0 +1,107 @@
+"""
+SSE Decoder Micro-Benchmark
+
+Feeds multi-megabyte synthetic SSE streams (many small text events plus large
+base64 inlineData parts) through the incremental SSEDecoder and through the
+previous string-buffer line splitter, in several chunk sizes.
+
+Usage:
+    python benchmarks/bench_sse.py
+    python benchmarks/bench_sse.py --size-mb 8 --chunks 64 4096 65536
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from antigravity_auth.sse import SSEDecoder, parse_sse_json
+
+
+def build_stream(size_mb: float, image_kb: int) -> bytes:
+    """Build an SSE body of roughly size_mb megabytes."""
+    text_event = {"response": {"candidates": [{"content": {"parts": [{"text": "token " * 8}]}}]}}
+    image = base64.b64encode(os.urandom(image_kb * 1024 * 3 // 4)).decode("ascii")
+    image_event = {
+        "response": {"candidates": [{"content": {"parts": [{"inlineData": {"mimeType": "image/png", "data": image}}]}}]}
+    }
+    text_line = b"data: " + json.dumps(text_event).encode() + b"\r\n\r\n"
+    image_line = b"data: " + json.dumps(image_event).encode() + b"\r\n\r\n"
+
+    target = int(size_mb * 1024 * 1024)
+    parts: List[bytes] = []
+    total = 0
+    while total < target:
+        for _ in range(200):
+            parts.append(text_line)
+            total += len(text_line)
+        parts.append(image_line)
+        total += len(image_line)
+    return b"".join(parts)
+
+
+def decode_incremental(chunks: List[bytes]) -> int:
+    """Count JSON events using SSEDecoder."""
+    decoder = SSEDecoder()
+    count = 0
+    for chunk in chunks:
+        for event in decoder.feed(chunk):
+            count += len(parse_sse_json(event.data))
+    for event in decoder.flush():
+        count += len(parse_sse_json(event.data))
+    return count
+
+
+def decode_legacy(chunks: List[bytes]) -> int:
+    """Count JSON events using the previous buffer.split() loop."""
+    count = 0
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk.decode("utf-8")
+        while "\n" in buffer:
+            line, buffer = buffer.split("\n", 1)
+            line = line.strip()
+            if line.startswith("data:"):
+                data = line[5:].strip()
+                if data:
+                    json.loads(data)
+                    count += 1
+    return count
+
+
+def time_decoder(decode: Callable[[List[bytes]], int], chunks: List[bytes], budget_s: float) -> str:
+    """Time a decoder, giving up after budget_s (legacy can be quadratic)."""
+    start = time.perf_counter()
+    count = decode(chunks)
+    elapsed = time.perf_counter() - start
+    if elapsed > budget_s:
+        return f"{elapsed:8.2f}s*"
+    return f"{elapsed * 1000:8.1f}ms ({count} ev)"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, nargs="+", default=[2, 8])
+    parser.add_argument("--image-kb", type=int, default=512, help="Size of each base64 image part")
+    parser.add_argument("--chunks", type=int, nargs="+", default=[64, 1024, 65536, 1048576])
+    args = parser.parse_args()
+
+    print(f"{'size':>6} {'chunk':>7} {'incremental':>22} {'legacy split':>22}")
+    for size_mb in args.size_mb:
+        stream = build_stream(size_mb, args.image_kb)
+        for chunk_size in args.chunks:
+            chunks = [stream[i:i + chunk_size] for i in range(0, len(stream), chunk_size)]
+            new = time_decoder(decode_incremental, chunks, budget_s=60)
+            old = time_decoder(decode_legacy, chunks, budget_s=60)
+            print(f"{size_mb:>5}M {chunk_size:>7} {new:>22} {old:>22}")
+
+
+if __name__ == "__main__":
+    main()
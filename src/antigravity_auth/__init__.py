@@ -12,6 +12,8 @@ from .service import (
     NoAccountsError,
     AllAccountsRateLimitedError,
     TokenRefreshFailedError,
+    DeadlineExceededError,
+    InvalidRequestError,
 )
 from .oauth import (
     build_authorization_url,
@@ -42,6 +44,8 @@ __all__ = [
     "NoAccountsError", 
     "AllAccountsRateLimitedError",
     "TokenRefreshFailedError",
+    "DeadlineExceededError",
+    "InvalidRequestError",
     
     # OAuth
     "build_authorization_url",
@@ -5,42 +5,61 @@ This module manages a pool of Antigravity accounts, handling selection,
 rotation, rate limit tracking, and quota management.
 """
 
+import asyncio
+import os
 import time
 from dataclasses import dataclass, field
-from typing import Dict, List, Literal, Optional
+from pathlib import Path
+from typing import Any, Dict, List, Literal, Optional, Tuple, Union
 
 from .constants import (
     CAPACITY_BACKOFF_TIERS_MS,
+    DEFAULT_SELECTION_STRATEGY,
     FAILURE_COOLDOWN_MS,
     FAILURE_STATE_RESET_MS,
     HEADER_STYLE_ANTIGRAVITY,
     HEADER_STYLE_GEMINI_CLI,
     MAX_CONSECUTIVE_FAILURES,
+    MIN_SELECTION_WEIGHT,
     MODEL_FAMILY_CLAUDE,
     MODEL_FAMILY_GEMINI,
     RATE_LIMIT_DEDUP_WINDOW_MS,
+    RATE_LIMIT_EWMA_ALPHA,
     RATE_LIMIT_STATE_RESET_MS,
+    SHARED_STATE_REAP_INTERVAL_MS,
     SHORT_RETRY_THRESHOLD_MS,
 )
+from .rate_limit_index import AvailabilityIndex
+from .shared_state import COOLDOWN_KEY, INFLIGHT_KEY, SharedStateTable, owned_key
 from .storage import (
+    STORAGE_BACKEND_SQLITE,
     AccountMetadata,
     AccountStorage,
+    SQLiteAccountStore,
     RateLimitResetTimes,
+    aload_accounts,
+    asave_accounts,
+    aupdate_refresh_token,
+    get_storage_backend,
+    get_storage_path,
     load_accounts,
-    save_accounts,
+    make_account_id,
 )
 from .token import AuthDetails, parse_refresh_parts, format_refresh_parts, RefreshParts
 
 
 ModelFamily = Literal["gemini", "claude"]
 HeaderStyle = Literal["antigravity", "gemini-cli"]
-SelectionStrategy = Literal["sticky", "round-robin", "hybrid"]
+SelectionStrategy = Literal["sticky", "round-robin", "least-loaded", "weighted"]
+
+SELECTION_STRATEGIES = ("sticky", "round-robin", "least-loaded", "weighted")
 
 
 @dataclass
 class ManagedAccount:
     """A managed account with runtime state."""
-    index: int
+    index: int  # Position in the pool; changes when accounts are removed
+    id: str  # Stable identity; use this to key per-account state
     email: Optional[str]
     refresh_token: str
     project_id: Optional[str]
@@ -51,19 +70,16 @@ class ManagedAccount:
     cooling_down_until: Optional[int] = None
     cooldown_reason: Optional[str] = None
     consecutive_failures: int = 0
+    active_requests: int = 0  # Outstanding leases from acquire_for_family()
+    rate_limit_ewma: Dict[str, float] = field(default_factory=dict)  # Observed 429 rate by family
     
     @classmethod
     def from_metadata(cls, index: int, metadata: AccountMetadata) -> "ManagedAccount":
-        rate_limits = {}
-        if metadata.rate_limit_reset_times.claude:
-            rate_limits["claude"] = metadata.rate_limit_reset_times.claude
-        if metadata.rate_limit_reset_times.gemini_antigravity:
-            rate_limits["gemini-antigravity"] = metadata.rate_limit_reset_times.gemini_antigravity
-        if metadata.rate_limit_reset_times.gemini_cli:
-            rate_limits["gemini-cli"] = metadata.rate_limit_reset_times.gemini_cli
+        rate_limits = dict(metadata.rate_limit_reset_times.prune().times)
         
         return cls(
             index=index,
+            id=metadata.id,
             email=metadata.email,
             refresh_token=metadata.refresh_token,
             project_id=metadata.project_id,
@@ -76,13 +92,11 @@ class ManagedAccount:
         )
     
     def to_metadata(self) -> AccountMetadata:
-        rate_limits = RateLimitResetTimes(
-            claude=self.rate_limit_reset_times.get("claude"),
-            gemini_antigravity=self.rate_limit_reset_times.get("gemini-antigravity"),
-            gemini_cli=self.rate_limit_reset_times.get("gemini-cli"),
-        )
+        # Every quota key (including per-model keys) is persisted; expired ones are pruned
+        rate_limits = RateLimitResetTimes(times=dict(self.rate_limit_reset_times)).prune()
         
         return AccountMetadata(
+            id=self.id,
             refresh_token=self.refresh_token,
             email=self.email,
             project_id=self.project_id,
@@ -95,6 +109,13 @@ class ManagedAccount:
         )
 
 
+@dataclass
+class AccountLease:
+    """An account handed out by acquire_for_family(), with the quota to use."""
+    account: ManagedAccount
+    header_style: HeaderStyle
+
+
 def get_quota_key(family: ModelFamily, header_style: HeaderStyle, model: Optional[str] = None) -> str:
     """
     Get the quota key for rate limit tracking.
@@ -125,13 +146,33 @@ class AccountManager:
     and rate limit tracking.
     """
     
-    def __init__(self, storage: Optional[AccountStorage] = None, storage_path: Optional[str] = None):
+    def __init__(
+        self,
+        storage: Optional[AccountStorage] = None,
+        storage_path: Optional[str] = None,
+        save_debounce_ms: int = 0,
+        strategy: Union[SelectionStrategy, Dict[str, SelectionStrategy]] = DEFAULT_SELECTION_STRATEGY,
+        shared_state_path: Optional[str] = None,
+        reload_interval_ms: int = 0,
+    ):
         """
         Initialize the account manager.
         
         Args:
             storage: Optional pre-loaded storage, otherwise loads from disk
             storage_path: Optional path to storage file
+            save_debounce_ms: Coalesce save_to_disk() calls and write at most
+                once per this many ms (0 writes on every call). With the SQLite
+                backend, each write also merges rate limits learned by other
+                processes sharing the database.
+            strategy: Account selection strategy, or a dict of strategies by
+                model family (families not listed use sticky)
+            shared_state_path: Optional memory-mapped state file shared by all
+                local processes; rate limits, cooldowns and in-flight counts
+                recorded there are visible to every process immediately
+            reload_interval_ms: Check the storage file for changes made by
+                other processes (e.g. auth login/logout) at most once per this
+                many ms and merge them into the pool (0 disables)
         """
         self._storage_path = storage_path
         self._storage = storage or load_accounts(self._storage_path) or AccountStorage()
@@ -143,27 +184,75 @@ class AccountManager:
         self._last_toast_shown_at: Dict[int, int] = {}
         self._toast_debounce_ms = 10000  # 10 seconds
         
+        # Account selection
+        self._strategy_by_family: Dict[str, SelectionStrategy] = {}
+        self.set_strategy(strategy)
+        self._wrr_current: Dict[str, Dict[str, float]] = {}  # Smooth WRR state by family
+        
+        # Availability indexes by (family, header style, model), built on demand
+        self._indexes: Dict[Tuple[str, Optional[str], Optional[str]], AvailabilityIndex] = {}
+        
+        # Serializes select-and-lease so concurrent requests see consistent state
+        self._lock = asyncio.Lock()
+        
+        # Write-behind persistence
+        self._save_debounce_ms = save_debounce_ms
+        self._save_lock = asyncio.Lock()
+        self._save_task: Optional[asyncio.Task] = None
+        self._last_saved: Optional[Dict[str, Any]] = None
+        
+        # Shared SQLite store for multi-process deployments (None for the JSON file)
+        self._store: Optional[SQLiteAccountStore] = None
+        if get_storage_backend(storage_path) == STORAGE_BACKEND_SQLITE:
+            self._store = SQLiteAccountStore(get_storage_path(storage_path))
+        
+        # Memory-mapped rate-limit state shared with other local processes
+        self._shared: Optional[SharedStateTable] = None
+        self._shared_generation = -1
+        self._shared_key_names: Dict[Tuple[str, str], str] = {}  # (account ID, hashed key) -> quota key
+        self._shared_models: set = set()  # (family, model) pairs whose long quota keys are registered
+        self._shared_reaped_at = 0.0
+        if shared_state_path:
+            self._shared = SharedStateTable(Path(shared_state_path))
+        
         # Load accounts from storage
         for i, metadata in enumerate(self._storage.accounts):
             self._accounts.append(ManagedAccount.from_metadata(i, metadata))
+        
+        # Hot reload: file signature and the refresh token of each account as
+        # last seen on disk, the base for merging external changes
+        self._reload_interval_ms = reload_interval_ms
+        self._next_reload_check = 0.0
+        self._file_signature = self._stat_storage() if reload_interval_ms > 0 else None
+        self._file_tokens: Dict[str, str] = {
+            metadata.id: metadata.refresh_token for metadata in self._storage.accounts
+        }
+        self._token_signature = self._stat_storage()  # As of the last rotated-token check
     
     @classmethod
     async def load_from_disk(
         cls, 
         current_auth: Optional[AuthDetails] = None,
         storage_path: Optional[str] = None,
+        **options: Any,
     ) -> "AccountManager":
         """
         Load account manager from disk, optionally ensuring current auth is included.
         
+        Unlike the constructor, this reads the storage file in a worker thread
+        and never blocks the event loop on the file lock.
+        
         Args:
             current_auth: Optional current auth to ensure is in the pool
             storage_path: Optional custom storage path
+            **options: Other AccountManager options (save_debounce_ms, strategy,
+                shared_state_path)
             
         Returns:
             AccountManager instance
         """
-        manager = cls(storage_path=storage_path)
+        storage = await aload_accounts(storage_path)
+        manager = cls(storage=storage or AccountStorage(), storage_path=storage_path, **options)
         
         # Ensure current auth is in the pool
         if current_auth:
@@ -180,6 +269,180 @@ class AccountManager:
 
 
     
+    def _stat_storage(self) -> Optional[Tuple[int, ...]]:
+        """Get (inode, mtime, size) of the storage file(s), or None if missing."""
+        path = get_storage_path(self._storage_path)
+        paths = [path]
+        if self._store is not None:
+            paths.append(path.parent / f"{path.name}-wal")  # WAL writes skip the main file
+        
+        signature: Tuple[int, ...] = ()
+        for candidate in paths:
+            try:
+                stat = os.stat(candidate)
+            except OSError:
+                if candidate == path:
+                    return None
+                continue
+            signature += (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        return signature
+    
+    async def reload_if_changed(self) -> bool:
+        """
+        Merge the storage file into the pool if it changed since last checked.
+        
+        Returns:
+            True if the file was reloaded
+        """
+        signature = self._stat_storage()
+        if signature is None or signature == self._file_signature:
+            return False
+        
+        storage = await aload_accounts(self._storage_path)
+        # Record the signature seen before the read, so a write racing with it
+        # is picked up by the next check
+        self._file_signature = signature
+        if storage is None:
+            return False  # Unreadable mid-write or invalid; keep the current pool
+        
+        self.merge_storage(storage)
+        return True
+    
+    async def _maybe_reload(self) -> None:
+        """Run reload_if_changed() if enabled and the check interval has passed."""
+        if self._reload_interval_ms <= 0:
+            return
+        now = time.monotonic()
+        if now < self._next_reload_check:
+            return
+        self._next_reload_check = now + self._reload_interval_ms / 1000
+        await self.reload_if_changed()
+    
+    def merge_storage(self, storage: AccountStorage) -> None:
+        """
+        Merge storage written by another process into the pool.
+        
+        Accounts are matched by ID against the file as last seen: accounts new
+        to the file are added, accounts that disappeared from it are dropped,
+        and accounts this process added or removed itself stay that way.
+        Surviving accounts keep their runtime state (leases, 429 history) and
+        take the later of each reset time. A refresh token that changed on disk
+        (re-login) replaces the in-memory one.
+        
+        Args:
+            storage: Freshly loaded storage
+        """
+        base = self._file_tokens
+        local = {account.id: account for account in self._accounts}
+        active_ids = {
+            family: self._accounts[index].id
+            for family, index in self._active_index_by_family.items()
+            if index < len(self._accounts)
+        }
+        
+        merged: List[ManagedAccount] = []
+        for metadata in storage.accounts:
+            account = local.pop(metadata.id, None)
+            if account is None:
+                if metadata.id in base and base[metadata.id] == metadata.refresh_token:
+                    continue  # Removed here since the last load; not re-added
+                merged.append(ManagedAccount.from_metadata(0, metadata))
+                continue
+            
+            loaded = ManagedAccount.from_metadata(0, metadata)
+            if metadata.id in base and base[metadata.id] != metadata.refresh_token:
+                account.refresh_token = loaded.refresh_token
+            account.email = account.email or loaded.email
+            account.project_id = account.project_id or loaded.project_id
+            account.managed_project_id = account.managed_project_id or loaded.managed_project_id
+            for key, reset_time in loaded.rate_limit_reset_times.items():
+                if reset_time > account.rate_limit_reset_times.get(key, 0):
+                    account.rate_limit_reset_times[key] = reset_time
+            if (loaded.cooling_down_until or 0) > (account.cooling_down_until or 0):
+                account.cooling_down_until = loaded.cooling_down_until
+                account.cooldown_reason = loaded.cooldown_reason
+            merged.append(account)
+        
+        # Accounts this process added that have not reached the file yet
+        merged.extend(account for account in local.values() if account.id not in base)
+        
+        for i, account in enumerate(merged):
+            account.index = i
+        self._accounts = merged
+        self._file_tokens = {metadata.id: metadata.refresh_token for metadata in storage.accounts}
+        self._indexes.clear()
+        self._shared_models.clear()
+        
+        # Keep active indices pointing at the same accounts where they survived
+        positions = {account.id: account.index for account in merged}
+        for family in [MODEL_FAMILY_GEMINI, MODEL_FAMILY_CLAUDE]:
+            position = positions.get(active_ids.get(family))
+            if position is None:
+                position = min(self._active_index_by_family.get(family, 0), max(0, len(merged) - 1))
+            self._active_index_by_family[family] = position
+        
+        for weights in self._wrr_current.values():
+            for account_id in [account_id for account_id in weights if account_id not in positions]:
+                del weights[account_id]
+    
+    async def persist_rotated_token(self, account: ManagedAccount, refresh_token: str) -> None:
+        """
+        Record a refresh token rotated by the OAuth server and write it through.
+        
+        Unlike save_to_disk(), this is never debounced: the old token may stop
+        working at any moment, so only this account's token is updated in
+        storage right away (merged under the file lock, not overwritten), where
+        other processes pick it up before their next refresh.
+        
+        Args:
+            account: Account whose token was rotated
+            refresh_token: The new refresh token
+            
+        Raises:
+            OSError: If storage could not be written (including a file lock timeout)
+        """
+        if refresh_token == account.refresh_token:
+            return
+        account.refresh_token = refresh_token
+        
+        async with self._save_lock:
+            stored = await aupdate_refresh_token(account.id, refresh_token, self._storage_path)
+            if stored:
+                # Our own write, not a rotation by another process
+                self._file_tokens[account.id] = refresh_token
+    
+    async def adopt_rotated_tokens(self) -> int:
+        """
+        Pick up refresh tokens rotated and persisted by other processes.
+        
+        Cheap when nothing changed (one stat of the storage file), so it can
+        run before every token refresh. An account whose stored token differs
+        from the one last seen on disk takes the stored token.
+        
+        Returns:
+            Number of accounts whose refresh token was replaced
+        """
+        signature = self._stat_storage()
+        if signature is None or signature == self._token_signature:
+            return 0
+        
+        storage = await aload_accounts(self._storage_path)
+        self._token_signature = signature
+        if storage is None:
+            return 0
+        
+        stored = {metadata.id: metadata.refresh_token for metadata in storage.accounts}
+        adopted = 0
+        for account in self._accounts:
+            token = stored.get(account.id)
+            if token is None or token == self._file_tokens.get(account.id):
+                continue
+            self._file_tokens[account.id] = token
+            if token != account.refresh_token:
+                account.refresh_token = token
+                adopted += 1
+        return adopted
+    
     def get_account_count(self) -> int:
         """Get the number of accounts in the pool."""
         return len(self._accounts)
@@ -188,6 +451,13 @@ class AccountManager:
         """Get all managed accounts."""
         return self._accounts.copy()
     
+    def get_account_by_id(self, account_id: str) -> Optional[ManagedAccount]:
+        """Get an account by its stable ID."""
+        for account in self._accounts:
+            if account.id == account_id:
+                return account
+        return None
+    
     def ensure_account_exists(
         self,
         refresh_token: str,
@@ -226,6 +496,7 @@ class AccountManager:
         now = int(time.time() * 1000)
         new_account = ManagedAccount(
             index=len(self._accounts),
+            id=make_account_id(email, refresh_token),
             email=email,
             refresh_token=refresh_token,
             project_id=project_id,
@@ -234,6 +505,8 @@ class AccountManager:
             last_used=now,
         )
         self._accounts.append(new_account)
+        self._indexes.clear()
+        self._shared_models.clear()
         return new_account
     
     def is_rate_limited(self, account: ManagedAccount, family: ModelFamily, model: Optional[str] = None) -> bool:
@@ -248,6 +521,8 @@ class AccountManager:
         Returns:
             True if rate-limited
         """
+        self._register_shared_keys(family, model)
+        self._sync_shared_state()
         now = int(time.time() * 1000)
         
         # Check cooldown
@@ -288,6 +563,8 @@ class AccountManager:
         Returns:
             True if rate-limited for this header style
         """
+        self._register_shared_keys(family, model)
+        self._sync_shared_state()
         now = int(time.time() * 1000)
         
         if account.cooling_down_until and account.cooling_down_until > now:
@@ -330,6 +607,151 @@ class AccountManager:
         
         return None
     
+    def _get_available_at(
+        self,
+        account: ManagedAccount,
+        family: ModelFamily,
+        header_style: Optional[HeaderStyle],
+        model: Optional[str],
+    ) -> int:
+        """
+        Get when an account becomes available for a quota (ms timestamp).
+        
+        With header_style None, a Gemini account is available once either of
+        its two quotas is, matching is_rate_limited().
+        """
+        resets = account.rate_limit_reset_times
+        if family == MODEL_FAMILY_CLAUDE:
+            reset_time = resets.get("claude", 0)
+        elif header_style is None:
+            reset_time = min(
+                resets.get(get_quota_key(family, HEADER_STYLE_ANTIGRAVITY, model), 0),
+                resets.get(get_quota_key(family, HEADER_STYLE_GEMINI_CLI, model), 0),
+            )
+        else:
+            reset_time = resets.get(get_quota_key(family, header_style, model), 0)
+        
+        return max(reset_time or 0, account.cooling_down_until or 0)
+    
+    def _get_index(
+        self,
+        family: ModelFamily,
+        header_style: Optional[HeaderStyle],
+        model: Optional[str],
+    ) -> AvailabilityIndex:
+        """Get the availability index for a quota, building it on first use."""
+        if family == MODEL_FAMILY_CLAUDE:
+            header_style, model = None, None  # Claude has a single quota
+        key = (family, header_style, model)
+        self._register_shared_keys(family, model)
+        self._sync_shared_state()
+        now = int(time.time() * 1000)
+        
+        index = self._indexes.get(key)
+        if index is None:
+            index = AvailabilityIndex(
+                [account.id for account in self._accounts],
+                [self._get_available_at(account, family, header_style, model) for account in self._accounts],
+                now,
+            )
+            self._indexes[key] = index
+        else:
+            index.refresh(now)
+        return index
+    
+    def _reindex_account(self, account: ManagedAccount) -> None:
+        """Push an account's rate-limit and cooldown changes into every index."""
+        now = int(time.time() * 1000)
+        for (family, header_style, model), index in self._indexes.items():
+            index.update(account.id, self._get_available_at(account, family, header_style, model), now)
+    
+    def _register_shared_keys(self, family: ModelFamily, model: Optional[str]) -> None:
+        """
+        Learn the hashed form of quota keys too long for a shared-table slot.
+        
+        The table stores such keys hashed; this maps them back so rate limits
+        other processes recorded for the model are adopted under the real key.
+        """
+        if self._shared is None or family == MODEL_FAMILY_CLAUDE or (family, model) in self._shared_models:
+            return
+        
+        self._shared_models.add((family, model))
+        for header_style in (HEADER_STYLE_ANTIGRAVITY, HEADER_STYLE_GEMINI_CLI):
+            quota_key = get_quota_key(family, header_style, model)
+            for account in self._accounts:
+                stored_key = SharedStateTable.stored_key(account.id, quota_key)
+                if stored_key != quota_key:
+                    self._shared_key_names[(account.id, stored_key)] = quota_key
+                    self._shared_generation = -1  # Re-read entries skipped while the key was unknown
+    
+    def _sync_shared_state(self) -> None:
+        """
+        Adopt rate limits and cooldowns other processes wrote to the shared table.
+        
+        Costs a single generation-counter read unless something changed. Every
+        SHARED_STATE_REAP_INTERVAL_MS it also queues a reap of in-flight counts
+        held by processes that exited without releasing them.
+        """
+        shared = self._shared
+        if shared is None:
+            return
+        
+        if time.monotonic() - self._shared_reaped_at >= SHARED_STATE_REAP_INTERVAL_MS / 1000:
+            self._shared_reaped_at = time.monotonic()
+            shared.post_reap_dead_owners(INFLIGHT_KEY)
+        
+        if shared.generation == self._shared_generation:
+            return
+        
+        self._shared_generation = shared.generation
+        snapshot = shared.snapshot()
+        now = int(time.time() * 1000)
+        
+        for account in self._accounts:
+            entries = snapshot.get(account.id)
+            if not entries:
+                continue
+            
+            changed = False
+            for key, value in entries.items():
+                if key.startswith(INFLIGHT_KEY) or value <= now:
+                    continue
+                if SharedStateTable.is_hashed_key(account.id, key):
+                    key = self._shared_key_names.get((account.id, key))
+                    if key is None:
+                        continue  # Not a model this process has used yet
+                if key == COOLDOWN_KEY:
+                    if value > (account.cooling_down_until or 0):
+                        account.cooling_down_until = value
+                        account.cooldown_reason = account.cooldown_reason or "shared"
+                        changed = True
+                elif value > account.rate_limit_reset_times.get(key, 0):
+                    account.rate_limit_reset_times[key] = value
+                    changed = True
+            
+            if changed:
+                self._reindex_account(account)
+    
+    def get_in_flight(self, account: ManagedAccount) -> int:
+        """
+        Get an account's in-flight request count.
+        
+        With shared state this is the count across all local processes. This
+        process's own leases are counted locally, since its shared updates are
+        applied in the background.
+        
+        Args:
+            account: Account to check
+            
+        Returns:
+            Number of outstanding leases
+        """
+        if self._shared is not None:
+            total = self._shared.get(account.id, INFLIGHT_KEY)
+            own = self._shared.get(account.id, owned_key(INFLIGHT_KEY, self._shared.owner))
+            return max(0, total - own) + account.active_requests
+        return account.active_requests
+    
     def get_current_account_for_family(self, family: ModelFamily) -> Optional[ManagedAccount]:
         """
         Get the current active account for a model family.
@@ -349,10 +771,24 @@ class AccountManager:
         
         return self._accounts[0] if self._accounts else None
     
+    def rotate_for_family(self, family: ModelFamily) -> None:
+        """
+        Move the active account for a family to the next account in the pool.
+        
+        Args:
+            family: Model family
+        """
+        if not self._accounts:
+            return
+        
+        current_index = self._active_index_by_family.get(family, 0)
+        self._active_index_by_family[family] = (current_index + 1) % len(self._accounts)
+    
     def get_next_for_family(
         self,
         family: ModelFamily,
         model: Optional[str] = None,
+        header_style: Optional[HeaderStyle] = None,
     ) -> Optional[ManagedAccount]:
         """
         Get the next available account for a model family.
@@ -360,6 +796,8 @@ class AccountManager:
         Args:
             family: Model family
             model: Optional model name
+            header_style: Only accept accounts whose quota for this header
+                style is available (default: any quota available)
             
         Returns:
             Next available account or None if all rate-limited
@@ -369,46 +807,248 @@ class AccountManager:
         
         current_index = self._active_index_by_family.get(family, 0)
         
-        # Try each account starting from current
-        for offset in range(len(self._accounts)):
-            index = (current_index + offset) % len(self._accounts)
-            account = self._accounts[index]
+        # First available account starting from current
+        index = self._get_index(family, header_style, model).next_available(current_index)
+        if index is None:
+            return None
+        
+        account = self._accounts[index]
+        self._active_index_by_family[family] = index
+        account.last_used = int(time.time() * 1000)
+        return account
+    
+    def set_strategy(self, strategy: Union[SelectionStrategy, Dict[str, SelectionStrategy]]) -> None:
+        """
+        Set the account selection strategy.
+        
+        Args:
+            strategy: Strategy for all families, or a dict of strategies by family
             
-            if not self.is_rate_limited(account, family, model):
-                self._active_index_by_family[family] = index
-                account.last_used = int(time.time() * 1000)
-                return account
+        Raises:
+            ValueError: If a strategy name is unknown
+        """
+        if isinstance(strategy, str):
+            strategies = {MODEL_FAMILY_GEMINI: strategy, MODEL_FAMILY_CLAUDE: strategy}
+        else:
+            strategies = dict(strategy)
         
-        return None
+        for name in strategies.values():
+            if name not in SELECTION_STRATEGIES:
+                raise ValueError(
+                    f"Unknown selection strategy '{name}'. Expected one of: {', '.join(SELECTION_STRATEGIES)}"
+                )
+        
+        self._strategy_by_family = strategies
+    
+    def get_strategy(self, family: ModelFamily) -> SelectionStrategy:
+        """Get the selection strategy for a model family."""
+        return self._strategy_by_family.get(family, DEFAULT_SELECTION_STRATEGY)
+    
+    def get_selection_weight(
+        self,
+        account: ManagedAccount,
+        family: ModelFamily,
+        header_style: HeaderStyle,
+        model: Optional[str] = None,
+    ) -> float:
+        """
+        Get an account's weight for weighted selection.
+        
+        The weight starts from the account's observed success rate (1 minus
+        the smoothed 429 rate) and is scaled down while the quota is ramping
+        back up after a recent rate-limit reset.
+        
+        Args:
+            account: Account to weigh
+            family: Model family
+            header_style: Header style the request will use
+            model: Optional model name
+            
+        Returns:
+            Weight between MIN_SELECTION_WEIGHT and 1.0
+        """
+        weight = 1.0 - account.rate_limit_ewma.get(family, 0.0)
+        
+        now = int(time.time() * 1000)
+        reset_time = account.rate_limit_reset_times.get(get_quota_key(family, header_style, model), 0)
+        if reset_time and 0 <= now - reset_time < RATE_LIMIT_STATE_RESET_MS:
+            weight *= (now - reset_time) / RATE_LIMIT_STATE_RESET_MS
+        
+        return max(weight, MIN_SELECTION_WEIGHT)
+    
+    def _get_available_for_family(
+        self,
+        family: ModelFamily,
+        model: Optional[str],
+        header_style: HeaderStyle,
+    ) -> List[ManagedAccount]:
+        """Get accounts not rate-limited for a quota, starting after the active one."""
+        index = self._get_index(family, header_style, model)
+        count = len(self._accounts)
+        start = self._active_index_by_family.get(family, 0) + 1
+        positions = [(start + offset) % count for offset in range(count)]
+        return [self._accounts[i] for i in positions if index.is_available(i)]
+    
+    def get_available_accounts(
+        self,
+        family: ModelFamily,
+        model: Optional[str] = None,
+        header_style: Optional[HeaderStyle] = None,
+    ) -> List[ManagedAccount]:
+        """
+        Get the accounts that can serve a family right now.
+        
+        Uses the in-memory availability index only (no disk access), so it is
+        cheap enough for health checks.
+        
+        Args:
+            family: Model family
+            model: Optional model name
+            header_style: Only count this quota (None counts either Gemini quota)
+            
+        Returns:
+            Accounts that are neither rate-limited for the family nor cooling down
+        """
+        index = self._get_index(family, header_style, model)
+        return [account for position, account in enumerate(self._accounts) if index.is_available(position)]
+    
+    def _select_weighted(
+        self,
+        candidates: List[ManagedAccount],
+        family: ModelFamily,
+        header_style: HeaderStyle,
+        model: Optional[str],
+    ) -> ManagedAccount:
+        """Pick an account with smooth weighted round-robin."""
+        current = self._wrr_current.setdefault(family, {})
+        weights = {
+            account.id: self.get_selection_weight(account, family, header_style, model)
+            for account in candidates
+        }
+        total = sum(weights.values())
+        
+        for account in candidates:
+            current[account.id] = current.get(account.id, 0.0) + weights[account.id]
+        
+        chosen = max(candidates, key=lambda account: current[account.id])
+        current[chosen.id] -= total
+        return chosen
     
     def get_current_or_next_for_family(
         self,
         family: ModelFamily,
         model: Optional[str] = None,
-        strategy: SelectionStrategy = "sticky",
+        strategy: Optional[SelectionStrategy] = None,
         header_style: HeaderStyle = HEADER_STYLE_ANTIGRAVITY,
         pid_offset_enabled: bool = False,
     ) -> Optional[ManagedAccount]:
         """
-        Get the current account or rotate to the next available one.
+        Select an account for a request according to the selection strategy.
+        
+        Strategies:
+            sticky: Keep using the current account until it is rate-limited
+            round-robin: Move to the next available account on every request
+            least-loaded: Use the available account with the fewest in-flight
+                requests (ties go to the next account in rotation)
+            weighted: Smooth weighted round-robin, weighting accounts by their
+                observed 429 rate and how recently their quota reset
         
         Args:
             family: Model family
             model: Optional model name
-            strategy: Selection strategy
+            strategy: Selection strategy (defaults to the family's strategy)
             header_style: Preferred header style
             pid_offset_enabled: Whether to use PID-based offset for initial selection
             
         Returns:
             Available account or None if all rate-limited
         """
-        current = self.get_current_account_for_family(family)
+        strategy = strategy or self.get_strategy(family)
+        
+        if strategy == "sticky":
+            current = self.get_current_account_for_family(family)
+            
+            if current and not self.is_rate_limited_for_header_style(current, family, header_style, model):
+                current.last_used = int(time.time() * 1000)
+                return current
+            
+            return self.get_next_for_family(family, model, header_style=header_style)
+        
+        if not self._accounts:
+            return None
+        
+        if strategy == "round-robin":
+            start = self._active_index_by_family.get(family, 0) + 1
+            index = self._get_index(family, header_style, model).next_available(start)
+            if index is None:
+                return None
+            account = self._accounts[index]
+        else:
+            candidates = self._get_available_for_family(family, model, header_style)
+            if not candidates:
+                return None
+            
+            if strategy == "least-loaded":
+                account = min(candidates, key=self.get_in_flight)
+            else:
+                account = self._select_weighted(candidates, family, header_style, model)
+        
+        self._active_index_by_family[family] = account.index
+        account.last_used = int(time.time() * 1000)
+        return account
+    
+    async def acquire_for_family(
+        self,
+        family: ModelFamily,
+        model: Optional[str] = None,
+        header_style: HeaderStyle = HEADER_STYLE_ANTIGRAVITY,
+        quota_fallback: bool = False,
+    ) -> Optional[AccountLease]:
+        """
+        Atomically select an account and lease it for one request.
         
-        if current and not self.is_rate_limited_for_header_style(current, family, header_style, model):
-            current.last_used = int(time.time() * 1000)
-            return current
+        Selection (including Gemini quota fallback) runs under the manager lock,
+        so concurrent callers never observe a half-updated rotation. Each lease
+        must be returned with release().
         
-        return self.get_next_for_family(family, model)
+        Args:
+            family: Model family
+            model: Optional model name
+            header_style: Preferred header style
+            quota_fallback: For Gemini, accept an account whose other quota is
+                still available when the preferred one is exhausted everywhere
+            
+        Returns:
+            Lease with the account and header style to use, or None if all
+            accounts are rate-limited
+        """
+        async with self._lock:
+            await self._maybe_reload()
+            account = self.get_current_or_next_for_family(family, model, header_style=header_style)
+            
+            if account is None and quota_fallback and family == MODEL_FAMILY_GEMINI:
+                account = self.get_next_for_family(family, model)
+                if account is not None:
+                    header_style = self.get_available_header_style(account, family, model) or header_style
+            
+            if account is None:
+                return None
+            
+            account.active_requests += 1
+            if self._shared is not None:
+                self._shared.post_add_owned(account.id, INFLIGHT_KEY, 1)
+            return AccountLease(account=account, header_style=header_style)
+    
+    def release(self, lease: AccountLease) -> None:
+        """
+        Return a lease obtained from acquire_for_family().
+        
+        Args:
+            lease: Lease to release
+        """
+        lease.account.active_requests = max(0, lease.account.active_requests - 1)
+        if self._shared is not None:
+            self._shared.post_add_owned(lease.account.id, INFLIGHT_KEY, -1)
     
     def mark_rate_limited(
         self,
@@ -431,6 +1071,27 @@ class AccountManager:
         quota_key = get_quota_key(family, header_style, model)
         reset_time = int(time.time() * 1000) + retry_after_ms
         account.rate_limit_reset_times[quota_key] = reset_time
+        if self._shared is not None:
+            self._shared.post_update_max(account.id, quota_key, reset_time)
+        self._reindex_account(account)
+        self._record_outcome(account, family, rate_limited=True)
+    
+    def mark_success(self, account: ManagedAccount, family: ModelFamily) -> None:
+        """
+        Record a successful request on an account.
+        
+        Args:
+            account: Account that served the request
+            family: Model family
+        """
+        account.consecutive_failures = 0
+        self._record_outcome(account, family, rate_limited=False)
+    
+    def _record_outcome(self, account: ManagedAccount, family: ModelFamily, rate_limited: bool) -> None:
+        """Fold a request outcome into the account's smoothed 429 rate."""
+        previous = account.rate_limit_ewma.get(family, 0.0)
+        sample = 1.0 if rate_limited else 0.0
+        account.rate_limit_ewma[family] = previous + RATE_LIMIT_EWMA_ALPHA * (sample - previous)
     
     def mark_account_cooling_down(
         self,
@@ -448,6 +1109,9 @@ class AccountManager:
         """
         account.cooling_down_until = int(time.time() * 1000) + cooldown_ms
         account.cooldown_reason = reason
+        if self._shared is not None:
+            self._shared.post_update_max(account.id, COOLDOWN_KEY, account.cooling_down_until)
+        self._reindex_account(account)
     
     def get_min_wait_time_for_family(
         self,
@@ -464,28 +1128,8 @@ class AccountManager:
         Returns:
             Wait time in milliseconds (0 if an account is available)
         """
-        now = int(time.time() * 1000)
-        min_wait = float("inf")
-        
-        for account in self._accounts:
-            if not self.is_rate_limited(account, family, model):
-                return 0
-            
-            # Find the soonest reset time
-            if account.cooling_down_until:
-                wait = account.cooling_down_until - now
-                min_wait = min(min_wait, max(0, wait))
-            
-            for key, reset_time in account.rate_limit_reset_times.items():
-                if family == MODEL_FAMILY_CLAUDE and not key.startswith("claude"):
-                    continue
-                if family == MODEL_FAMILY_GEMINI and key.startswith("claude"):
-                    continue
-                
-                wait = reset_time - now
-                min_wait = min(min_wait, max(0, wait))
-        
-        return int(min_wait) if min_wait != float("inf") else 60000
+        wait = self._get_index(family, None, model).min_wait(int(time.time() * 1000))
+        return 60000 if wait is None else wait
     
     def remove_account(self, account: ManagedAccount) -> bool:
         """
@@ -498,20 +1142,26 @@ class AccountManager:
             True if removed
         """
         try:
-            self._accounts.remove(account)
-            
-            # Reindex remaining accounts
-            for i, acc in enumerate(self._accounts):
-                acc.index = i
-            
-            # Fix active indices
-            for family in [MODEL_FAMILY_GEMINI, MODEL_FAMILY_CLAUDE]:
-                if self._active_index_by_family.get(family, 0) >= len(self._accounts):
-                    self._active_index_by_family[family] = max(0, len(self._accounts) - 1)
-            
-            return True
+            position = self._accounts.index(account)
         except ValueError:
             return False
+        
+        del self._accounts[position]
+        self._indexes.clear()
+        self._shared_models.clear()
+        
+        # Reindex remaining accounts (IDs are unaffected)
+        for i, acc in enumerate(self._accounts):
+            acc.index = i
+        
+        # Keep active indices pointing at the same accounts
+        for family in [MODEL_FAMILY_GEMINI, MODEL_FAMILY_CLAUDE]:
+            active = self._active_index_by_family.get(family, 0)
+            if position < active:
+                active -= 1
+            self._active_index_by_family[family] = min(active, max(0, len(self._accounts) - 1))
+        
+        return True
     
     def update_from_auth(self, account: ManagedAccount, auth: AuthDetails) -> None:
         """
@@ -571,23 +1221,116 @@ class AccountManager:
         """Mark that a toast was shown for an account."""
         self._last_toast_shown_at[account_index] = int(time.time() * 1000)
     
-    async def save_to_disk(self) -> None:
-        """Save current account state to disk."""
+    def _build_storage(self) -> AccountStorage:
+        """Snapshot the current account state as storage."""
         storage = AccountStorage(
             accounts=[acc.to_metadata() for acc in self._accounts],
             active_index=self._active_index_by_family.get(MODEL_FAMILY_GEMINI, 0),
         )
         storage.active_index_by_family.gemini = self._active_index_by_family.get(MODEL_FAMILY_GEMINI, 0)
         storage.active_index_by_family.claude = self._active_index_by_family.get(MODEL_FAMILY_CLAUDE, 0)
+        return storage
+    
+    async def save_to_disk(self) -> None:
+        """
+        Save current account state to disk.
+        
+        With save_debounce_ms set, this only schedules a write: calls within
+        the debounce window are coalesced into one write of the latest state.
+        Call flush() to force pending state out (e.g. on shutdown).
+        """
+        if self._save_debounce_ms <= 0:
+            await self._write_if_changed()
+            return
         
-        save_accounts(storage, self._storage_path)
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.create_task(self._delayed_save())
+    
+    async def flush(self) -> None:
+        """Write any pending account state and shared-state updates immediately."""
+        if self._shared is not None:
+            await asyncio.to_thread(self._shared.flush)
+        task, self._save_task = self._save_task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await self._write_if_changed()
+    
+    async def _delayed_save(self) -> None:
+        """Wait out the debounce window, then write the latest state."""
+        await asyncio.sleep(self._save_debounce_ms / 1000)
+        # Shielded so flush() cancelling us mid-write does not abandon the write
+        await asyncio.shield(self._write_if_changed())
+    
+    async def _write_if_changed(self) -> None:
+        """Write the current state off the event loop unless it is unchanged."""
+        async with self._save_lock:
+            if self._reload_interval_ms > 0:
+                # Never overwrite accounts another process added since the last check
+                await self.reload_if_changed()
+            
+            storage = self._build_storage()
+            data = storage.to_dict()
+            if data == self._last_saved:
+                return
+            
+            if self._store is None:
+                # Even without hot reload, never put back a token another process rotated
+                kept = await asave_accounts(storage, self._storage_path, self._file_tokens)
+                for account in self._accounts:
+                    if account.id in kept:
+                        account.refresh_token = kept[account.id]
+                self._last_saved = storage.to_dict() if kept else data
+                self._file_tokens = {acc.id: acc.refresh_token for acc in storage.accounts}
+                return
+            
+            # Row-level update of what changed, then pick up what other processes learned
+            await asyncio.to_thread(self._store.apply_changes, data, self._last_saved, False)
+            self._last_saved = data
+            self._file_tokens = {acc.id: acc.refresh_token for acc in storage.accounts}
+            shared = await asyncio.to_thread(self._store.load_quota_state)
+            self._merge_quota_state(shared)
+    
+    def _merge_quota_state(self, shared: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Merge rate limits and cooldowns recorded by other processes.
+        
+        The later reset time wins, so knowledge is never lost by merging.
+        
+        Args:
+            shared: Output of SQLiteAccountStore.load_quota_state()
+        """
+        for account in self._accounts:
+            state = shared.get(account.id)
+            if not state:
+                continue
+            
+            changed = False
+            for key, reset_time in state["rateLimitResetTimes"].items():
+                if reset_time > account.rate_limit_reset_times.get(key, 0):
+                    account.rate_limit_reset_times[key] = reset_time
+                    changed = True
+            
+            cooling_down_until = state.get("coolingDownUntil")
+            if cooling_down_until and cooling_down_until > (account.cooling_down_until or 0):
+                account.cooling_down_until = cooling_down_until
+                account.cooldown_reason = state.get("cooldownReason")
+                changed = True
+            
+            if changed:
+                self._reindex_account(account)
     
     def get_accounts_snapshot(self) -> List[Dict]:
         """Get a snapshot of all accounts for debugging."""
         return [
             {
                 "index": acc.index,
+                "id": acc.id,
                 "email": acc.email,
+                "activeRequests": acc.active_requests,
                 "rateLimitResetTimes": acc.rate_limit_reset_times,
                 "coolingDownUntil": acc.cooling_down_until,
             }
@@ -1,10 +1,21 @@
+import os
 import time
+from contextlib import asynccontextmanager
 from typing import List, Optional
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 
-from antigravity_auth import AntigravityService, NoAccountsError
+from antigravity_auth import (
+    AllAccountsRateLimitedError,
+    AntigravityError,
+    AntigravityService,
+    DeadlineExceededError,
+    InvalidRequestError,
+    NoAccountsError,
+    TokenRefreshFailedError,
+)
+from antigravity_auth.constants import DEFAULT_REFRESH_AHEAD_FRACTION
 from antigravity_auth.api_server.schemas import (
     ChatCompletionRequest,
     ChatCompletionResponse,
@@ -18,7 +29,83 @@ from antigravity_auth.api_server.schemas import (
     ImageData,
 )
 
-app = FastAPI(title="Antigravity API", version="0.1.0")
+# Models listed by /v1/models; readiness is checked for each of them
+SERVED_MODELS = [
+    "gemini-3-pro",
+    "gemini-3-pro-image",
+    "gemini-3-flash",
+    "gemini-2.5-pro",
+    "gemini-2.5-flash",
+    "claude-sonnet-4-5",
+    "claude-opus-4-5",
+]
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Build one AntigravityService (and its AccountManager) for the whole process.
+
+    Sharing the service keeps the parsed accounts, cached access tokens and HTTP
+    connection pool alive across requests. The pool is closed on shutdown.
+
+    With ANTIGRAVITY_WARMUP=1 (serve --warmup), tokens are refreshed and
+    endpoint connections opened before the server starts accepting requests.
+    """
+    service = AntigravityService(refresh_ahead_fraction=DEFAULT_REFRESH_AHEAD_FRACTION)
+    await service.load_account_manager()  # Load accounts once at startup
+    if os.environ.get("ANTIGRAVITY_WARMUP") == "1":
+        await service.warmup()
+    app.state.service = service
+    try:
+        yield
+    finally:
+        await service.aclose()
+
+
+def get_service(request: Request) -> AntigravityService:
+    """Get the process-wide AntigravityService."""
+    return request.app.state.service
+
+
+# Service errors as (status code, OpenAI error type, error code); first match wins
+ERROR_MAPPING = [
+    (AllAccountsRateLimitedError, 429, "requests", "rate_limit_exceeded"),
+    (NoAccountsError, 503, "server_error", "no_accounts"),
+    (TokenRefreshFailedError, 503, "server_error", "token_refresh_failed"),
+    (DeadlineExceededError, 504, "server_error", "timeout"),
+    (InvalidRequestError, 400, "invalid_request_error", "invalid_request"),
+    (AntigravityError, 502, "server_error", "upstream_error"),
+]
+
+
+def error_response(error: Exception) -> JSONResponse:
+    """
+    Build an OpenAI-compatible error response for a service error.
+
+    Rate limits become 429 with Retry-After set to the account pool's next
+    reset, so clients back off instead of retrying immediately.
+
+    Args:
+        error: Exception raised while serving the request
+
+    Returns:
+        JSONResponse with an {"error": {...}} body
+    """
+    status_code, error_type, code = 500, "server_error", "internal_error"
+    for error_class, mapped_status, mapped_type, mapped_code in ERROR_MAPPING:
+        if isinstance(error, error_class):
+            status_code, error_type, code = mapped_status, mapped_type, mapped_code
+            break
+
+    headers = {}
+    if isinstance(error, AllAccountsRateLimitedError):
+        headers["Retry-After"] = str(max(1, -(-error.wait_time_ms // 1000)))
+
+    body = {"error": {"message": str(error), "type": error_type, "param": None, "code": code}}
+    return JSONResponse(status_code=status_code, content=body, headers=headers)
+
+
+app = FastAPI(title="Antigravity API", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,28 +116,45 @@ app.add_middleware(
 )
 
 @app.get("/health")
-async def health_check():
-    return {"status": "ok"}
+async def health_check(service: AntigravityService = Depends(get_service)):
+    """Liveness check: always 200, with "degraded" status and details when not ready."""
+    readiness = service.get_readiness(SERVED_MODELS)
+    return {"status": "ok" if readiness["ready"] else "degraded", **readiness}
+
+@app.get("/ready")
+async def readiness_check(service: AntigravityService = Depends(get_service)):
+    """
+    Readiness check for load balancers: 200 when requests can be served,
+    503 (with Retry-After when the soonest rate-limit reset is known) otherwise.
+    """
+    readiness = service.get_readiness(SERVED_MODELS)
+    if readiness["ready"]:
+        return readiness
+
+    headers = {}
+    waits = [state["retryAfterMs"] for state in readiness.get("models", {}).values() if state["retryAfterMs"]]
+    if waits and readiness["accounts"]:
+        headers["Retry-After"] = str(max(1, -(-min(waits) // 1000)))
+    return JSONResponse(status_code=503, content=readiness, headers=headers)
 
 @app.get("/v1/models")
 async def list_models():
     return {
         "object": "list",
         "data": [
-            {"id": "gemini-3-pro", "object": "model", "created": 1677610602, "owned_by": "antigravity"},
-            {"id": "gemini-3-pro-image", "object": "model", "created": 1677610602, "owned_by": "antigravity"},
-            {"id": "gemini-3-flash", "object": "model", "created": 1677610602, "owned_by": "antigravity"},
-            {"id": "gemini-2.5-pro", "object": "model", "created": 1677610602, "owned_by": "antigravity"},
-            {"id": "gemini-2.5-flash", "object": "model", "created": 1677610602, "owned_by": "antigravity"},
-            {"id": "claude-sonnet-4-5", "object": "model", "created": 1677610602, "owned_by": "antigravity"},
-            {"id": "claude-opus-4-5", "object": "model", "created": 1677610602, "owned_by": "antigravity"},
+            {"id": model, "object": "model", "created": 1677610602, "owned_by": "antigravity"}
+            for model in SERVED_MODELS
         ]
     }
 
 @app.post("/v1/chat/completions")
-async def chat_completions(request: ChatCompletionRequest):
+async def chat_completions(
+    request: ChatCompletionRequest,
+    service: AntigravityService = Depends(get_service),
+):
     try:
-        service = AntigravityService(model=request.model)
+        # Shed load before building the upstream request when no account can serve it
+        await service.check_capacity(request.model)
         
         # Build prompt from messages
         # Simple concatenation for now (AntigravityService will handle role adaptation internally via its generate method logic if updated, 
@@ -68,12 +172,27 @@ async def chat_completions(request: ChatCompletionRequest):
              full_prompt = "Hello" # Fallback
              
         if request.stream:
+             chunks = service.generate_stream(
+                 prompt=full_prompt,
+                 system_prompt=system_prompt,
+                 model=request.model,
+             )
+             # Wait for the first chunk so errors before any output (rate limits,
+             # no accounts) still get a proper status code
+             try:
+                 first_chunk = await chunks.__anext__()
+             except StopAsyncIteration:
+                 first_chunk = None
              return StreamingResponse(
-                 stream_generator(service, full_prompt, system_prompt, request.model),
+                 stream_generator(chunks, first_chunk, request.model),
                  media_type="text/event-stream"
              )
         else:
-             response_text = await service.generate(prompt=full_prompt, system_prompt=system_prompt)
+             response_text = await service.generate(
+                 prompt=full_prompt,
+                 system_prompt=system_prompt,
+                 model=request.model,
+             )
              return ChatCompletionResponse(
                  model=request.model,
                  choices=[
@@ -86,20 +205,27 @@ async def chat_completions(request: ChatCompletionRequest):
              )
              
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        return error_response(e)
 
-async def stream_generator(service, prompt, system_prompt, model):
+async def stream_generator(chunks, first_chunk, model):
     """
     True real-time streaming generator.
     
     Yields SSE events as chunks arrive from the model in real-time.
+    
+    Args:
+        chunks: Text chunk iterator from generate_stream(), already advanced once
+        first_chunk: The chunk already taken from it (None if it was empty)
+        model: Model name for the chunk objects
     """
+    async def remaining():
+        if first_chunk is not None:
+            yield first_chunk
+        async for chunk in chunks:
+            yield chunk
+    
     try:
-        async for chunk in service.generate_stream(
-            prompt=prompt,
-            system_prompt=system_prompt,
-            model=model,
-        ):
+        async for chunk in remaining():
             response = ChatCompletionChunk(
                 model=model,
                 choices=[
@@ -128,7 +254,7 @@ async def stream_generator(service, prompt, system_prompt, model):
         
     except Exception as e:
         # Send error as final chunk
-        error_response = ChatCompletionChunk(
+        error_chunk = ChatCompletionChunk(
             model=model,
             choices=[
                 ChatCompletionChunkChoice(
@@ -138,8 +264,10 @@ async def stream_generator(service, prompt, system_prompt, model):
                 )
             ]
         )
-        yield f"data: {error_response.model_dump_json()}\n\n"
+        yield f"data: {error_chunk.model_dump_json()}\n\n"
         yield "data: [DONE]\n\n"
+    finally:
+        await chunks.aclose()
 
 
 # =============================================================================
@@ -167,14 +295,17 @@ def size_to_aspect_ratio(size: str) -> str:
 
 
 @app.post("/v1/images/generations")
-async def generate_images(request: ImageGenerationRequest):
+async def generate_images(
+    request: ImageGenerationRequest,
+    service: AntigravityService = Depends(get_service),
+):
     """
     Generate images from a text prompt (OpenAI-compatible endpoint).
 
     This endpoint is compatible with the OpenAI Images API.
     """
     try:
-        service = AntigravityService(model=request.model)
+        await service.check_capacity(request.model)
 
         # Convert size to aspect ratio
         aspect_ratio = size_to_aspect_ratio(request.size or "1024x1024")
@@ -202,5 +333,5 @@ async def generate_images(request: ImageGenerationRequest):
         )
 
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        return error_response(e)
 
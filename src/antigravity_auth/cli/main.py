@@ -463,6 +463,11 @@ def serve(
         help="Path to custom accounts storage file",
         envvar="ANTIGRAVITY_STORAGE_PATH"
     ),
+    warmup: bool = typer.Option(
+        False,
+        "--warmup",
+        help="Refresh tokens and open endpoint connections before accepting requests",
+    ),
 ):
     """
     Start the Antigravity API server (OpenAI compatible).
@@ -481,6 +486,9 @@ def serve(
     if storage_path:
         os.environ["ANTIGRAVITY_STORAGE_PATH"] = storage_path
         console.print(f"Storage: [dim]{storage_path}[/dim]")
+    
+    if warmup:
+        os.environ["ANTIGRAVITY_WARMUP"] = "1"
 
     uvicorn.run(
         "antigravity_auth.api_server.api:app",
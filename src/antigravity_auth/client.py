@@ -5,28 +5,81 @@ This module handles HTTP requests to the Antigravity API, including
 URL transformation, header injection, endpoint fallback, and response handling.
 """
 
+import asyncio
 import json
 import re
+import time
 import uuid
+from contextlib import asynccontextmanager
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
-from urllib.parse import urlencode
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlencode, urlparse
 
 import httpx
 
 from .constants import (
     ANTIGRAVITY_DEFAULT_PROJECT_ID,
+    ANTIGRAVITY_ENDPOINT_AUTOPUSH,
+    ANTIGRAVITY_ENDPOINT_DAILY,
     ANTIGRAVITY_ENDPOINT_FALLBACKS,
+    ANTIGRAVITY_ENDPOINT_PROD,
     ANTIGRAVITY_HEADERS,
     ANTIGRAVITY_SYSTEM_INSTRUCTION,
     GEMINI_CLI_ENDPOINT,
     GEMINI_CLI_HEADERS,
+    GOOGLE_TOKEN_URL,
     HEADER_STYLE_ANTIGRAVITY,
     HEADER_STYLE_GEMINI_CLI,
     MODEL_FAMILY_CLAUDE,
     MODEL_FAMILY_GEMINI,
     MODEL_FAMILY_IMAGE,
 )
+from .endpoints import EndpointHealthTracker, HedgePolicy
+from .sse import SSEDecoder, decode_sse, parse_sse_json
+
+
+# =============================================================================
+# Connection Pool Defaults
+# =============================================================================
+
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 20
+DEFAULT_KEEPALIVE_EXPIRY = 30.0  # seconds
+
+# Default cap on concurrent streams multiplexed per endpoint in HTTP/2 mode
+DEFAULT_HTTP2_MAX_CONCURRENT_STREAMS = 100
+
+# Hosts that get their own connection pool when per-host limits are enabled
+POOLED_HOSTS = [
+    ANTIGRAVITY_ENDPOINT_DAILY,
+    ANTIGRAVITY_ENDPOINT_AUTOPUSH,
+    ANTIGRAVITY_ENDPOINT_PROD,
+    GOOGLE_TOKEN_URL,
+]
+
+
+# =============================================================================
+# Stream Timeout Defaults
+# =============================================================================
+
+DEFAULT_CONNECT_TIMEOUT = 10.0  # seconds
+DEFAULT_FIRST_BYTE_TIMEOUT = 60.0  # seconds, until the first byte of the stream body
+DEFAULT_IDLE_TIMEOUT = 120.0  # seconds between stream chunks
+
+
+@dataclass
+class StreamTimeouts:
+    """
+    Timeouts for a streaming request, in seconds (None disables a limit).
+    
+    When connect or first_byte expires, the next endpoint is tried. Once the
+    stream has started, idle or total expiring ends it with an error event;
+    a started stream is never retried on another endpoint.
+    """
+    connect: Optional[float] = DEFAULT_CONNECT_TIMEOUT
+    first_byte: Optional[float] = DEFAULT_FIRST_BYTE_TIMEOUT
+    idle: Optional[float] = DEFAULT_IDLE_TIMEOUT
+    total: Optional[float] = None  # Across all endpoints tried
 
 
 # =============================================================================
@@ -79,6 +132,65 @@ def build_image_generation_config(aspect_ratio: str = "1:1") -> dict:
     return {"aspectRatio": aspect_ratio}
 
 
+def is_http2_available() -> bool:
+    """
+    Check if the optional h2 package needed for HTTP/2 is installed.
+
+    Returns:
+        True if httpx can negotiate HTTP/2
+    """
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def is_http2_protocol_error(error: BaseException) -> bool:
+    """
+    Check whether a transport error was raised by the HTTP/2 (h2) layer.
+
+    httpx reports HTTP/1.1 and HTTP/2 protocol failures alike as
+    RemoteProtocolError; only the chained cause tells them apart.
+
+    Args:
+        error: Exception raised by httpx
+
+    Returns:
+        True if an h2 exception or event is in the exception chain
+    """
+    try:
+        import h2.events
+        import h2.exceptions
+    except ImportError:
+        return False
+
+    seen = set()
+    current: Optional[BaseException] = error
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        if isinstance(current, h2.exceptions.H2Error):
+            return True
+        if any(isinstance(arg, h2.events.Event) for arg in current.args):
+            return True
+        current = current.__cause__ or current.__context__
+    return False
+
+
+def get_origin(url: str) -> str:
+    """
+    Get the scheme://host[:port] origin of a URL.
+
+    Args:
+        url: Absolute URL
+
+    Returns:
+        Origin string
+    """
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
 @dataclass
 class PreparedRequest:
     """A prepared Antigravity API request."""
@@ -450,27 +562,22 @@ def parse_retry_after(response: httpx.Response) -> Optional[int]:
     return None
 
 
-def parse_sse_response(text: str) -> List[Dict[str, Any]]:
+def parse_sse_response(text: Union[str, bytes]) -> List[Dict[str, Any]]:
     """
     Parse a Server-Sent Events response into individual events.
     
     Args:
-        text: Raw SSE response text
+        text: Raw SSE response text or bytes
         
     Returns:
         List of parsed JSON objects
     """
     events = []
     
-    for line in text.split("\n"):
-        line = line.strip()
-        if line.startswith("data:"):
-            data = line[5:].strip()
-            if data and data != "[DONE]":
-                try:
-                    events.append(json.loads(data))
-                except json.JSONDecodeError:
-                    pass
+    for event in decode_sse(text):
+        data = event.data.strip()
+        if data and data != "[DONE]":
+            events.extend(parse_sse_json(data))
     
     return events
 
@@ -619,16 +726,242 @@ class AntigravityClient:
         self,
         timeout: float = 300.0,
         max_retries: int = 3,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+        max_connections_per_host: Optional[int] = None,
+        http2: bool = False,
+        http2_max_concurrent_streams: Optional[int] = DEFAULT_HTTP2_MAX_CONCURRENT_STREAMS,
+        endpoint_health: Optional[EndpointHealthTracker] = None,
+        hedging: Optional[HedgePolicy] = None,
+        stream_timeouts: Optional[StreamTimeouts] = None,
+        family_timeouts: Optional[Dict[str, StreamTimeouts]] = None,
+        quiet_mode: bool = False,
     ):
         """
         Initialize the Antigravity client.
         
+        The client owns a long-lived connection pool that is created lazily on
+        first use and shared by all requests until aclose() is called.
+        
+        With http2=True, concurrent requests to the same endpoint are multiplexed
+        over a small number of connections. HTTP/1.1 is still offered during ALPN
+        negotiation, so endpoints that don't speak HTTP/2 keep working, and the
+        client downgrades to HTTP/1.1 entirely if the h2 package is missing or an
+        HTTP/2 protocol error occurs.
+        
         Args:
             timeout: Request timeout in seconds
             max_retries: Maximum number of endpoint fallback retries
+            max_connections: Maximum number of open connections in the pool
+            max_keepalive_connections: Maximum number of idle keep-alive connections
+            keepalive_expiry: Seconds an idle keep-alive connection is kept open
+            max_connections_per_host: Optional connection cap for each Antigravity
+                and OAuth host (each host then gets its own pool)
+            http2: Enable HTTP/2 multiplexing (requires the h2 package)
+            http2_max_concurrent_streams: Maximum in-flight streams per endpoint
+                in HTTP/2 mode; further requests wait for a free slot (None for
+                no client-side cap)
+            endpoint_health: Optional endpoint health tracker (e.g. with custom
+                circuit breaker settings); endpoints are tried fastest healthy
+                first and open circuits are skipped
+            hedging: Optional HedgePolicy enabling hedged requests in execute()
+                (non-streaming calls such as image generation); None disables
+            stream_timeouts: Connect, first-byte, idle and total timeouts for
+                streaming calls (timeout still bounds non-streaming reads)
+            family_timeouts: Optional per-model-family overrides of
+                stream_timeouts, e.g. {"claude": StreamTimeouts(first_byte=180)}
+            quiet_mode: Suppress status messages (HTTP/2 fallback, and circuit
+                breaker messages of the default endpoint_health)
         """
         self.timeout = timeout
         self.max_retries = max_retries
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.max_connections_per_host = max_connections_per_host
+        self.http2 = http2
+        self.http2_max_concurrent_streams = http2_max_concurrent_streams
+        self.quiet_mode = quiet_mode
+        
+        if self.http2 and not is_http2_available():
+            if not self.quiet_mode:
+                print("[antigravity] HTTP/2 requested but the 'h2' package is not installed. Falling back to HTTP/1.1.")
+            self.http2 = False
+        
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._retired_clients: List[httpx.AsyncClient] = []  # Replaced pools, closed in aclose()
+        self._stream_slots: Dict[str, asyncio.Semaphore] = {}
+        self._http2_confirmed = False  # Set once any endpoint answers over HTTP/2
+        self.endpoint_health = endpoint_health or EndpointHealthTracker(quiet_mode=quiet_mode)
+        self.hedging = hedging
+        self.stream_timeouts = stream_timeouts or StreamTimeouts()
+        self.family_timeouts = family_timeouts or {}
+    
+    def _build_http_client(self) -> httpx.AsyncClient:
+        """Create the pooled HTTP client from the configured limits."""
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        
+        mounts = None
+        if self.max_connections_per_host:
+            host_limits = httpx.Limits(
+                max_connections=self.max_connections_per_host,
+                max_keepalive_connections=min(
+                    self.max_keepalive_connections, self.max_connections_per_host
+                ),
+                keepalive_expiry=self.keepalive_expiry,
+            )
+            mounts = {}
+            for url in POOLED_HOSTS:
+                mounts[get_origin(url)] = httpx.AsyncHTTPTransport(
+                    limits=host_limits,
+                    http2=self.http2,
+                )
+        
+        return httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=limits,
+            mounts=mounts,
+            http2=self.http2,
+        )
+    
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """
+        Get the shared pooled HTTP client, creating it on first use.
+        
+        Returns:
+            The httpx.AsyncClient backing all requests made by this client
+        """
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = self._build_http_client()
+        return self._http_client
+    
+    async def aclose(self) -> None:
+        """Close the connection pool. A new pool is created on next use."""
+        self._stream_slots.clear()
+        clients, self._retired_clients = self._retired_clients, []
+        if self._http_client is not None:
+            clients.append(self._http_client)
+            self._http_client = None
+        for client in clients:
+            await client.aclose()
+    
+    def _note_http_version(self, response: httpx.Response) -> None:
+        """Remember that HTTP/2 negotiation has succeeded at least once."""
+        if response.http_version == "HTTP/2":
+            self._http2_confirmed = True
+    
+    def _downgrade_to_http1(self, error: BaseException) -> None:
+        """
+        Disable HTTP/2 after an HTTP/2 protocol failure and swap in a new pool.
+        
+        Only applies to errors raised by the h2 layer, and only while HTTP/2 has
+        never worked; once an endpoint has answered over HTTP/2, protocol errors
+        are treated as ordinary transport failures. The old pool is left open
+        for requests still using it and closed in aclose().
+        
+        Args:
+            error: Exception raised by httpx
+        """
+        if not self.http2 or self._http2_confirmed or not is_http2_protocol_error(error):
+            return
+        if not self.quiet_mode:
+            print("[antigravity] HTTP/2 protocol error. Falling back to HTTP/1.1.")
+        self.http2 = False
+        self._stream_slots = {}
+        if self._http_client is not None:
+            self._retired_clients.append(self._http_client)
+            self._http_client = None
+    
+    @asynccontextmanager
+    async def _stream_slot(self, url: str):
+        """
+        Hold one of the per-endpoint HTTP/2 stream slots for a request.
+        
+        This is a no-op in HTTP/1.1 mode or when no stream cap is configured.
+        
+        Args:
+            url: Request URL (slots are tracked per origin)
+        """
+        if not self.http2 or not self.http2_max_concurrent_streams:
+            yield
+            return
+        
+        origin = get_origin(url)
+        slot = self._stream_slots.get(origin)
+        if slot is None:
+            slot = asyncio.Semaphore(self.http2_max_concurrent_streams)
+            self._stream_slots[origin] = slot
+        
+        async with slot:
+            yield
+    
+    async def __aenter__(self) -> "AntigravityClient":
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+    
+    async def prewarm(
+        self,
+        endpoints: Optional[List[str]] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, bool]:
+        """
+        Open keep-alive connections to API endpoints ahead of the first request.
+        
+        Each endpoint gets one HEAD request, which pays for DNS, TCP and TLS
+        (and HTTP/2 negotiation) up front; the connection then stays in the
+        pool for keepalive_expiry seconds. Any HTTP response counts as warm.
+        
+        Args:
+            endpoints: Endpoints to connect to (defaults to the fallback list)
+            timeout: Per-endpoint timeout in seconds (defaults to the connect timeout)
+            
+        Returns:
+            Dict of endpoint to whether a connection was established
+        """
+        endpoints = endpoints or ANTIGRAVITY_ENDPOINT_FALLBACKS
+        if timeout is None:
+            timeout = self.stream_timeouts.connect
+        
+        async def warm(endpoint: str) -> bool:
+            try:
+                response = await self.http_client.head(endpoint, timeout=timeout)
+            except httpx.HTTPError:
+                return False
+            self._note_http_version(response)
+            return True
+        
+        results = await asyncio.gather(*(warm(endpoint) for endpoint in endpoints))
+        return dict(zip(endpoints, results))
+    
+    def get_timeouts(self, model: str, override: Optional[StreamTimeouts] = None) -> StreamTimeouts:
+        """
+        Resolve the timeouts for a request.
+        
+        Args:
+            model: Requested model name
+            override: Per-call timeouts, which take precedence
+            
+        Returns:
+            Per-call, per-family or default timeouts
+        """
+        if override is not None:
+            return override
+        return self.family_timeouts.get(get_model_family(model), self.stream_timeouts)
+    
+    def _url_for_endpoint(self, url: str, endpoint: str) -> str:
+        """Point a prepared request URL at another endpoint."""
+        for ep in ANTIGRAVITY_ENDPOINT_FALLBACKS + [GEMINI_CLI_ENDPOINT]:
+            if ep in url:
+                return url.replace(ep, endpoint)
+        return url
     
     async def execute(
         self,
@@ -638,6 +971,9 @@ class AntigravityClient:
         """
         Execute a prepared request with endpoint fallback.
         
+        With hedging enabled, a slow first endpoint is raced against the next
+        one (see HedgePolicy) before falling back to the rest in order.
+        
         Args:
             request: PreparedRequest to execute
             fallback_endpoints: Optional list of fallback endpoints
@@ -645,68 +981,20 @@ class AntigravityClient:
         Returns:
             AntigravityResponse with results
         """
-        endpoints = fallback_endpoints or ANTIGRAVITY_ENDPOINT_FALLBACKS
+        endpoints = self.endpoint_health.order(fallback_endpoints or ANTIGRAVITY_ENDPOINT_FALLBACKS)
         last_error = None
         
+        if self.hedging is not None and len(endpoints) > 1:
+            response, last_error, used = await self._execute_hedged(request, endpoints[0], endpoints[1])
+            if response is not None:
+                return response
+            endpoints = endpoints[used:]
+        
         for endpoint in endpoints:
-            # Update URL for this endpoint
-            url = request.url
-            for ep in ANTIGRAVITY_ENDPOINT_FALLBACKS + [GEMINI_CLI_ENDPOINT]:
-                if ep in url:
-                    url = url.replace(ep, endpoint)
-                    break
-            
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                try:
-                    response = await client.request(
-                        method=request.method,
-                        url=url,
-                        headers=request.headers,
-                        content=request.body,
-                    )
-                    
-                    # Handle rate limiting
-                    if response.status_code == 429:
-                        retry_after = parse_retry_after(response) or 60000
-                        body = {}
-                        try:
-                            body = response.json() if response.text else {}
-                        except Exception:
-                            pass
-                        return AntigravityResponse(
-                            success=False,
-                            status_code=429,
-                            headers=dict(response.headers),
-                            body=body,
-                            error=f"Rate limited: {response.text[:500] if response.text else 'No details'}",
-                            retry_after_ms=retry_after,
-                        )
-                    
-                    # Try next endpoint on server errors
-                    if response.status_code in (403, 404, 500, 502, 503, 504):
-                        last_error = f"HTTP {response.status_code}"
-                        continue
-                    
-                    # Success or client error
-                    if request.streaming:
-                        body = parse_sse_response(response.text)
-                    else:
-                        body = response.json() if response.text else {}
-                    
-                    return AntigravityResponse(
-                        success=response.status_code == 200,
-                        status_code=response.status_code,
-                        headers=dict(response.headers),
-                        body=body,
-                        error=None if response.status_code == 200 else f"HTTP {response.status_code}",
-                    )
-                
-                except httpx.TimeoutException:
-                    last_error = "Request timed out"
-                    continue
-                except Exception as e:
-                    last_error = str(e)
-                    continue
+            response, error = await self._execute_once(request, endpoint)
+            if response is not None:
+                return response
+            last_error = error
         
         # All endpoints failed
         return AntigravityResponse(
@@ -717,6 +1005,164 @@ class AntigravityClient:
             error=last_error or "All endpoints failed",
         )
     
+    async def _execute_once(
+        self,
+        request: PreparedRequest,
+        endpoint: str,
+        headers_received: Optional[asyncio.Event] = None,
+    ) -> Tuple[Optional[AntigravityResponse], Optional[str]]:
+        """
+        Send a prepared request to one endpoint.
+        
+        Args:
+            request: PreparedRequest to execute
+            endpoint: Endpoint to send it to
+            headers_received: Optional event set once response headers arrive
+            
+        Returns:
+            (response, None) for a final response (success, rate limit or client
+            error), or (None, error) when the next endpoint should be tried
+        """
+        url = self._url_for_endpoint(request.url, endpoint)
+        client = self.http_client
+        
+        try:
+            async with self._stream_slot(url):
+                start = time.monotonic()
+                response = await client.send(
+                    client.build_request(
+                        method=request.method,
+                        url=url,
+                        headers=request.headers,
+                        content=request.body,
+                        timeout=httpx.Timeout(
+                            self.timeout,
+                            connect=self.get_timeouts(request.requested_model).connect,
+                        ),
+                    ),
+                    stream=True,
+                )
+                latency = time.monotonic() - start
+                if headers_received is not None:
+                    headers_received.set()
+                try:
+                    await response.aread()
+                finally:
+                    await response.aclose()
+            self._note_http_version(response)
+            
+            # Try next endpoint on server errors
+            if response.status_code in (403, 404, 500, 502, 503, 504):
+                self.endpoint_health.record_failure(endpoint)
+                return None, f"HTTP {response.status_code}"
+            
+            self.endpoint_health.record_success(endpoint, latency)
+            if self.hedging is not None:
+                self.hedging.record(endpoint, latency)
+            
+            # Handle rate limiting
+            if response.status_code == 429:
+                retry_after = parse_retry_after(response) or 60000
+                body = {}
+                try:
+                    body = response.json() if response.text else {}
+                except Exception:
+                    pass
+                return AntigravityResponse(
+                    success=False,
+                    status_code=429,
+                    headers=dict(response.headers),
+                    body=body,
+                    error=f"Rate limited: {response.text[:500] if response.text else 'No details'}",
+                    retry_after_ms=retry_after,
+                ), None
+            
+            # Success or client error
+            if request.streaming:
+                body = parse_sse_response(response.content)
+            else:
+                body = response.json() if response.text else {}
+            
+            return AntigravityResponse(
+                success=response.status_code == 200,
+                status_code=response.status_code,
+                headers=dict(response.headers),
+                body=body,
+                error=None if response.status_code == 200 else f"HTTP {response.status_code}",
+            ), None
+        
+        except httpx.TimeoutException:
+            self.endpoint_health.record_failure(endpoint)
+            return None, "Request timed out"
+        except httpx.RemoteProtocolError as e:
+            self.endpoint_health.record_failure(endpoint)
+            self._downgrade_to_http1(e)
+            return None, str(e)
+        except Exception as e:
+            self.endpoint_health.record_failure(endpoint)
+            return None, str(e)
+    
+    async def _execute_hedged(
+        self,
+        request: PreparedRequest,
+        primary: str,
+        secondary: str,
+    ) -> Tuple[Optional[AntigravityResponse], Optional[str], int]:
+        """
+        Send a request to primary, hedging to secondary if headers are late.
+        
+        The first successful response wins and the other request is cancelled.
+        
+        Args:
+            request: PreparedRequest to execute
+            primary: First endpoint to try
+            secondary: Endpoint for the hedged request
+            
+        Returns:
+            (final response or None, last error, number of endpoints used)
+        """
+        hedging = self.hedging
+        hedging.on_request()
+        delay = hedging.delay(primary)
+        headers_received = asyncio.Event()
+        tasks = [asyncio.create_task(self._execute_once(request, primary, headers_received))]
+        
+        try:
+            if delay is not None:
+                waiter = asyncio.create_task(headers_received.wait())
+                try:
+                    await asyncio.wait([tasks[0], waiter], timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    waiter.cancel()
+            
+            if delay is None or headers_received.is_set() or tasks[0].done() or not hedging.try_hedge():
+                response, error = await tasks[0]
+                return response, error, 1
+            
+            tasks.append(asyncio.create_task(self._execute_once(request, secondary)))
+            fallback: Optional[AntigravityResponse] = None
+            last_error: Optional[str] = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    response, error = task.result()
+                    if response is not None and response.success:
+                        if task is tasks[1]:
+                            hedging.hedge_wins += 1
+                        return response, None, 2
+                    if response is not None:
+                        fallback = fallback or response  # Rate limit or client error
+                    else:
+                        last_error = error
+            return fallback, last_error, 2
+        finally:
+            losers = [task for task in tasks if not task.done()]
+            for task in losers:
+                task.cancel()
+            if losers:
+                await asyncio.gather(*losers, return_exceptions=True)
+    
     async def generate_content(
         self,
         model: str,
@@ -764,6 +1210,7 @@ class AntigravityClient:
         self,
         request: PreparedRequest,
         fallback_endpoints: Optional[List[str]] = None,
+        timeouts: Optional[StreamTimeouts] = None,
     ):
         """
         Execute a prepared request and yield SSE chunks in real-time.
@@ -774,28 +1221,57 @@ class AntigravityClient:
         Args:
             request: PreparedRequest to execute (must have streaming=True)
             fallback_endpoints: Optional list of fallback endpoints
+            timeouts: Optional per-call timeouts (see StreamTimeouts)
             
         Yields:
             Dict containing either 'chunk' (parsed SSE event) or 'error' (error info)
         """
-        endpoints = fallback_endpoints or ANTIGRAVITY_ENDPOINT_FALLBACKS
+        endpoints = self.endpoint_health.order(fallback_endpoints or ANTIGRAVITY_ENDPOINT_FALLBACKS)
+        timeouts = self.get_timeouts(request.requested_model, timeouts)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeouts.total if timeouts.total is not None else None
+        
+        def limit(seconds: Optional[float]) -> Optional[float]:
+            """Cap a timeout at the time left before the overall deadline."""
+            if deadline is None:
+                return seconds
+            left = max(0.0, deadline - loop.time())
+            return left if seconds is None else min(seconds, left)
         
         for endpoint in endpoints:
-            # Update URL for this endpoint
-            url = request.url
-            for ep in ANTIGRAVITY_ENDPOINT_FALLBACKS + [GEMINI_CLI_ENDPOINT]:
-                if ep in url:
-                    url = url.replace(ep, endpoint)
-                    break
+            if deadline is not None and loop.time() >= deadline:
+                break
+            
+            url = self._url_for_endpoint(request.url, endpoint)
+            client = self.http_client
+            started = False  # Body bytes received; from here on, never fail over
             
             try:
-                async with httpx.AsyncClient(timeout=self.timeout) as client:
-                    async with client.stream(
-                        method=request.method,
-                        url=url,
-                        headers=request.headers,
-                        content=request.body,
-                    ) as response:
+                async with self._stream_slot(url):
+                    start = loop.time()
+                    first_byte_by = start + timeouts.first_byte if timeouts.first_byte is not None else None
+                    response = await asyncio.wait_for(
+                        client.send(
+                            client.build_request(
+                                method=request.method,
+                                url=url,
+                                headers=request.headers,
+                                content=request.body,
+                                timeout=httpx.Timeout(None, connect=timeouts.connect),
+                            ),
+                            stream=True,
+                        ),
+                        limit(timeouts.first_byte),
+                    )
+                    
+                    try:
+                        self._note_http_version(response)
+                        
+                        if response.status_code in (403, 404, 500, 502, 503, 504):
+                            self.endpoint_health.record_failure(endpoint)
+                        else:
+                            self.endpoint_health.record_success(endpoint, loop.time() - start)
+                        
                         # Handle rate limiting
                         if response.status_code == 429:
                             # Try to read the body for retry info
@@ -829,38 +1305,87 @@ class AntigravityClient:
                             return
                         
                         # Stream SSE events
-                        buffer = ""
-                        async for chunk in response.aiter_text():
-                            buffer += chunk
+                        decoder = SSEDecoder()
+                        chunks = response.aiter_bytes()
+                        while True:
+                            if started:
+                                wait = limit(timeouts.idle)
+                            elif first_byte_by is not None:
+                                wait = limit(max(0.0, first_byte_by - loop.time()))
+                            else:
+                                wait = limit(None)
+                            
+                            try:
+                                chunk = await asyncio.wait_for(chunks.__anext__(), wait)
+                            except StopAsyncIteration:
+                                break
+                            started = True
                             
-                            # Process complete SSE events
-                            while "\n" in buffer:
-                                line, buffer = buffer.split("\n", 1)
-                                line = line.strip()
+                            for sse_event in decoder.feed(chunk):
+                                data = sse_event.data.strip()
+                                
+                                if data == "[DONE]":
+                                    yield {"done": True}
+                                    return
                                 
-                                if line.startswith("data:"):
-                                    data = line[5:].strip()
-                                    
-                                    if data == "[DONE]":
-                                        yield {"done": True}
-                                        return
-                                    
-                                    if data:
-                                        try:
-                                            event = json.loads(data)
-                                            yield {"chunk": event}
-                                        except json.JSONDecodeError:
-                                            pass
+                                for event in parse_sse_json(data) if data else ():
+                                    yield {"chunk": event}
+                        
+                        for sse_event in decoder.flush():
+                            data = sse_event.data.strip()
+                            if data == "[DONE]":
+                                break
+                            for event in parse_sse_json(data) if data else ():
+                                yield {"chunk": event}
                         
                         # Successful stream completed
                         yield {"done": True}
                         return
-                        
+                    finally:
+                        await response.aclose()
+                    
+            except asyncio.TimeoutError:
+                if started or (deadline is not None and loop.time() >= deadline):
+                    expired = "total" if deadline is not None and loop.time() >= deadline else "idle"
+                    yield {
+                        "error": True,
+                        "status_code": 0,
+                        "message": f"Stream {expired} timeout",
+                        "timeout": expired,
+                    }
+                    return
+                # Connect or first byte too slow - try next endpoint
+                self.endpoint_health.record_failure(endpoint)
+                continue
             except httpx.TimeoutException:
+                self.endpoint_health.record_failure(endpoint)
+                if started:
+                    yield {"error": True, "status_code": 0, "message": "Stream read timed out"}
+                    return
+                continue
+            except httpx.RemoteProtocolError as e:
+                self.endpoint_health.record_failure(endpoint)
+                if started:
+                    yield {"error": True, "status_code": 0, "message": f"Stream interrupted: {e}"}
+                    return
+                self._downgrade_to_http1(e)
                 continue
             except Exception as e:
+                self.endpoint_health.record_failure(endpoint)
+                if started:
+                    yield {"error": True, "status_code": 0, "message": f"Stream interrupted: {e}"}
+                    return
                 continue
         
+        if deadline is not None and loop.time() >= deadline:
+            yield {
+                "error": True,
+                "status_code": 0,
+                "message": "Stream total timeout",
+                "timeout": "total",
+            }
+            return
+        
         # All endpoints failed
         yield {
             "error": True,
@@ -877,6 +1402,7 @@ class AntigravityClient:
         system_instruction: Optional[str] = None,
         generation_config: Optional[Dict[str, Any]] = None,
         header_style: Optional[str] = None,
+        timeouts: Optional[StreamTimeouts] = None,
     ):
         """
         Generate content with real-time streaming.
@@ -891,6 +1417,7 @@ class AntigravityClient:
             system_instruction: Optional system instruction
             generation_config: Optional generation config
             header_style: Optional header style override
+            timeouts: Optional per-call timeouts (see StreamTimeouts)
             
         Yields:
             Dict with 'text' (chunk text), 'error' (error info), or 'done' (completion)
@@ -906,7 +1433,7 @@ class AntigravityClient:
             header_style=header_style,
         )
         
-        async for event in self.stream_execute(request):
+        async for event in self.stream_execute(request, timeouts=timeouts):
             if "chunk" in event:
                 text = extract_text_from_sse_chunk(event["chunk"])
                 if text:
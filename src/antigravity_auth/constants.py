@@ -53,6 +53,27 @@ ANTIGRAVITY_LOAD_ENDPOINTS = [
 # Gemini CLI endpoint (for non-:antigravity models)
 GEMINI_CLI_ENDPOINT = ANTIGRAVITY_ENDPOINT_PROD
 
+# Consecutive failures (5xx, timeouts, transport errors) that open an endpoint's circuit
+ENDPOINT_FAILURE_THRESHOLD = 3
+
+# How long an open endpoint circuit is skipped before a half-open probe
+ENDPOINT_CIRCUIT_OPEN_SECONDS = 30.0
+
+# Smoothing factor for endpoint latency and error-rate tracking
+ENDPOINT_EWMA_ALPHA = 0.2
+
+# Hedged requests: response-time percentile after which a second endpoint is tried
+HEDGE_DELAY_PERCENTILE = 0.95
+
+# Maximum hedged requests as a fraction of all requests
+HEDGE_BUDGET = 0.05
+
+# Response times needed from an endpoint before requests to it are hedged
+HEDGE_MIN_SAMPLES = 20
+
+# Recent response times kept per endpoint for the hedge delay
+HEDGE_SAMPLE_WINDOW = 200
+
 # =============================================================================
 # Request Headers
 # =============================================================================
@@ -84,6 +105,34 @@ DEFAULT_MODEL = "gemini-3-pro"
 # Token expiry buffer (refresh token 1 minute before expiry)
 ACCESS_TOKEN_EXPIRY_BUFFER_MS = 60 * 1000  # 1 minute
 
+# Refresh-ahead: renew access tokens after this fraction of their lifetime
+DEFAULT_REFRESH_AHEAD_FRACTION = 0.8
+
+# Longest the refresh-ahead task sleeps before re-checking the token cache
+REFRESH_AHEAD_MAX_SLEEP_MS = 30_000  # 30 seconds
+
+# Backoff before the refresh-ahead task retries a failed renewal (doubles per failure)
+REFRESH_AHEAD_RETRY_BASE_MS = 5000  # 5 seconds
+REFRESH_AHEAD_RETRY_MAX_MS = 300_000  # 5 minutes
+
+# Write-behind window for account state (rate limits, active index) on disk
+DEFAULT_SAVE_DEBOUNCE_MS = 1000  # 1 second
+
+# How often in-flight counts held by exited processes are reclaimed from the shared state table
+SHARED_STATE_REAP_INTERVAL_MS = 30_000  # 30 seconds
+
+# Smallest time left before a request's deadline that is worth another attempt
+MIN_ATTEMPT_SECONDS = 1.0
+
+# How often a running service checks the accounts file for external changes
+DEFAULT_RELOAD_INTERVAL_MS = 2000  # 2 seconds
+
+# Accounts refreshed at once during startup warm-up
+WARMUP_CONCURRENCY = 4
+
+# Longest startup warm-up waits before reporting ready anyway
+WARMUP_TIMEOUT_SECONDS = 30.0
+
 # =============================================================================
 # Rate Limiting
 # =============================================================================
@@ -97,6 +146,12 @@ RATE_LIMIT_STATE_RESET_MS = 120_000  # 2 minutes
 # Short retry threshold (wait and retry same account if below this)
 SHORT_RETRY_THRESHOLD_MS = 5000  # 5 seconds
 
+# Smoothing factor for the per-account 429 rate used by weighted selection
+RATE_LIMIT_EWMA_ALPHA = 0.2
+
+# Floor for an account's weight in weighted selection (keeps every account in rotation)
+MIN_SELECTION_WEIGHT = 0.05
+
 # Capacity backoff tiers
 CAPACITY_BACKOFF_TIERS_MS = [5000, 10000, 20000, 30000, 60000]
 
@@ -109,6 +164,13 @@ FAILURE_COOLDOWN_MS = 30_000  # 30 seconds
 # Reset failure count after this period of no failures
 FAILURE_STATE_RESET_MS = 120_000  # 2 minutes
 
+# =============================================================================
+# Account Selection
+# =============================================================================
+
+# Default account selection strategy (sticky, round-robin, least-loaded, weighted)
+DEFAULT_SELECTION_STRATEGY = "sticky"
+
 # =============================================================================
 # Provider ID
 # =============================================================================
@@ -0,0 +1,259 @@
+"""
+Antigravity Endpoint Health
+
+This module tracks the health of each API endpoint (latency, error rate and a
+circuit breaker) so requests try the fastest healthy endpoint first and skip
+endpoints that are failing, instead of always walking the fixed fallback order.
+It also holds the policy for hedging non-streaming requests across endpoints.
+"""
+
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional
+
+from .constants import (
+    ENDPOINT_CIRCUIT_OPEN_SECONDS,
+    ENDPOINT_EWMA_ALPHA,
+    ENDPOINT_FAILURE_THRESHOLD,
+    HEDGE_BUDGET,
+    HEDGE_DELAY_PERCENTILE,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_SAMPLE_WINDOW,
+)
+
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half-open"
+
+
+@dataclass
+class EndpointHealth:
+    """Health of a single endpoint."""
+    endpoint: str
+    latency_ms: Optional[float] = None  # EWMA of time to response headers
+    error_rate: float = 0.0  # EWMA of the failure indicator (0..1)
+    consecutive_failures: int = 0
+    state: str = CIRCUIT_CLOSED
+    opened_at: float = 0.0  # time.monotonic() when the circuit last opened
+    probe_started_at: Optional[float] = None  # Set while a half-open probe is in flight
+    successes: int = 0
+    failures: int = 0
+
+    def score(self) -> float:
+        """Ordering score (lower is better); unmeasured endpoints sort last."""
+        if self.latency_ms is None:
+            return float("inf")
+        return self.latency_ms * (1 + 4 * self.error_rate)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "endpoint": self.endpoint,
+            "state": self.state,
+            "latencyMs": round(self.latency_ms, 1) if self.latency_ms is not None else None,
+            "errorRate": round(self.error_rate, 3),
+            "consecutiveFailures": self.consecutive_failures,
+            "successes": self.successes,
+            "failures": self.failures,
+        }
+
+
+class EndpointHealthTracker:
+    """
+    Per-endpoint health model with a circuit breaker.
+
+    An endpoint's circuit opens after failure_threshold consecutive failures
+    (5xx, 403/404, timeouts, transport errors) and it is skipped for
+    open_seconds. It then goes half-open: the next request probes it first,
+    and the probe's outcome closes the circuit or opens it again.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = ENDPOINT_FAILURE_THRESHOLD,
+        open_seconds: float = ENDPOINT_CIRCUIT_OPEN_SECONDS,
+        alpha: float = ENDPOINT_EWMA_ALPHA,
+        quiet_mode: bool = False,
+    ):
+        """
+        Initialize the tracker.
+
+        Args:
+            failure_threshold: Consecutive failures that open an endpoint's circuit
+            open_seconds: How long an open circuit is skipped before a probe
+            alpha: EWMA smoothing factor for latency and error rate
+            quiet_mode: Suppress the message printed when a circuit opens
+        """
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.alpha = alpha
+        self.quiet_mode = quiet_mode
+        self._health: Dict[str, EndpointHealth] = {}
+
+    def get(self, endpoint: str) -> EndpointHealth:
+        """Get (creating if needed) the health record for an endpoint."""
+        health = self._health.get(endpoint)
+        if health is None:
+            health = EndpointHealth(endpoint=endpoint)
+            self._health[endpoint] = health
+        return health
+
+    def order(self, endpoints: List[str]) -> List[str]:
+        """
+        Order endpoints for one request.
+
+        A half-open endpoint due for a probe comes first, then closed endpoints
+        by score (ties keep the given order), and open circuits are left out.
+        If every circuit is open, all endpoints are returned in the given
+        order so requests are never refused outright.
+
+        Args:
+            endpoints: Endpoints in their configured fallback order
+
+        Returns:
+            Endpoints to try, in order
+        """
+        now = time.monotonic()
+        probes: List[str] = []
+        closed: List[str] = []
+
+        for endpoint in endpoints:
+            health = self.get(endpoint)
+            if health.state == CIRCUIT_CLOSED:
+                closed.append(endpoint)
+                continue
+
+            if health.state == CIRCUIT_OPEN and now - health.opened_at >= self.open_seconds:
+                health.state = CIRCUIT_HALF_OPEN
+
+            if health.state == CIRCUIT_HALF_OPEN and not probes and (
+                health.probe_started_at is None
+                or now - health.probe_started_at >= self.open_seconds  # Abandoned probe
+            ):
+                health.probe_started_at = now
+                probes.append(endpoint)
+
+        closed.sort(key=lambda endpoint: self._health[endpoint].score())
+        ordered = probes + closed
+        return ordered or list(endpoints)
+
+    def is_available(self, endpoint: str) -> bool:
+        """Check if an endpoint would be tried (its circuit is not open, or is due a probe)."""
+        health = self.get(endpoint)
+        return health.state != CIRCUIT_OPEN or time.monotonic() - health.opened_at >= self.open_seconds
+
+    def record_success(self, endpoint: str, latency_seconds: float) -> None:
+        """
+        Record that an endpoint answered (any status other than a server error).
+
+        Args:
+            endpoint: Endpoint URL
+            latency_seconds: Time until response headers arrived
+        """
+        health = self.get(endpoint)
+        latency_ms = latency_seconds * 1000
+        if health.latency_ms is None:
+            health.latency_ms = latency_ms
+        else:
+            health.latency_ms += self.alpha * (latency_ms - health.latency_ms)
+        health.error_rate *= 1 - self.alpha
+        health.consecutive_failures = 0
+        health.successes += 1
+        health.state = CIRCUIT_CLOSED
+        health.probe_started_at = None
+
+    def record_failure(self, endpoint: str) -> None:
+        """
+        Record a server error, timeout or transport failure for an endpoint.
+
+        Args:
+            endpoint: Endpoint URL
+        """
+        health = self.get(endpoint)
+        health.error_rate += self.alpha * (1 - health.error_rate)
+        health.consecutive_failures += 1
+        health.failures += 1
+
+        if health.state == CIRCUIT_HALF_OPEN or health.consecutive_failures >= self.failure_threshold:
+            if health.state != CIRCUIT_OPEN and not self.quiet_mode:
+                print(f"[antigravity] Endpoint {endpoint} is failing; skipping it for {self.open_seconds:.0f}s")
+            health.state = CIRCUIT_OPEN
+            health.opened_at = time.monotonic()
+            health.probe_started_at = None
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Get the health of every endpoint seen so far, for inspection."""
+        return [health.to_dict() for health in self._health.values()]
+
+
+class HedgePolicy:
+    """
+    When to send a hedged (duplicate) request to a second endpoint.
+
+    The hedge delay is a percentile of the primary endpoint's recent response
+    times, so only the slowest requests are hedged. Extra requests are capped
+    by a token bucket: every request earns `budget` tokens and every hedge
+    spends one, so hedges never exceed that fraction of traffic.
+    """
+
+    def __init__(
+        self,
+        percentile: float = HEDGE_DELAY_PERCENTILE,
+        budget: float = HEDGE_BUDGET,
+        min_samples: int = HEDGE_MIN_SAMPLES,
+        window: int = HEDGE_SAMPLE_WINDOW,
+        max_burst: float = 10.0,
+    ):
+        """
+        Initialize the policy.
+
+        Args:
+            percentile: Response-time percentile (0..1) after which to hedge
+            budget: Maximum hedges as a fraction of requests (e.g. 0.05 = 5%)
+            min_samples: Responses needed from an endpoint before hedging it
+            window: Number of recent response times kept per endpoint
+            max_burst: Cap on saved-up hedge tokens
+        """
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.window = window
+        self.max_burst = max_burst
+        self._samples: Dict[str, Deque[float]] = {}
+        self._tokens = 0.0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def record(self, endpoint: str, latency_seconds: float) -> None:
+        """Record a response time for an endpoint."""
+        samples = self._samples.get(endpoint)
+        if samples is None:
+            samples = deque(maxlen=self.window)
+            self._samples[endpoint] = samples
+        samples.append(latency_seconds)
+
+    def delay(self, endpoint: str) -> Optional[float]:
+        """
+        Get how long to wait for the endpoint before hedging.
+
+        Returns:
+            Delay in seconds, or None if there are too few samples to hedge
+        """
+        samples = self._samples.get(endpoint)
+        if samples is None or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(self.percentile * len(ordered)))]
+
+    def on_request(self) -> None:
+        """Earn budget for one primary request."""
+        self._tokens = min(self.max_burst, self._tokens + self.budget)
+
+    def try_hedge(self) -> bool:
+        """Spend one hedge token if available."""
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        self.hedges += 1
+        return True
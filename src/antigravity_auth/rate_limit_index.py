@@ -0,0 +1,174 @@
+"""
+Antigravity Rate Limit Index
+
+This module keeps account availability for one quota in structures that answer
+"next available account after position p" and "how long until any account is
+available" in O(log n), so selection cost does not grow with the pool size.
+"""
+
+import heapq
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+class FenwickTree:
+    """Binary indexed tree over 0/1 flags, with k-th one lookup."""
+
+    def __init__(self, flags: Sequence[int]):
+        self._size = len(flags)
+        self._tree = [0] * (self._size + 1)
+        for i, flag in enumerate(flags, start=1):
+            self._tree[i] += flag
+            parent = i + (i & -i)
+            if parent <= self._size:
+                self._tree[parent] += self._tree[i]
+        self._high_bit = 1 << (self._size.bit_length() - 1) if self._size else 0
+
+    def add(self, position: int, delta: int) -> None:
+        """Add delta at a 0-based position."""
+        i = position + 1
+        while i <= self._size:
+            self._tree[i] += delta
+            i += i & -i
+
+    def prefix_sum(self, count: int) -> int:
+        """Sum of the first count positions."""
+        total = 0
+        i = count
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def find_kth(self, k: int) -> int:
+        """Get the 0-based position of the k-th one (1-based k <= total)."""
+        position = 0
+        step = self._high_bit
+        while step:
+            nxt = position + step
+            if nxt <= self._size and self._tree[nxt] < k:
+                position = nxt
+                k -= self._tree[nxt]
+            step >>= 1
+        return position
+
+
+class AvailabilityIndex:
+    """
+    Availability of a fixed list of accounts for one quota.
+
+    Each account has an "available at" timestamp (ms); it is available once
+    that time has passed. Blocked accounts sit in a min-heap keyed by that
+    time and are released lazily when a query observes that their time has
+    passed. Available positions are tracked in a Fenwick tree, so finding the
+    next available account in rotation order is a logarithmic search.
+    """
+
+    def __init__(self, account_ids: Sequence[str], available_at: Sequence[int], now: int):
+        """
+        Build the index.
+
+        Args:
+            account_ids: Account IDs in pool order
+            available_at: When each account becomes available (ms timestamp)
+            now: Current time (ms timestamp)
+        """
+        self._ids: List[str] = list(account_ids)
+        self._positions: Dict[str, int] = {account_id: i for i, account_id in enumerate(self._ids)}
+        self._blocked_until: Dict[str, int] = {}
+        self._heap: List[Tuple[int, str]] = []
+
+        flags = []
+        for account_id, until in zip(self._ids, available_at):
+            if until > now:
+                self._blocked_until[account_id] = until
+                self._heap.append((until, account_id))
+                flags.append(0)
+            else:
+                flags.append(1)
+        heapq.heapify(self._heap)
+        self._tree = FenwickTree(flags)
+        self._available = sum(flags)
+
+    @property
+    def available_count(self) -> int:
+        """Number of accounts available as of the last refresh()."""
+        return self._available
+
+    def refresh(self, now: int) -> None:
+        """Release accounts whose blocked-until time has passed."""
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            until, account_id = heapq.heappop(heap)
+            if self._blocked_until.get(account_id) == until:
+                del self._blocked_until[account_id]
+                self._tree.add(self._positions[account_id], 1)
+                self._available += 1
+
+    def update(self, account_id: str, available_at: int, now: int) -> None:
+        """
+        Record a new available-at time for an account.
+
+        Args:
+            account_id: Account ID
+            available_at: When the account becomes available (ms timestamp)
+            now: Current time (ms timestamp)
+        """
+        position = self._positions.get(account_id)
+        if position is None:
+            return
+
+        was_blocked = account_id in self._blocked_until
+        if available_at > now:
+            if self._blocked_until.get(account_id) == available_at:
+                return
+            self._blocked_until[account_id] = available_at
+            heapq.heappush(self._heap, (available_at, account_id))
+            if not was_blocked:
+                self._tree.add(position, -1)
+                self._available -= 1
+        elif was_blocked:
+            # Stale heap entry is skipped by refresh()
+            del self._blocked_until[account_id]
+            self._tree.add(position, 1)
+            self._available += 1
+
+    def is_available(self, position: int) -> bool:
+        """Check if the account at a position is available."""
+        return self._ids[position] not in self._blocked_until
+
+    def next_available(self, start: int) -> Optional[int]:
+        """
+        Find the first available position at or after start, wrapping around.
+
+        Args:
+            start: Position to start from
+
+        Returns:
+            Position of an available account, or None if none are available
+        """
+        if not self._available:
+            return None
+        before = self._tree.prefix_sum(start % len(self._ids)) if self._ids else 0
+        k = before + 1 if before < self._available else 1
+        return self._tree.find_kth(k)
+
+    def min_wait(self, now: int) -> Optional[int]:
+        """
+        Get the time until the soonest blocked account becomes available.
+
+        Args:
+            now: Current time (ms timestamp)
+
+        Returns:
+            0 if an account is available, the wait in ms otherwise, or None if
+            the index is empty
+        """
+        if self._available:
+            return 0
+        heap = self._heap
+        while heap and self._blocked_until.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+        if not heap:
+            return None
+        return max(0, heap[0][0] - now)
+
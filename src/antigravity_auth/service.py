@@ -7,13 +7,17 @@ and multi-account rotation.
 """
 
 import asyncio
+import os
 import time
-from typing import Any, Dict, List, Optional
+from contextlib import aclosing
+from dataclasses import dataclass, field, replace
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Union
 
-from .accounts import AccountManager, ManagedAccount, ModelFamily, HeaderStyle
+from .accounts import AccountManager, ManagedAccount, ModelFamily, HeaderStyle, SelectionStrategy
 from .client import (
     AntigravityClient,
     AntigravityResponse,
+    StreamTimeouts,
     extract_text_from_response,
     extract_images_from_response,
     get_header_style_from_model,
@@ -23,15 +27,26 @@ from .client import (
 )
 from .constants import (
     ANTIGRAVITY_DEFAULT_PROJECT_ID,
+    ANTIGRAVITY_ENDPOINT_FALLBACKS,
     DEFAULT_MODEL,
+    DEFAULT_RELOAD_INTERVAL_MS,
+    DEFAULT_SAVE_DEBOUNCE_MS,
+    DEFAULT_SELECTION_STRATEGY,
     FAILURE_COOLDOWN_MS,
     HEADER_STYLE_ANTIGRAVITY,
     MAX_CONSECUTIVE_FAILURES,
+    MIN_ATTEMPT_SECONDS,
     MODEL_FAMILY_CLAUDE,
     MODEL_FAMILY_GEMINI,
+    REFRESH_AHEAD_MAX_SLEEP_MS,
+    REFRESH_AHEAD_RETRY_BASE_MS,
+    REFRESH_AHEAD_RETRY_MAX_MS,
     SHORT_RETRY_THRESHOLD_MS,
+    WARMUP_CONCURRENCY,
+    WARMUP_TIMEOUT_SECONDS,
 )
-from .storage import load_accounts
+from .storage import get_shared_state_path, get_token_cache_path, load_accounts
+from .token_cache import AccessTokenCache, CachedToken
 from .token import (
     AuthDetails,
     TokenRefreshError,
@@ -64,6 +79,117 @@ class TokenRefreshFailedError(AntigravityError):
     pass
 
 
+class DeadlineExceededError(AntigravityError):
+    """Raised when a request's timeout cannot cover another attempt."""
+    pass
+
+
+class InvalidRequestError(AntigravityError):
+    """Raised when the API rejects the request itself (e.g. HTTP 400), whichever account sends it."""
+    
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def is_request_error(status_code: int) -> bool:
+    """Check if a status means the request itself is at fault, so no other account would fix it."""
+    return 400 <= status_code < 500 and status_code not in (401, 403, 408, 429)
+
+
+def is_account_failure(status_code: int) -> bool:
+    """Check if a status counts toward an account's consecutive failures (auth, server, transport)."""
+    return status_code in (0, 401, 403, 408) or status_code >= 500
+
+
+def get_deadline(timeout: Optional[float]) -> Optional[float]:
+    """Convert a timeout in seconds to a time.monotonic() deadline."""
+    return time.monotonic() + timeout if timeout is not None else None
+
+
+def remaining_seconds(deadline: Optional[float]) -> Optional[float]:
+    """Get the seconds left before a deadline (None if there is no deadline)."""
+    return max(0.0, deadline - time.monotonic()) if deadline is not None else None
+
+
+def build_user_contents(prompt: str) -> List[Dict[str, Any]]:
+    """
+    Build single-turn contents in Gemini format.
+    
+    Args:
+        prompt: The user prompt
+        
+    Returns:
+        Contents list with one user message
+    """
+    return [
+        {
+            "role": "user",
+            "parts": [{"text": prompt}]
+        }
+    ]
+
+
+@dataclass
+class RefreshStats:
+    """Counters for access token refreshes."""
+    refreshes: int = 0
+    failures: int = 0
+    coalesced_waiters: int = 0
+    refresh_ahead: int = 0
+    cache_hits: int = 0  # Refreshes avoided by the on-disk token cache
+    total_latency_ms: float = 0.0
+    max_latency_ms: float = 0.0
+    
+    @property
+    def avg_latency_ms(self) -> float:
+        attempts = self.refreshes + self.failures
+        return self.total_latency_ms / attempts if attempts else 0.0
+    
+    def record(self, elapsed_seconds: float, success: bool) -> None:
+        """Record one refresh round trip."""
+        latency_ms = elapsed_seconds * 1000
+        if success:
+            self.refreshes += 1
+        else:
+            self.failures += 1
+        self.total_latency_ms += latency_ms
+        self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+    
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "coalescedWaiters": self.coalesced_waiters,
+            "refreshAhead": self.refresh_ahead,
+            "cacheHits": self.cache_hits,
+            "avgLatencyMs": round(self.avg_latency_ms, 1),
+            "maxLatencyMs": round(self.max_latency_ms, 1),
+        }
+
+
+@dataclass
+class RequestMetrics:
+    """Timing for a single generation request."""
+    model: str
+    account_email: Optional[str] = None
+    started_at: float = field(default_factory=time.monotonic)
+    ttfb_ms: Optional[float] = None  # Time until the first text chunk arrived
+    total_ms: Optional[float] = None
+    output_chars: int = 0
+    
+    def mark_first_byte(self) -> None:
+        """Record the arrival of the first chunk (only the first call counts)."""
+        if self.ttfb_ms is None:
+            self.ttfb_ms = (time.monotonic() - self.started_at) * 1000
+    
+    def finish(self, output_chars: int) -> "RequestMetrics":
+        """Record completion of the request."""
+        self.total_ms = (time.monotonic() - self.started_at) * 1000
+        self.output_chars = output_chars
+        return self
+
+
 class AntigravityService:
     """
     Main service for interacting with the Antigravity API.
@@ -79,6 +205,14 @@ class AntigravityService:
         quiet_mode: bool = False,
         quota_fallback: bool = True,
         storage_path: Optional[str] = None,
+        client: Optional[AntigravityClient] = None,
+        refresh_ahead_fraction: Optional[float] = None,
+        metrics_callback: Optional[Callable[[RequestMetrics], None]] = None,
+        save_debounce_ms: int = DEFAULT_SAVE_DEBOUNCE_MS,
+        selection_strategy: Union[SelectionStrategy, Dict[str, SelectionStrategy]] = DEFAULT_SELECTION_STRATEGY,
+        shared_state: Optional[bool] = None,
+        reload_interval_ms: int = DEFAULT_RELOAD_INTERVAL_MS,
+        token_cache: Optional[bool] = None,
     ):
         """
         Initialize the Antigravity service.
@@ -89,131 +223,577 @@ class AntigravityService:
             quiet_mode: Suppress status messages
             quota_fallback: Enable quota fallback (antigravity -> gemini-cli)
             storage_path: Optional custom storage path for accounts
+            client: Optional pre-configured AntigravityClient (e.g. with custom
+                connection pool limits). The service closes it in aclose().
+            refresh_ahead_fraction: Renew cached access tokens in the background
+                once this fraction of their lifetime has elapsed (e.g. 0.8).
+                None disables refresh-ahead.
+            metrics_callback: Optional callable invoked with RequestMetrics
+                (time to first byte, total time) after each successful generation
+            save_debounce_ms: Coalesce account state writes and flush them to
+                disk at most once per this many ms (0 writes on every change)
+            selection_strategy: How accounts are picked for each request
+                ("sticky", "round-robin", "least-loaded" or "weighted"), or a
+                dict of strategies by model family, e.g. {"claude": "weighted"}
+            shared_state: Share rate limits, cooldowns and in-flight counts
+                with other processes on this host through a memory-mapped file
+                next to the accounts file. None reads ANTIGRAVITY_SHARED_STATE.
+            reload_interval_ms: Pick up accounts added or removed in the
+                accounts file (e.g. by auth login/logout in another shell) at
+                most this many ms after the change (0 disables hot reload)
+            token_cache: Keep access tokens in an owner-only file next to the
+                accounts file, so restarts and other local workers reuse them
+                instead of refreshing. None reads ANTIGRAVITY_TOKEN_CACHE.
         """
         self.model = model
         self.max_rate_limit_wait_seconds = max_rate_limit_wait_seconds
         self.quiet_mode = quiet_mode
         self.quota_fallback = quota_fallback
         self.storage_path = storage_path
+        self.save_debounce_ms = save_debounce_ms
+        self.selection_strategy = selection_strategy
+        if shared_state is None:
+            shared_state = os.environ.get("ANTIGRAVITY_SHARED_STATE") == "1"
+        self.shared_state_path = str(get_shared_state_path(storage_path)) if shared_state else None
+        self.reload_interval_ms = reload_interval_ms
         
-        self._client = AntigravityClient()
+        self._client = client or AntigravityClient(quiet_mode=quiet_mode)
         self._account_manager: Optional[AccountManager] = None
-        self._current_auth: Dict[int, AuthDetails] = {}  # Cache auth by account index
+        self._current_auth: Dict[str, AuthDetails] = {}  # Cache auth by account ID
+        
+        # Token refresh coordination
+        self.refresh_ahead_fraction = refresh_ahead_fraction
+        self.refresh_stats = RefreshStats()
+        self._refresh_inflight: Dict[str, asyncio.Task] = {}
+        self._token_issued_at: Dict[str, int] = {}
+        self._refresh_failed: set = set()  # Account IDs whose last refresh failed
+        self._refresh_ahead_task: Optional[asyncio.Task] = None
+        self._refresh_ahead_failures: Dict[str, int] = {}  # Consecutive failed renewals by account ID
+        self._refresh_ahead_retry_at: Dict[str, int] = {}  # No renewal attempt before this (ms)
+        if token_cache is None:
+            token_cache = os.environ.get("ANTIGRAVITY_TOKEN_CACHE") == "1"
+        self._token_cache = AccessTokenCache(get_token_cache_path(storage_path)) if token_cache else None
+        
+        # Request metrics
+        self.metrics_callback = metrics_callback
+        self.last_metrics: Optional[RequestMetrics] = None
+        
+        # Startup warm-up
+        self.warmed_up = False
+        self.warmup_report: Optional[Dict[str, Any]] = None
+    
+    @property
+    def client(self) -> AntigravityClient:
+        """The underlying HTTP client."""
+        return self._client
+    
+    @property
+    def account_manager(self) -> AccountManager:
+        """The account manager (loaded on first access)."""
+        return self._ensure_account_manager()
+    
+    async def aclose(self) -> None:
+        """
+        Stop background token refresh, flush pending account state to disk and
+        release the HTTP connection pool.
+        """
+        if self._refresh_ahead_task is not None:
+            self._refresh_ahead_task.cancel()
+            try:
+                await self._refresh_ahead_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._refresh_ahead_task = None
+        inflight = list(self._refresh_inflight.values())
+        for task in inflight:
+            task.cancel()
+        await asyncio.gather(*inflight, return_exceptions=True)
+        if self._account_manager is not None:
+            await self._account_manager.flush()
+        await self._client.aclose()
+    
+    async def __aenter__(self) -> "AntigravityService":
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+    
+    async def _run_and_close(self, coro):
+        """Run a coroutine and close the pool, for use with asyncio.run()."""
+        try:
+            return await coro
+        finally:
+            await self.aclose()
+    
+    def _record_metrics(self, metrics: RequestMetrics) -> None:
+        """Store metrics for the last request and notify the callback."""
+        self.last_metrics = metrics
+        if self.metrics_callback is not None:
+            self.metrics_callback(metrics)
+    
+    async def load_account_manager(self) -> AccountManager:
+        """
+        Load the account manager without blocking the event loop.
+        
+        Async code paths use this instead of the account_manager property, which
+        reads the accounts file synchronously on first access.
+        
+        Returns:
+            The account manager
+        """
+        if self._account_manager is None:
+            manager = await AccountManager.load_from_disk(
+                storage_path=self.storage_path,
+                save_debounce_ms=self.save_debounce_ms,
+                strategy=self.selection_strategy,
+                shared_state_path=self.shared_state_path,
+                reload_interval_ms=self.reload_interval_ms,
+            )
+            # Another task may have finished loading while we waited
+            if self._account_manager is None:
+                self._account_manager = manager
+        return self._account_manager
     
     def _ensure_account_manager(self) -> AccountManager:
         """Ensure the account manager is loaded."""
         if self._account_manager is None:
-            self._account_manager = AccountManager(storage_path=self.storage_path)
+            self._account_manager = AccountManager(
+                storage_path=self.storage_path,
+                save_debounce_ms=self.save_debounce_ms,
+                strategy=self.selection_strategy,
+                shared_state_path=self.shared_state_path,
+                reload_interval_ms=self.reload_interval_ms,
+            )
         return self._account_manager
     
     async def _get_auth_for_account(self, account: ManagedAccount) -> Optional[AuthDetails]:
         """
         Get or refresh auth details for an account.
         
+        Concurrent callers for the same account share a single in-flight refresh.
+        
         Args:
             account: Account to get auth for
             
         Returns:
             AuthDetails or None if refresh failed
         """
+        self._ensure_refresh_ahead()
+        
         # Check cache
-        cached = self._current_auth.get(account.index)
-        if cached and not is_token_expired(cached):
-            return cached
+        cached = self._current_auth.get(account.id)
+        if cached and not is_token_expired(cached) and (
+            parse_refresh_parts(cached.refresh).refresh_token == account.refresh_token
+        ):
+            return cached  # Still issued for the current refresh token (not replaced by a re-login)
+        
+        return await self._refresh_single_flight(account)
+    
+    async def _refresh_single_flight(self, account: ManagedAccount) -> Optional[AuthDetails]:
+        """
+        Refresh an account's access token, coalescing concurrent refreshes.
+        
+        The refresh runs in its own task, which every caller (the first one
+        included) awaits through asyncio.shield(): a caller that is cancelled
+        stops waiting, but the refresh carries on for the others.
+        
+        Args:
+            account: Account to refresh
+            
+        Returns:
+            AuthDetails or None if refresh failed
+        """
+        key = account.id
+        task = self._refresh_inflight.get(key)
+        if task is not None:
+            self.refresh_stats.coalesced_waiters += 1
+        else:
+            task = asyncio.get_running_loop().create_task(self._refresh_account(account))
+            self._refresh_inflight[key] = task
+            
+            def on_done(done: asyncio.Task) -> None:
+                if self._refresh_inflight.get(key) is done:
+                    del self._refresh_inflight[key]
+                if not done.cancelled():
+                    done.exception()  # Mark retrieved when nobody is left waiting
+            
+            task.add_done_callback(on_done)
+        return await asyncio.shield(task)
+    
+    async def _refresh_account(self, account: ManagedAccount) -> Optional[AuthDetails]:
+        """
+        Refresh an account's access token against the OAuth endpoint.
+        
+        Args:
+            account: Account to refresh
+            
+        Returns:
+            AuthDetails or None if refresh failed
+            
+        Raises:
+            TokenRefreshFailedError: If the refresh token has been revoked
+        """
+        manager = await self.load_account_manager()
+        # Another process may already have rotated this account's refresh token
+        await manager.adopt_rotated_tokens()
+        
+        if self._token_cache is not None and await self._load_cached_token(account):
+            self._refresh_failed.discard(account.id)
+            return self._current_auth[account.id]
         
-        # Build auth from account
-        parts = parse_refresh_parts(account.refresh_token)
         auth = AuthDetails(
             refresh=account.refresh_token,
-            access=cached.access if cached else "",
-            expires=cached.expires if cached else 0,
+            access="",
+            expires=0,
             email=account.email,
         )
         
-        # Refresh if expired
-        if is_token_expired(auth):
+        start = time.monotonic()
+        try:
+            refreshed = await refresh_access_token(auth, http_client=self._client.http_client)
+        except TokenRefreshError as e:
+            self.refresh_stats.record(time.monotonic() - start, success=False)
+            if e.code == "invalid_grant":
+                if await manager.adopt_rotated_tokens() and account.refresh_token != auth.refresh:
+                    # Rotated by another process while we were refreshing; retry with it
+                    return await self._refresh_account(account)
+                
+                # Token revoked - remove account
+                self._current_auth.pop(account.id, None)
+                self._refresh_failed.discard(account.id)
+                if self._token_cache is not None:
+                    await self._token_cache.aremove(account.id)
+                manager.remove_account(account)
+                await manager.save_to_disk()
+                raise TokenRefreshFailedError(f"Token revoked for {account.email}. Please re-login.")
+            self._refresh_failed.add(account.id)
+            return None
+        
+        self.refresh_stats.record(time.monotonic() - start, success=refreshed is not None)
+        if not refreshed:
+            self._refresh_failed.add(account.id)
+            return None
+        self._refresh_failed.discard(account.id)
+        
+        # Persist a rotated refresh token right away so other processes stop using the old one
+        rotated = parse_refresh_parts(refreshed.refresh).refresh_token
+        try:
+            await manager.persist_rotated_token(account, rotated)
+        except OSError as e:
+            if not self.quiet_mode:
+                print(f"[antigravity] Could not save rotated refresh token: {e}")
+        self._current_auth[account.id] = refreshed
+        self._token_issued_at[account.id] = int(time.time() * 1000)
+        
+        if self._token_cache is not None:
+            token = CachedToken(
+                access=refreshed.access,
+                expires=refreshed.expires,
+                issued_at=self._token_issued_at[account.id],
+            )
             try:
-                refreshed = await refresh_access_token(auth)
-                if refreshed:
-                    # Update account with potentially new refresh token
-                    account.refresh_token = parse_refresh_parts(refreshed.refresh).refresh_token
-                    self._current_auth[account.index] = refreshed
-                    return refreshed
-                return None
-            except TokenRefreshError as e:
-                if e.code == "invalid_grant":
-                    # Token revoked - remove account
-                    manager = self._ensure_account_manager()
-                    manager.remove_account(account)
-                    await manager.save_to_disk()
-                    raise TokenRefreshFailedError(f"Token revoked for {account.email}. Please re-login.")
-                return None
+                await self._token_cache.aput(account.id, account.refresh_token, token)
+            except OSError as e:
+                if not self.quiet_mode:
+                    print(f"[antigravity] Could not write token cache: {e}")
+        return refreshed
+    
+    async def _load_cached_token(self, account: ManagedAccount) -> bool:
+        """
+        Adopt an access token from the on-disk cache instead of refreshing.
         
-        self._current_auth[account.index] = auth
-        return auth
+        Tokens already due for refresh-ahead are ignored, so the background
+        renewal still happens (once, by whichever process gets there first).
+        
+        Args:
+            account: Account to look up
+            
+        Returns:
+            True if a usable token was loaded into the in-memory cache
+        """
+        try:
+            token = await self._token_cache.aget(account.id, account.refresh_token)
+        except OSError:
+            return False
+        if token is None:
+            return False
+        
+        auth = AuthDetails(
+            refresh=account.refresh_token,
+            access=token.access,
+            expires=token.expires,
+            email=account.email,
+        )
+        if is_token_expired(auth):
+            return False
+        
+        if self.refresh_ahead_fraction is not None:
+            lifetime = max(0, token.expires - token.issued_at)
+            if token.issued_at + int(lifetime * self.refresh_ahead_fraction) <= int(time.time() * 1000):
+                return False
+        
+        self._current_auth[account.id] = auth
+        self._token_issued_at[account.id] = token.issued_at
+        self.refresh_stats.cache_hits += 1
+        return True
     
-    async def generate(
+    async def warmup(
         self,
-        prompt: str,
-        system_prompt: Optional[str] = None,
-        model: Optional[str] = None,
-        generation_config: Optional[Dict[str, Any]] = None,
+        concurrency: int = WARMUP_CONCURRENCY,
+        timeout: Optional[float] = WARMUP_TIMEOUT_SECONDS,
+    ) -> Dict[str, Any]:
+        """
+        Take token refresh and connection setup off the first request's path.
+        
+        Refreshes every account's access token, at most `concurrency` accounts at a time, while opening keep-alive
+        connections to each API endpoint. Sets warmed_up once done, even if some
+        steps failed: those are simply retried by the first real request.
+        
+        Args:
+            concurrency: Maximum accounts refreshed at once
+            timeout: Seconds after which warm-up stops waiting (None for no
+                limit); refreshes still in flight finish in the background
+            
+        Returns:
+            Summary with accounts/accountsReady, endpoints (endpoint to success)
+            and elapsedMs
+        """
+        start = time.monotonic()
+        deadline = get_deadline(timeout)
+        manager = await self.load_account_manager()
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        async def warm_account(account: ManagedAccount) -> bool:
+            async with semaphore:
+                try:
+                    auth = await self._within_deadline(
+                        self._get_auth_for_account(account), deadline, "warm-up token refresh"
+                    )
+                except AntigravityError:
+                    return False
+                return auth is not None
+        
+        accounts = list(manager.get_accounts())
+        connect_timeout = self._client.stream_timeouts.connect
+        if deadline is not None:
+            left = remaining_seconds(deadline)
+            connect_timeout = left if connect_timeout is None else min(connect_timeout, left)
+        endpoints, ready = await asyncio.gather(
+            self._client.prewarm(timeout=connect_timeout),
+            asyncio.gather(*(warm_account(account) for account in accounts)),
+        )
+        
+        self.warmup_report = {
+            "accounts": len(accounts),
+            "accountsReady": sum(ready),
+            "endpoints": endpoints,
+            "elapsedMs": round((time.monotonic() - start) * 1000, 1),
+        }
+        self.warmed_up = True
+        if not self.quiet_mode:
+            print(
+                f"[antigravity] Warm-up done in {self.warmup_report['elapsedMs'] / 1000:.1f}s: "
+                f"{sum(ready)}/{len(accounts)} accounts, "
+                f"{sum(endpoints.values())}/{len(endpoints)} endpoints"
+            )
+        return self.warmup_report
+    
+    def _ensure_refresh_ahead(self) -> None:
+        """Start the refresh-ahead task if enabled and not already running."""
+        if self.refresh_ahead_fraction is None:
+            return
+        if self._refresh_ahead_task is None or self._refresh_ahead_task.done():
+            self._refresh_ahead_task = asyncio.get_running_loop().create_task(
+                self._refresh_ahead_loop()
+            )
+    
+    def _get_refresh_due_time(self, key: str) -> Optional[int]:
+        """Get when a cached token should be renewed (ms timestamp), if cached."""
+        auth = self._current_auth.get(key)
+        issued_at = self._token_issued_at.get(key)
+        if not auth or not auth.expires or issued_at is None:
+            return None
+        lifetime = max(0, auth.expires - issued_at)
+        return issued_at + int(lifetime * self.refresh_ahead_fraction)
+    
+    async def _refresh_ahead_loop(self) -> None:
+        """
+        Renew cached tokens once they pass refresh_ahead_fraction of their lifetime.
+        
+        Keeps tokens fresh in the background so the request path only has to read
+        the cache. A failed renewal is retried with exponential backoff, so an
+        OAuth outage does not turn into a tight refresh loop.
+        """
+        while True:
+            manager = await self.load_account_manager()
+            now = int(time.time() * 1000)
+            due: List[ManagedAccount] = []
+            next_due: Optional[int] = None
+            
+            for account in manager.get_accounts():
+                due_at = self._get_refresh_due_time(account.id)
+                if due_at is None:
+                    continue
+                due_at = max(due_at, self._refresh_ahead_retry_at.get(account.id, 0))
+                if due_at <= now:
+                    due.append(account)
+                elif next_due is None or due_at < next_due:
+                    next_due = due_at
+            
+            if due:
+                self.refresh_stats.refresh_ahead += len(due)
+                results = await asyncio.gather(
+                    *(self._refresh_single_flight(account) for account in due),
+                    return_exceptions=True,
+                )
+                now = int(time.time() * 1000)
+                for account, result in zip(due, results):
+                    if isinstance(result, AuthDetails):
+                        self._refresh_ahead_failures.pop(account.id, None)
+                        self._refresh_ahead_retry_at.pop(account.id, None)
+                        continue
+                    failures = self._refresh_ahead_failures.get(account.id, 0) + 1
+                    self._refresh_ahead_failures[account.id] = failures
+                    backoff = min(REFRESH_AHEAD_RETRY_BASE_MS * 2 ** (failures - 1), REFRESH_AHEAD_RETRY_MAX_MS)
+                    self._refresh_ahead_retry_at[account.id] = now + backoff
+                    if next_due is None or now + backoff < next_due:
+                        next_due = now + backoff
+            
+            sleep_ms = REFRESH_AHEAD_MAX_SLEEP_MS if next_due is None else next_due - now
+            await asyncio.sleep(min(max(sleep_ms, 1000), REFRESH_AHEAD_MAX_SLEEP_MS) / 1000)
+    
+    async def _within_deadline(self, coro, deadline: Optional[float], step: str):
+        """
+        Await a step of a request, giving up when the deadline passes.
+        
+        The step itself is shielded and keeps running (e.g. a token refresh
+        shared with other requests still completes and fills the cache).
+        
+        Args:
+            coro: Coroutine to await
+            deadline: time.monotonic() deadline, or None
+            step: Description used in the error message
+            
+        Raises:
+            DeadlineExceededError: If the deadline passes first
+        """
+        if deadline is None:
+            return await coro
+        
+        task = asyncio.ensure_future(coro)
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), remaining_seconds(deadline))
+        except asyncio.TimeoutError:
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            raise DeadlineExceededError(f"Request deadline exceeded during {step}") from None
+    
+    def _check_budget(self, deadline: Optional[float], needed_seconds: float, reason: str) -> None:
+        """
+        Fail fast if the time left cannot cover a wait plus another attempt.
+        
+        Args:
+            deadline: time.monotonic() deadline, or None
+            needed_seconds: Time about to be spent before the next attempt
+            reason: What the time would be spent on, for the error message
+            
+        Raises:
+            DeadlineExceededError: If the remaining budget is too small
+        """
+        left = remaining_seconds(deadline)
+        if left is not None and needed_seconds + MIN_ATTEMPT_SECONDS > left:
+            raise DeadlineExceededError(f"Request deadline exceeded ({left:.1f}s left): {reason}")
+    
+    def _attempt_timeouts(
+        self,
+        model: str,
+        timeouts: Optional[StreamTimeouts],
+        deadline: Optional[float],
+    ) -> Optional[StreamTimeouts]:
+        """Cap an attempt's stream timeouts at the time left before the deadline."""
+        left = remaining_seconds(deadline)
+        if left is None:
+            return timeouts
+        
+        resolved = self._client.get_timeouts(model, timeouts)
+        return replace(
+            resolved,
+            connect=left if resolved.connect is None else min(resolved.connect, left),
+            total=left if resolved.total is None else min(resolved.total, left),
+        )
+    
+    async def _execute(
+        self,
+        model: str,
+        attempt: Callable[[str, str, str], AsyncIterator[Dict[str, Any]]],
         max_retries: int = 3,
-    ) -> str:
+        deadline: Optional[float] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
         """
-        Generate content using the Antigravity API.
+        Run a request with account rotation, retries and quota fallback.
         
-        This is the main method for sending prompts and receiving responses.
-        Handles authentication, token refresh, and multi-account rotation automatically.
+        Every generation entry point goes through this engine. It selects an
+        account, obtains a token and calls attempt(access_token, project_id,
+        header_style), which must yield client events: payload events (e.g.
+        {"text": ...} or {"response": ...}), {"error": True, ...} or
+        {"done": True}. Payload events are re-yielded to the caller.
+        
+        On failure before the first payload event the engine rotates accounts:
+        short 429s are retried on the same account, longer ones mark the account
+        rate-limited and fall back to the other Gemini quota when possible,
+        request errors (400, 404, ...) are raised at once, and other errors move
+        on to the next account. Only auth, server and transport errors count
+        toward an account's failure cooldown.
+        Once a payload event has been yielded, errors are raised instead of
+        retried so callers never see duplicated output.
+        
+        With a deadline, rate-limit waits, short-retry sleeps and token refresh
+        are bounded by the time left, and attempts must cap
+        their own HTTP timeouts at it (see _attempt_timeouts).
         
         Args:
-            prompt: The user prompt
-            system_prompt: Optional system instruction
-            model: Model to use (defaults to instance model)
-            generation_config: Optional generation config
+            model: Model name
+            attempt: Callable performing one upstream request
             max_retries: Maximum number of account rotation retries
+            deadline: Optional time.monotonic() deadline for the whole request
             
-        Returns:
-            Generated text response
+        Yields:
+            Payload events from the successful attempt
             
         Raises:
             NoAccountsError: If no accounts are configured
             AllAccountsRateLimitedError: If all accounts are rate-limited
+            DeadlineExceededError: If the deadline cannot cover another attempt
+            InvalidRequestError: If the API rejects the request itself
             AntigravityError: For other API errors
         """
-        effective_model = model or self.model
-        family = get_model_family(effective_model)
-        header_style = get_header_style_from_model(effective_model)
+        family = get_model_family(model)
+        header_style = get_header_style_from_model(model)
         
-        manager = self._ensure_account_manager()
+        manager = await self.load_account_manager()
         
         if manager.get_account_count() == 0:
             raise NoAccountsError(
                 "No Antigravity accounts configured. Run 'antigravity auth login' to add an account."
             )
         
-        # Build contents in Gemini format
-        contents = [
-            {
-                "role": "user",
-                "parts": [{"text": prompt}]
-            }
-        ]
-        
         retries = 0
         last_error: Optional[str] = None
+        rate_limited = False
         
         while retries < max_retries:
-            # Get next available account
-            account = manager.get_current_or_next_for_family(
+            self._check_budget(deadline, 0, last_error or "no attempt completed")
+            
+            # Select and lease the next available account
+            lease = await manager.acquire_for_family(
                 family=family,
-                model=effective_model,
+                model=model,
                 header_style=header_style,
+                quota_fallback=self.quota_fallback,
             )
             
-            if account is None:
+            if lease is None:
                 # All accounts rate-limited
-                wait_time = manager.get_min_wait_time_for_family(family, effective_model)
+                wait_time = manager.get_min_wait_time_for_family(family, model)
                 max_wait_ms = self.max_rate_limit_wait_seconds * 1000
                 
                 if max_wait_ms > 0 and wait_time > max_wait_ms:
@@ -221,6 +801,7 @@ class AntigravityService:
                         f"All accounts rate-limited. Retry in {wait_time // 1000}s.",
                         wait_time,
                     )
+                self._check_budget(deadline, wait_time / 1000, f"all accounts rate-limited for {wait_time // 1000}s")
                 
                 # Wait and retry
                 if not self.quiet_mode:
@@ -228,97 +809,230 @@ class AntigravityService:
                 await asyncio.sleep(wait_time / 1000)
                 continue
             
-            # Get auth for this account
-            try:
-                auth = await self._get_auth_for_account(account)
-            except TokenRefreshFailedError:
-                retries += 1
-                continue
-            
-            if not auth or not auth.access:
-                retries += 1
-                last_error = "Failed to get access token"
-                continue
-            
-            # Get project ID
-            project_id = account.project_id or ANTIGRAVITY_DEFAULT_PROJECT_ID
-            
-            # Make the request
-            response = await self._client.generate_content(
-                model=effective_model,
-                contents=contents,
-                access_token=auth.access,
-                project_id=project_id,
-                system_instruction=system_prompt,
-                generation_config=generation_config,
-                streaming=True,
-                header_style=header_style,
-            )
+            account = lease.account
+            header_style = lease.header_style
             
-            # Handle rate limiting
-            if response.status_code == 429:
-                retry_after_ms = response.retry_after_ms or 60000
+            try:
+                # Get auth for this account
+                try:
+                    auth = await self._within_deadline(
+                        self._get_auth_for_account(account), deadline, "token refresh"
+                    )
+                except TokenRefreshFailedError as e:
+                    retries += 1
+                    last_error = str(e)
+                    continue
                 
-                if retry_after_ms <= SHORT_RETRY_THRESHOLD_MS:
-                    # Short retry - wait and try same account
-                    if not self.quiet_mode:
-                        print(f"Rate limited. Retrying in {retry_after_ms // 1000}s...")
-                    await asyncio.sleep(retry_after_ms / 1000)
+                if not auth or not auth.access:
+                    retries += 1
+                    last_error = "Failed to get access token"
                     continue
                 
-                # Mark account as rate-limited
-                manager.mark_rate_limited(
-                    account=account,
-                    retry_after_ms=retry_after_ms,
-                    family=family,
-                    header_style=header_style,
-                    model=effective_model,
-                )
-                await manager.save_to_disk()
+                # Get project ID
+                project_id = account.project_id or ANTIGRAVITY_DEFAULT_PROJECT_ID
+                
+                # Make the request, passing payload events through
+                metrics = RequestMetrics(model=model, account_email=account.email)
+                started = False
+                error_event: Optional[Dict[str, Any]] = None
+                
+                async with aclosing(attempt(auth.access, project_id, header_style)) as events:
+                    async for event in events:
+                        if "error" in event:
+                            error_event = event
+                            break
+                        if "done" in event:
+                            break
+                        metrics.mark_first_byte()
+                        metrics.output_chars += len(event.get("text", ""))
+                        started = True
+                        yield event
                 
-                # Try quota fallback for Gemini
-                if self.quota_fallback and family == MODEL_FAMILY_GEMINI:
-                    alt_style = manager.get_available_header_style(account, family, effective_model)
-                    if alt_style and alt_style != header_style:
-                        header_style = alt_style
+                # Handle success
+                if error_event is None:
+                    manager.mark_success(account, family)
+                    await manager.save_to_disk()
+                    self._record_metrics(metrics.finish(metrics.output_chars))
+                    return
+                
+                if deadline is not None and error_event.get("timeout") == "total":
+                    raise DeadlineExceededError("Request deadline exceeded while waiting for the model")
+                
+                # Output already delivered - failing over would duplicate it
+                if started:
+                    raise AntigravityError(error_event.get("message") or "Stream interrupted")
+                
+                # Handle rate limiting
+                if error_event.get("status_code") == 429:
+                    retry_after_ms = error_event.get("retry_after_ms") or 60000
+                
+                    if retry_after_ms <= SHORT_RETRY_THRESHOLD_MS:
+                        self._check_budget(deadline, retry_after_ms / 1000, "rate limited")
+                        # Short retry - wait and try same account
                         if not self.quiet_mode:
-                            print(f"Quota exhausted. Trying {alt_style} quota...")
+                            print(f"Rate limited. Retrying in {retry_after_ms // 1000}s...")
+                        await asyncio.sleep(retry_after_ms / 1000)
                         continue
                 
+                    # Mark account as rate-limited
+                    manager.mark_rate_limited(
+                        account=account,
+                        retry_after_ms=retry_after_ms,
+                        family=family,
+                        header_style=header_style,
+                        model=model,
+                    )
+                    await manager.save_to_disk()
+                
+                    # Try quota fallback for Gemini
+                    if self.quota_fallback and family == MODEL_FAMILY_GEMINI:
+                        alt_style = manager.get_available_header_style(account, family, model)
+                        if alt_style and alt_style != header_style:
+                            header_style = alt_style
+                            if not self.quiet_mode:
+                                print(f"Quota exhausted. Trying {alt_style} quota...")
+                            continue
+                
+                    retries += 1
+                    rate_limited = True
+                    last_error = f"Rate limited for {retry_after_ms // 1000}s"
+                    continue
+                
+                status_code = error_event.get("status_code") or 0
+                message = error_event.get("message") or f"HTTP {status_code}"
+                
+                # Bad request or unknown model - another account would get the same answer
+                if is_request_error(status_code):
+                    body = error_event.get("body")
+                    raise InvalidRequestError(f"{message}: {body}" if body else message, status_code)
+                
+                # Handle other errors - fail over to the next account
                 retries += 1
-                last_error = f"Rate limited for {retry_after_ms // 1000}s"
-                continue
-            
-            # Handle success
-            if response.success:
-                account.consecutive_failures = 0
-                await manager.save_to_disk()
-                return extract_text_from_response(response.body, streaming=True)
-            
-            # Handle other errors
-            last_error = response.error or "Unknown error"
-            retries += 1
+                rate_limited = False
+                last_error = message
+                
+                if is_account_failure(status_code):
+                    account.consecutive_failures += 1
+                    if account.consecutive_failures >= MAX_CONSECUTIVE_FAILURES:
+                        manager.mark_account_cooling_down(account, FAILURE_COOLDOWN_MS, "consecutive-failures")
+                        account.consecutive_failures = 0
+                manager.rotate_for_family(family)
+            finally:
+                manager.release(lease)
         
+        if rate_limited:
+            raise AllAccountsRateLimitedError(
+                f"Failed after {max_retries} retries: {last_error}",
+                manager.get_min_wait_time_for_family(family, model),
+            )
         raise AntigravityError(f"Failed after {max_retries} retries: {last_error}")
     
+    def _stream_text(
+        self,
+        model: str,
+        contents: List[Dict[str, Any]],
+        system_prompt: Optional[str],
+        generation_config: Optional[Dict[str, Any]],
+        max_retries: int,
+        timeouts: Optional[StreamTimeouts] = None,
+        deadline: Optional[float] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Run a streaming text request through the execution engine."""
+        def attempt(access_token: str, project_id: str, header_style: str):
+            return self._client.generate_content_stream(
+                model=model,
+                contents=contents,
+                access_token=access_token,
+                project_id=project_id,
+                system_instruction=system_prompt,
+                generation_config=generation_config,
+                header_style=header_style,
+                timeouts=self._attempt_timeouts(model, timeouts, deadline),
+            )
+        
+        return self._execute(model, attempt, max_retries, deadline)
+    
+    async def _collect_text(self, events: AsyncIterator[Dict[str, Any]]) -> str:
+        """Fold streamed text events into a single string."""
+        texts: List[str] = []
+        async with aclosing(events):
+            async for event in events:
+                texts.append(event["text"])
+        return "".join(texts)
+    
+    async def generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        model: Optional[str] = None,
+        generation_config: Optional[Dict[str, Any]] = None,
+        max_retries: int = 3,
+        timeouts: Optional[StreamTimeouts] = None,
+        timeout: Optional[float] = None,
+    ) -> str:
+        """
+        Generate content using the Antigravity API.
+        
+        This is the main method for sending prompts and receiving responses.
+        Handles authentication, token refresh, and multi-account rotation automatically.
+        
+        Args:
+            prompt: The user prompt
+            system_prompt: Optional system instruction
+            model: Model to use (defaults to instance model)
+            generation_config: Optional generation config
+            max_retries: Maximum number of account rotation retries
+            timeouts: Optional per-call stream timeouts (see StreamTimeouts)
+            timeout: Optional overall time limit in seconds, covering rate-limit
+                waits, retries, token refresh and HTTP requests
+            
+        Returns:
+            Generated text response
+            
+        Raises:
+            NoAccountsError: If no accounts are configured
+            AllAccountsRateLimitedError: If all accounts are rate-limited
+            DeadlineExceededError: If the timeout cannot cover another attempt
+            AntigravityError: For other API errors
+        """
+        return await self._collect_text(
+            self._stream_text(
+                model=model or self.model,
+                contents=build_user_contents(prompt),
+                system_prompt=system_prompt,
+                generation_config=generation_config,
+                max_retries=max_retries,
+                timeouts=timeouts,
+                deadline=get_deadline(timeout),
+            )
+        )
+    
     async def generate_stream(
         self,
         prompt: str,
         system_prompt: Optional[str] = None,
         model: Optional[str] = None,
         generation_config: Optional[Dict[str, Any]] = None,
+        max_retries: int = 3,
+        timeouts: Optional[StreamTimeouts] = None,
+        timeout: Optional[float] = None,
     ):
         """
         Generate content with real-time streaming.
         
         This is an async generator that yields text chunks as they are generated
-        by the model, enabling true real-time streaming responses.
+        by the model, enabling true real-time streaming responses. Failures
+        before the first chunk rotate to another account like generate() does.
         
         Args:
             prompt: The user prompt
             system_prompt: Optional system instruction
             model: Model to use (defaults to instance model)
             generation_config: Optional generation config
+            max_retries: Maximum number of account rotation retries
+            timeouts: Optional per-call stream timeouts (see StreamTimeouts)
+            timeout: Optional overall time limit in seconds, covering rate-limit
+                waits, retries, token refresh and HTTP requests
             
         Yields:
             String chunks of generated text as they arrive
@@ -326,88 +1040,25 @@ class AntigravityService:
         Raises:
             NoAccountsError: If no accounts are configured
             AllAccountsRateLimitedError: If all accounts are rate-limited
+            DeadlineExceededError: If the timeout cannot cover another attempt
             AntigravityError: For other API errors
             
         Example:
             async for chunk in service.generate_stream("Tell me a story"):
                 print(chunk, end="", flush=True)
         """
-        effective_model = model or self.model
-        family = get_model_family(effective_model)
-        header_style = get_header_style_from_model(effective_model)
-        
-        manager = self._ensure_account_manager()
-        
-        if manager.get_account_count() == 0:
-            raise NoAccountsError(
-                "No Antigravity accounts configured. Run 'antigravity auth login' to add an account."
-            )
-        
-        # Build contents in Gemini format
-        contents = [
-            {
-                "role": "user",
-                "parts": [{"text": prompt}]
-            }
-        ]
-        
-        # Get next available account
-        account = manager.get_current_or_next_for_family(
-            family=family,
-            model=effective_model,
-            header_style=header_style,
-        )
-        
-        if account is None:
-            wait_time = manager.get_min_wait_time_for_family(family, effective_model)
-            raise AllAccountsRateLimitedError(
-                f"All accounts rate-limited. Retry in {wait_time // 1000}s.",
-                wait_time,
-            )
-        
-        # Get auth for this account
-        auth = await self._get_auth_for_account(account)
-        
-        if not auth or not auth.access:
-            raise AntigravityError("Failed to get access token")
-        
-        # Get project ID
-        project_id = account.project_id or ANTIGRAVITY_DEFAULT_PROJECT_ID
-        
-        # Stream the response
-        async for event in self._client.generate_content_stream(
-            model=effective_model,
-            contents=contents,
-            access_token=auth.access,
-            project_id=project_id,
-            system_instruction=system_prompt,
+        events = self._stream_text(
+            model=model or self.model,
+            contents=build_user_contents(prompt),
+            system_prompt=system_prompt,
             generation_config=generation_config,
-            header_style=header_style,
-        ):
-            if "text" in event:
+            max_retries=max_retries,
+            timeouts=timeouts,
+            deadline=get_deadline(timeout),
+        )
+        async with aclosing(events):
+            async for event in events:
                 yield event["text"]
-            elif "error" in event:
-                if event.get("status_code") == 429:
-                    retry_after_ms = event.get("retry_after_ms", 60000)
-                    manager.mark_rate_limited(
-                        account=account,
-                        retry_after_ms=retry_after_ms,
-                        family=family,
-                        header_style=header_style,
-                        model=effective_model,
-                    )
-                    await manager.save_to_disk()
-                    raise AllAccountsRateLimitedError(
-                        f"Rate limited. Retry in {retry_after_ms // 1000}s.",
-                        retry_after_ms,
-                    )
-                else:
-                    raise AntigravityError(event.get("message", "Stream error"))
-            elif "done" in event:
-                # Stream completed successfully
-                account.consecutive_failures = 0
-                await manager.save_to_disk()
-                return
     
     def generate_sync(
         self,
@@ -415,6 +1066,7 @@ class AntigravityService:
         system_prompt: Optional[str] = None,
         model: Optional[str] = None,
         generation_config: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
     ) -> str:
         """
         Synchronous wrapper for generate().
@@ -424,16 +1076,20 @@ class AntigravityService:
             system_prompt: Optional system instruction
             model: Model to use
             generation_config: Optional generation config
+            timeout: Optional overall time limit in seconds
             
         Returns:
             Generated text response
         """
         return asyncio.run(
-            self.generate(
-                prompt=prompt,
-                system_prompt=system_prompt,
-                model=model,
-                generation_config=generation_config,
+            self._run_and_close(
+                self.generate(
+                    prompt=prompt,
+                    system_prompt=system_prompt,
+                    model=model,
+                    generation_config=generation_config,
+                    timeout=timeout,
+                )
             )
         )
     
@@ -443,6 +1099,9 @@ class AntigravityService:
         system_prompt: Optional[str] = None,
         model: Optional[str] = None,
         generation_config: Optional[Dict[str, Any]] = None,
+        max_retries: int = 3,
+        timeouts: Optional[StreamTimeouts] = None,
+        timeout: Optional[float] = None,
     ) -> str:
         """
         Generate content with conversation history.
@@ -452,21 +1111,14 @@ class AntigravityService:
             system_prompt: Optional system instruction
             model: Model to use
             generation_config: Optional generation config
+            max_retries: Maximum number of account rotation retries
+            timeouts: Optional per-call stream timeouts (see StreamTimeouts)
+            timeout: Optional overall time limit in seconds, covering rate-limit
+                waits, retries, token refresh and HTTP requests
             
         Returns:
             Generated text response
         """
-        effective_model = model or self.model
-        family = get_model_family(effective_model)
-        header_style = get_header_style_from_model(effective_model)
-        
-        manager = self._ensure_account_manager()
-        
-        if manager.get_account_count() == 0:
-            raise NoAccountsError(
-                "No Antigravity accounts configured. Run 'antigravity auth login' to add an account."
-            )
-        
         # Convert to Gemini format
         contents = []
         for msg in messages:
@@ -484,37 +1136,17 @@ class AntigravityService:
                 "parts": [{"text": content}]
             })
         
-        # Get account and make request
-        account = manager.get_current_or_next_for_family(family, effective_model, header_style)
-        
-        if account is None:
-            wait_time = manager.get_min_wait_time_for_family(family, effective_model)
-            raise AllAccountsRateLimitedError(
-                f"All accounts rate-limited. Retry in {wait_time // 1000}s.",
-                wait_time,
+        return await self._collect_text(
+            self._stream_text(
+                model=model or self.model,
+                contents=contents,
+                system_prompt=system_prompt,
+                generation_config=generation_config,
+                max_retries=max_retries,
+                timeouts=timeouts,
+                deadline=get_deadline(timeout),
             )
-        
-        auth = await self._get_auth_for_account(account)
-        if not auth or not auth.access:
-            raise AntigravityError("Failed to get access token")
-        
-        project_id = account.project_id or ANTIGRAVITY_DEFAULT_PROJECT_ID
-        
-        response = await self._client.generate_content(
-            model=effective_model,
-            contents=contents,
-            access_token=auth.access,
-            project_id=project_id,
-            system_instruction=system_prompt,
-            generation_config=generation_config,
-            streaming=True,
-            header_style=header_style,
         )
-        
-        if response.success:
-            return extract_text_from_response(response.body, streaming=True)
-        
-        raise AntigravityError(response.error or "API request failed")
     
     def get_accounts(self) -> List[Dict[str, Any]]:
         """
@@ -527,6 +1159,7 @@ class AntigravityService:
         return [
             {
                 "index": acc.index,
+                "id": acc.id,
                 "email": acc.email,
                 "project_id": acc.project_id,
                 "added_at": acc.added_at,
@@ -548,11 +1181,120 @@ class AntigravityService:
         if account:
             return {
                 "index": account.index,
+                "id": account.id,
                 "email": account.email,
                 "project_id": account.project_id,
             }
 
         return None
+    
+    async def check_capacity(self, model: Optional[str] = None) -> None:
+        """
+        Fail fast when no account can serve a model right now.
+        
+        Lets a server shed load before building the upstream request, rather
+        than holding the connection open while a rate limit runs out.
+        
+        Args:
+            model: Model to check (defaults to the service model)
+            
+        Raises:
+            NoAccountsError: If no accounts are configured
+            AllAccountsRateLimitedError: If every account is rate-limited or
+                cooling down for the model (wait_time_ms is the soonest reset)
+        """
+        model = model or self.model
+        manager = await self.load_account_manager()
+        if manager.get_account_count() == 0:
+            raise NoAccountsError(
+                "No Antigravity accounts configured. Run 'antigravity auth login' to add an account."
+            )
+        
+        family = get_model_family(model)
+        header_style = None if self.quota_fallback else get_header_style_from_model(model)
+        if manager.get_available_accounts(family, model, header_style):
+            return
+        
+        wait_time = manager.get_min_wait_time_for_family(family, model)
+        raise AllAccountsRateLimitedError(
+            f"All accounts rate-limited. Retry in {max(1, -(-wait_time // 1000))}s.",
+            wait_time,
+        )
+    
+    def get_readiness(self, models: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Summarize whether this service can serve requests right now.
+        
+        Built from in-memory state only (no disk or network I/O), so it can be
+        polled every second. Availability is checked per model, because Gemini
+        rate limits are tracked per model. The service is ready when accounts
+        are loaded, at least one of the models has an account that is neither
+        rate-limited nor cooling down and whose last token refresh did not
+        fail, and at least one API endpoint's circuit is not open.
+        
+        Args:
+            models: Models to check (defaults to the service model)
+        
+        Returns:
+            Dict with ready, reasons (why not ready), per-model availability
+            and soonest reset (retryAfterMs), token and endpoint state
+        """
+        manager = self._account_manager
+        if manager is None:
+            return {"ready": False, "reasons": ["accounts not loaded"], "warmedUp": self.warmed_up}
+        
+        accounts = manager.get_accounts()
+        valid_tokens = 0
+        for account in accounts:
+            auth = self._current_auth.get(account.id)
+            if auth is not None and not is_token_expired(auth):
+                valid_tokens += 1
+        
+        availability: Dict[str, Dict[str, int]] = {}
+        for model in models or [self.model]:
+            family = get_model_family(model)
+            header_style = None if self.quota_fallback else get_header_style_from_model(model)
+            available = manager.get_available_accounts(family, model, header_style)
+            usable = sum(1 for account in available if account.id not in self._refresh_failed)
+            availability[model] = {
+                "available": len(available),
+                "usable": usable,
+                "retryAfterMs": 0 if available else manager.get_min_wait_time_for_family(family, model),
+            }
+        
+        health = self._client.endpoint_health
+        endpoints = [
+            {"endpoint": endpoint, "state": health.get(endpoint).state, "available": health.is_available(endpoint)}
+            for endpoint in ANTIGRAVITY_ENDPOINT_FALLBACKS
+        ]
+        
+        reasons = []
+        if not accounts:
+            reasons.append("no accounts configured")
+        elif not any(state["usable"] for state in availability.values()):
+            reasons.append("no account is available (rate-limited, cooling down or failing token refresh)")
+        if not any(endpoint["available"] for endpoint in endpoints):
+            reasons.append("all endpoint circuits are open")
+        
+        return {
+            "ready": not reasons,
+            "reasons": reasons,
+            "warmedUp": self.warmed_up,
+            "accounts": len(accounts),
+            "validTokens": valid_tokens,
+            "refreshFailures": sum(1 for account in accounts if account.id in self._refresh_failed),
+            "models": availability,
+            "endpoints": endpoints,
+        }
+    
+    def get_endpoint_health(self) -> List[Dict[str, Any]]:
+        """
+        Get the health of each API endpoint seen so far.
+        
+        Returns:
+            List of endpoint health dictionaries (state, latency, error rate)
+        """
+        return self._client.endpoint_health.snapshot()
 
     async def generate_image(
         self,
@@ -560,6 +1302,7 @@ class AntigravityService:
         model: str = "gemini-3-pro-image",
         aspect_ratio: str = "1:1",
         max_retries: int = 3,
+        timeout: Optional[float] = None,
     ) -> List[Dict[str, str]]:
         """
         Generate images using the Antigravity API.
@@ -571,6 +1314,8 @@ class AntigravityService:
             model: Image generation model to use (default: gemini-3-pro-image)
             aspect_ratio: Aspect ratio for generated images (e.g., "1:1", "16:9")
             max_retries: Maximum number of account rotation retries
+            timeout: Optional overall time limit in seconds, covering rate-limit
+                waits, retries, token refresh and HTTP requests
 
         Returns:
             List of dicts with 'mimeType' and 'data' (base64) keys
@@ -578,132 +1323,67 @@ class AntigravityService:
         Raises:
             NoAccountsError: If no accounts are configured
             AllAccountsRateLimitedError: If all accounts are rate-limited
+            DeadlineExceededError: If the timeout cannot cover another attempt
             AntigravityError: For other API errors
         """
-        family = get_model_family(model)
-        header_style = get_header_style_from_model(model)
-
-        manager = self._ensure_account_manager()
-
-        if manager.get_account_count() == 0:
-            raise NoAccountsError(
-                "No Antigravity accounts configured. Run 'antigravity auth login' to add an account."
-            )
-
-        # Build contents in Gemini format
-        contents = [
-            {
-                "role": "user",
-                "parts": [{"text": prompt}]
-            }
-        ]
+        contents = build_user_contents(prompt)
+        deadline = get_deadline(timeout)
 
         # Build image generation config
         image_config = build_image_generation_config(aspect_ratio)
 
-        retries = 0
-        last_error: Optional[str] = None
-
-        while retries < max_retries:
-            # Get next available account
-            account = manager.get_current_or_next_for_family(
-                family=family,
-                model=model,
-                header_style=header_style,
-            )
-
-            if account is None:
-                # All accounts rate-limited
-                wait_time = manager.get_min_wait_time_for_family(family, model)
-                max_wait_ms = self.max_rate_limit_wait_seconds * 1000
-
-                if max_wait_ms > 0 and wait_time > max_wait_ms:
-                    raise AllAccountsRateLimitedError(
-                        f"All accounts rate-limited. Retry in {wait_time // 1000}s.",
-                        wait_time,
-                    )
-
-                # Wait and retry
-                if not self.quiet_mode:
-                    print(f"All accounts rate-limited. Waiting {wait_time // 1000}s...")
-                await asyncio.sleep(wait_time / 1000)
-                continue
-
-            # Get auth for this account
-            try:
-                auth = await self._get_auth_for_account(account)
-            except TokenRefreshFailedError:
-                retries += 1
-                continue
-
-            if not auth or not auth.access:
-                retries += 1
-                last_error = "Failed to get access token"
-                continue
-
-            # Get project ID
-            project_id = account.project_id or ANTIGRAVITY_DEFAULT_PROJECT_ID
-
+        async def attempt(access_token: str, project_id: str, header_style: str):
             # Make the request (non-streaming for image generation)
-            response = await self._client.generate_content(
-                model=model,
-                contents=contents,
-                access_token=auth.access,
-                project_id=project_id,
-                streaming=False,
-                header_style=header_style,
-                image_config=image_config,
-            )
-
-            # Handle rate limiting
-            if response.status_code == 429:
-                retry_after_ms = response.retry_after_ms or 60000
-
-                if retry_after_ms <= SHORT_RETRY_THRESHOLD_MS:
-                    # Short retry - wait and try same account
-                    if not self.quiet_mode:
-                        print(f"Rate limited. Retrying in {retry_after_ms // 1000}s...")
-                    await asyncio.sleep(retry_after_ms / 1000)
-                    continue
-
-                # Mark account as rate-limited
-                manager.mark_rate_limited(
-                    account=account,
-                    retry_after_ms=retry_after_ms,
-                    family=family,
-                    header_style=header_style,
-                    model=model,
+            try:
+                response = await asyncio.wait_for(
+                    self._client.generate_content(
+                        model=model,
+                        contents=contents,
+                        access_token=access_token,
+                        project_id=project_id,
+                        streaming=False,
+                        header_style=header_style,
+                        image_config=image_config,
+                    ),
+                    remaining_seconds(deadline),
                 )
-                await manager.save_to_disk()
+            except asyncio.TimeoutError:
+                yield {"error": True, "status_code": 0, "message": "Request deadline exceeded", "timeout": "total"}
+                return
+            if response.success:
+                yield {"response": response}
+                return
+            yield {
+                "error": True,
+                "status_code": response.status_code,
+                "retry_after_ms": response.retry_after_ms,
+                "message": response.error,
+            }
 
-                retries += 1
-                last_error = f"Rate limited for {retry_after_ms // 1000}s"
-                continue
+        response: Optional[AntigravityResponse] = None
+        events = self._execute(model, attempt, max_retries, deadline)
+        async with aclosing(events):
+            async for event in events:
+                response = event["response"]
 
-            # Handle success
-            if response.success:
-                account.consecutive_failures = 0
-                await manager.save_to_disk()
-                images = extract_images_from_response(response.body, streaming=False)
-                if images:
-                    return images
-                # If no images found, try to get text response as fallback
-                text = extract_text_from_response(response.body, streaming=False)
-                if text:
-                    raise AntigravityError(f"Image generation failed: {text}")
-                raise AntigravityError("No images generated")
-
-            # Handle other errors
-            last_error = response.error or "Unknown error"
-            retries += 1
+        if response is None:
+            raise AntigravityError("No images generated")
 
-        raise AntigravityError(f"Failed after {max_retries} retries: {last_error}")
+        images = extract_images_from_response(response.body, streaming=False)
+        if images:
+            return images
+        # If no images found, try to get text response as fallback
+        text = extract_text_from_response(response.body, streaming=False)
+        if text:
+            raise AntigravityError(f"Image generation failed: {text}")
+        raise AntigravityError("No images generated")
 
     def generate_image_sync(
         self,
         prompt: str,
         model: str = "gemini-3-pro-image",
         aspect_ratio: str = "1:1",
+        timeout: Optional[float] = None,
     ) -> List[Dict[str, str]]:
         """
         Synchronous wrapper for generate_image().
@@ -712,14 +1392,18 @@ class AntigravityService:
             prompt: The text prompt describing the image to generate
             model: Image generation model to use
             aspect_ratio: Aspect ratio for generated images
+            timeout: Optional overall time limit in seconds
 
         Returns:
             List of dicts with 'mimeType' and 'data' (base64) keys
         """
         return asyncio.run(
-            self.generate_image(
-                prompt=prompt,
-                model=model,
-                aspect_ratio=aspect_ratio,
+            self._run_and_close(
+                self.generate_image(
+                    prompt=prompt,
+                    model=model,
+                    aspect_ratio=aspect_ratio,
+                    timeout=timeout,
+                )
             )
         )
@@ -0,0 +1,412 @@
+"""
+Antigravity Shared Rate-Limit State
+
+This module implements a small fixed-layout table in a memory-mapped file that
+every process on a host maps, so a 429 learned by one worker is visible to the
+others immediately. Entries map "account id|key" to a 64-bit value: a quota's
+reset timestamp, an account's cooldown end, or its in-flight request count.
+
+Layout (little-endian):
+    header (64 bytes): magic, capacity, generation, used
+    slots (capacity x 88 bytes): key (72 bytes, NUL-padded UTF-8), value, check
+
+Reads take no lock. Each slot stores check = value XOR a constant, and a
+reader that sees a torn slot (check mismatch while a writer is mid-update)
+simply reads it again. Writes are serialized across processes with a file lock
+and bump the generation counter, so readers can tell cheaply whether anything
+changed since they last looked. Async callers hand writes to a per-table
+writer thread (the post_* methods) so the event loop never waits on the lock.
+
+Keys too long for a slot are stored as a truncated prefix plus a hash.
+Counters such as the in-flight count also record each table's share under
+"key@pid.n", so the share of a process that died mid-request can be reaped.
+"""
+
+import hashlib
+import itertools
+import mmap
+import os
+import struct
+import sys
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from filelock import FileLock, Timeout
+
+
+MAGIC = b"AGRLTBL1"
+HEADER = struct.Struct("<8sQQQ")  # magic, capacity, generation, used
+HEADER_SIZE = 64
+KEY_SIZE = 72
+SLOT = struct.Struct(f"<{KEY_SIZE}sqq")  # key, value, check
+VALUE = struct.Struct("<qq")  # value, check
+GENERATION = struct.Struct("<Q")
+GENERATION_OFFSET = 16
+CHECK_MASK = 0x5A5A_5A5A_5A5A_5A5A
+DEFAULT_CAPACITY = 4096
+MAX_READ_ATTEMPTS = 16
+KEY_HASH_SIZE = 16  # Hex digits of the hash that replaces the tail of a long key
+TOMBSTONE = 0x01  # First key byte of a reaped slot, reusable by a later insert
+
+COOLDOWN_KEY = "cooldown"
+INFLIGHT_KEY = "inflight"
+
+
+_table_ids = itertools.count(1)
+
+
+def owned_key(key: str, owner: str) -> str:
+    """Get the key holding one owner's share of a counter."""
+    return f"{key}@{owner}"
+
+
+def pid_exists(pid: int) -> bool:
+    """Check whether a process is still running."""
+    if pid == os.getpid():
+        return True
+    if sys.platform == "win32":
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return kernel32.GetLastError() == 5  # Access denied: exists, owned by someone else
+        exit_code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+        kernel32.CloseHandle(handle)
+        return exit_code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedStateTable:
+    """Memory-mapped (account id, key) -> int64 table shared between processes."""
+
+    def __init__(self, path: Path, capacity: int = DEFAULT_CAPACITY):
+        """
+        Open the table, creating the file if needed.
+
+        Args:
+            path: Path to the state file
+            capacity: Number of slots when creating a new file (an existing
+                file keeps its own capacity)
+        """
+        self.path = Path(path)
+        self._lock = FileLock(str(self.path) + ".lock", timeout=10)
+
+        with self._lock:
+            self._create_if_missing(capacity)
+            with open(self.path, "r+b") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0)
+
+        magic, self.capacity, _, _ = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{self.path} is not a shared rate-limit state file")
+
+        self._writer: Optional[ThreadPoolExecutor] = None
+        # Process ID first, so reap_dead_owners() can tell whether the owner is alive
+        self.owner = f"{os.getpid()}.{next(_table_ids)}"
+
+    def _create_if_missing(self, capacity: int) -> None:
+        """Create and zero-fill the file (called with the lock held)."""
+        if self.path.exists() and self.path.stat().st_size >= HEADER_SIZE:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "wb") as f:
+            header = HEADER.pack(MAGIC, capacity, 0, 0)
+            f.write(header.ljust(HEADER_SIZE, b"\0"))
+            f.write(b"\0" * (capacity * SLOT.size))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def close(self) -> None:
+        """Finish pending background writes and unmap the file."""
+        if self._writer is not None:
+            self._writer.shutdown(wait=True)
+            self._writer = None
+        self._mmap.close()
+
+    @property
+    def generation(self) -> int:
+        """Counter bumped by every write to a reset time or cooldown."""
+        return GENERATION.unpack_from(self._mmap, GENERATION_OFFSET)[0]
+
+    def _slot_offset(self, index: int) -> int:
+        return HEADER_SIZE + index * SLOT.size
+
+    def _find(self, key: bytes) -> Tuple[int, bool]:
+        """
+        Find the slot for a key by linear probing.
+
+        Returns:
+            (slot index, found); when not found, the index is the first empty
+            slot or -1 if the table is full
+        """
+        padded = key.ljust(KEY_SIZE, b"\0")
+        start = zlib.crc32(key) % self.capacity
+        reusable = -1
+        for probe in range(self.capacity):
+            index = (start + probe) % self.capacity
+            offset = self._slot_offset(index)
+            stored = self._mmap[offset:offset + KEY_SIZE]
+            if stored == padded:
+                return index, True
+            if stored[0] == 0:
+                return (index if reusable < 0 else reusable), False
+            if stored[0] == TOMBSTONE and reusable < 0:
+                reusable = index
+        return reusable, False
+
+    def _read_value(self, index: int) -> Optional[int]:
+        """Read a slot's value, retrying while a writer is mid-update."""
+        offset = self._slot_offset(index) + KEY_SIZE
+        for _ in range(MAX_READ_ATTEMPTS):
+            value, check = VALUE.unpack_from(self._mmap, offset)
+            if value ^ CHECK_MASK == check:
+                return value
+        return None
+
+    @staticmethod
+    def _encode_key(account_id: str, key: str) -> bytes:
+        """Encode a slot key, replacing the tail of keys that do not fit with a hash."""
+        encoded = f"{account_id}|{key}".encode("utf-8")
+        if len(encoded) <= KEY_SIZE:
+            return encoded
+        digest = hashlib.sha256(encoded).hexdigest()[:KEY_HASH_SIZE].encode("ascii")
+        return encoded[:KEY_SIZE - KEY_HASH_SIZE - 1] + b"#" + digest
+
+    @classmethod
+    def stored_key(cls, account_id: str, key: str) -> str:
+        """
+        Get the key as items() and snapshot() report it.
+
+        Equal to key unless it was too long for a slot and stored hashed.
+
+        Args:
+            account_id: Account ID
+            key: Quota key, COOLDOWN_KEY or INFLIGHT_KEY
+
+        Returns:
+            The stored form of key
+        """
+        encoded = cls._encode_key(account_id, key)
+        return encoded.decode("utf-8", errors="replace").partition("|")[2]
+
+    @staticmethod
+    def is_hashed_key(account_id: str, stored_key: str) -> bool:
+        """Check whether a key from items() or snapshot() is the hashed form of a long key."""
+        return (
+            len(f"{account_id}|{stored_key}".encode("utf-8")) == KEY_SIZE
+            and stored_key[-KEY_HASH_SIZE - 1:-KEY_HASH_SIZE] == "#"
+        )
+
+    def get(self, account_id: str, key: str) -> int:
+        """
+        Read a value without locking.
+
+        Args:
+            account_id: Account ID
+            key: Quota key, COOLDOWN_KEY or INFLIGHT_KEY
+
+        Returns:
+            The stored value, or 0 if absent
+        """
+        index, found = self._find(self._encode_key(account_id, key))
+        if not found:
+            return 0
+        return self._read_value(index) or 0
+
+    def _update_slot(
+        self,
+        encoded: bytes,
+        update: Callable[[int], int],
+        bump_generation: bool,
+    ) -> Optional[int]:
+        """Read-modify-write one slot (the caller holds the file lock)."""
+        index, found = self._find(encoded)
+        if index < 0:
+            return None  # Table full; callers keep their local state
+
+        current = (self._read_value(index) or 0) if found else 0
+        value = update(current)
+        if found and value == current:
+            return value
+
+        offset = self._slot_offset(index)
+        VALUE.pack_into(self._mmap, offset + KEY_SIZE, value, value ^ CHECK_MASK)
+        if not found:
+            # Key last, so readers never match a slot whose value is unset
+            self._mmap[offset:offset + KEY_SIZE] = encoded.ljust(KEY_SIZE, b"\0")
+            used = struct.unpack_from("<Q", self._mmap, 24)[0]
+            struct.pack_into("<Q", self._mmap, 24, used + 1)
+        if bump_generation:
+            GENERATION.pack_into(self._mmap, GENERATION_OFFSET, self.generation + 1)
+        return value
+
+    def _write(self, account_id: str, key: str, update, bump_generation: bool) -> Optional[int]:
+        """Read-modify-write one slot under the file lock."""
+        with self._lock:
+            return self._update_slot(self._encode_key(account_id, key), update, bump_generation)
+
+    def update_max(self, account_id: str, key: str, value: int) -> None:
+        """
+        Raise a timestamp (reset time or cooldown end); never lowers it.
+
+        Args:
+            account_id: Account ID
+            key: Quota key or COOLDOWN_KEY
+            value: Timestamp in ms
+        """
+        self._write(account_id, key, lambda current: max(current, value), bump_generation=True)
+
+    def add(self, account_id: str, key: str, delta: int) -> int:
+        """
+        Add to a counter (e.g. the in-flight count), clamping at zero.
+
+        Args:
+            account_id: Account ID
+            key: Counter key
+            delta: Amount to add
+
+        Returns:
+            The new value (0 if it could not be stored)
+        """
+        result = self._write(account_id, key, lambda current: max(0, current + delta), bump_generation=False)
+        return result or 0
+
+    def add_owned(self, account_id: str, key: str, delta: int, owner: Optional[str] = None) -> int:
+        """
+        Add to a counter and to one owner's share of it, in one locked update.
+
+        The share is kept under "key@owner" so reap_dead_owners() can take back
+        the count of a process that exits without releasing it.
+
+        Args:
+            account_id: Account ID
+            key: Counter key (e.g. INFLIGHT_KEY)
+            delta: Amount to add
+            owner: Owner ID, "<pid>.<n>" (defaults to this table's owner)
+
+        Returns:
+            The new total (0 if it could not be stored)
+        """
+        before = []
+
+        def update_share(current: int) -> int:
+            before.append(current)
+            return max(0, current + delta)
+
+        with self._lock:
+            share = self._update_slot(self._encode_key(account_id, owned_key(key, owner or self.owner)), update_share, False)
+            if share is None:
+                return 0
+            applied = share - before[0]  # Only release what this owner holds
+            result = self._update_slot(
+                self._encode_key(account_id, key), lambda current: max(0, current + applied), False
+            )
+        return result or 0
+
+    def reap_dead_owners(self, key: str) -> int:
+        """
+        Take back the counter shares of processes that are no longer running.
+
+        Args:
+            key: Counter key (e.g. INFLIGHT_KEY)
+
+        Returns:
+            Number of shares reaped
+        """
+        prefix = f"{key}@"
+        reaped = 0
+        with self._lock:
+            for index in range(self.capacity):
+                offset = self._slot_offset(index)
+                raw = self._mmap[offset:offset + KEY_SIZE]
+                if raw[0] in (0, TOMBSTONE):
+                    continue
+                account_id, _, slot_key = raw.rstrip(b"\0").decode("utf-8", errors="replace").partition("|")
+                if not slot_key.startswith(prefix):
+                    continue
+                try:
+                    pid = int(slot_key[len(prefix):].partition(".")[0])
+                except ValueError:
+                    continue
+                if pid_exists(pid):
+                    continue
+
+                share = self._read_value(index) or 0
+                if share:
+                    self._update_slot(
+                        self._encode_key(account_id, key), lambda current: max(0, current - share), False
+                    )
+                VALUE.pack_into(self._mmap, offset + KEY_SIZE, 0, CHECK_MASK)
+                self._mmap[offset] = TOMBSTONE  # Lookups probe past it; inserts may reuse it
+                reaped += 1
+        return reaped
+
+    def _post(self, method: Callable, *args) -> None:
+        """Queue a write for the writer thread (writes run one at a time, in order)."""
+        if self._writer is None:
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="antigravity-shared-state")
+        self._writer.submit(self._run_quietly, method, *args)
+
+    @staticmethod
+    def _run_quietly(method: Callable, *args) -> None:
+        """Run a queued write; sharing is best-effort, so lock timeouts are dropped."""
+        try:
+            method(*args)
+        except (Timeout, OSError, ValueError):
+            pass  # ValueError: the table was closed
+
+    def post_update_max(self, account_id: str, key: str, value: int) -> None:
+        """update_max() on the writer thread, without waiting."""
+        self._post(self.update_max, account_id, key, value)
+
+    def post_add_owned(self, account_id: str, key: str, delta: int) -> None:
+        """add_owned() for this table's owner on the writer thread, without waiting."""
+        self._post(self.add_owned, account_id, key, delta)
+
+    def post_reap_dead_owners(self, key: str) -> None:
+        """reap_dead_owners() on the writer thread, without waiting."""
+        self._post(self.reap_dead_owners, key)
+
+    def flush(self) -> None:
+        """Wait until every queued write has been applied."""
+        if self._writer is not None:
+            self._writer.submit(lambda: None).result()
+
+    def items(self) -> Iterator[Tuple[str, str, int]]:
+        """
+        Iterate over all entries without locking.
+
+        Yields:
+            (account id, key, value) tuples
+        """
+        for index in range(self.capacity):
+            offset = self._slot_offset(index)
+            raw = self._mmap[offset:offset + KEY_SIZE]
+            if raw[0] in (0, TOMBSTONE):
+                continue
+            account_id, sep, key = raw.rstrip(b"\0").decode("utf-8", errors="replace").partition("|")
+            value = self._read_value(index)
+            if sep and value is not None:
+                yield account_id, key, value
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """
+        Get all entries grouped by account.
+
+        Returns:
+            Dict of account ID to {key: value}
+        """
+        result: Dict[str, Dict[str, int]] = {}
+        for account_id, key, value in self.items():
+            result.setdefault(account_id, {})[key] = value
+        return result
@@ -0,0 +1,227 @@
+"""
+Antigravity SSE Decoder
+
+This module implements an incremental Server-Sent Events decoder that works on
+raw bytes, following the WHATWG event stream format (multi-line data fields,
+event/id/retry fields, comments, and CRLF/CR/LF line endings).
+"""
+
+import json
+from dataclasses import dataclass
+from typing import Any, Iterable, List, Optional, Union
+
+
+_UTF8_BOM = b"\xef\xbb\xbf"
+
+
+@dataclass
+class SSEEvent:
+    """A single dispatched Server-Sent Event."""
+    data: str
+    event: str = "message"
+    id: Optional[str] = None
+    retry: Optional[int] = None
+
+
+class SSEDecoder:
+    """
+    Incremental, bytes-level SSE decoder.
+
+    Feed it chunks as they arrive from the network; it returns the events that
+    became complete. Each byte is scanned once and consumed lines are dropped
+    from the buffer (line terminators are found with bytes.find, not by
+    re-splitting the remainder), so decoding cost is linear in the stream size
+    regardless of how the stream is chunked.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._scan_pos = 0  # Where to resume searching for a line terminator
+        self._skip_lf = False  # Previous chunk ended with CR
+        self._started = False
+
+        # Fields of the event being built
+        self._data: List[str] = []
+        self._event_type = ""
+        self._retry: Optional[int] = None
+
+        # Persists across events, per spec
+        self.last_event_id: Optional[str] = None
+
+    def feed(self, chunk: bytes) -> List[SSEEvent]:
+        """
+        Decode a chunk of the stream.
+
+        Args:
+            chunk: Raw bytes received from the stream
+
+        Returns:
+            Events completed by this chunk (possibly empty)
+        """
+        if not chunk:
+            return []
+
+        self._buffer += chunk
+
+        if not self._started:
+            if len(self._buffer) < len(_UTF8_BOM) and _UTF8_BOM.startswith(bytes(self._buffer)):
+                return []
+            if self._buffer.startswith(_UTF8_BOM):
+                del self._buffer[:len(_UTF8_BOM)]
+            self._started = True
+
+        return self._process()
+
+    def flush(self) -> List[SSEEvent]:
+        """
+        Finish decoding at end of stream.
+
+        Any trailing line without a terminator is processed, and an event that
+        was not followed by a blank line is still dispatched (the spec discards
+        it, but servers commonly omit the final blank line).
+
+        Returns:
+            Remaining events
+        """
+        events = self._process()
+        if self._buffer:
+            self._process_line(self._buffer.decode("utf-8", errors="replace"), events)
+            self._buffer.clear()
+        self._scan_pos = 0
+        if self._data:
+            self._dispatch(events)
+        return events
+
+    def _process(self) -> List[SSEEvent]:
+        """Consume all complete lines in the buffer."""
+        events: List[SSEEvent] = []
+        buffer = self._buffer
+        size = len(buffer)
+        start = 0
+        scan = self._scan_pos
+
+        while start < size:
+            # Second half of a CRLF whose CR ended the previous chunk
+            if self._skip_lf:
+                self._skip_lf = False
+                if buffer[start] == 0x0A:
+                    start = scan = start + 1
+                    continue
+
+            lf = buffer.find(b"\n", scan)
+            cr = buffer.find(b"\r", scan, size if lf == -1 else lf)
+
+            if cr != -1:
+                end, next_start = cr, cr + 1
+                if cr + 1 == lf:
+                    next_start = lf + 1
+                elif cr + 1 == size:
+                    self._skip_lf = True
+            elif lf != -1:
+                end, next_start = lf, lf + 1
+            else:
+                scan = size
+                break
+
+            line = buffer[start:end].decode("utf-8", errors="replace")
+            start = scan = next_start
+            self._process_line(line, events)
+
+        if start:
+            del buffer[:start]
+            scan -= start
+        self._scan_pos = max(scan, 0)
+
+        return events
+
+    def _process_line(self, line: str, events: List[SSEEvent]) -> None:
+        """Apply one line to the event being built."""
+        if not line:
+            self._dispatch(events)
+            return
+
+        if line[0] == ":":
+            return  # Comment
+
+        field, sep, value = line.partition(":")
+        if sep and value.startswith(" "):
+            value = value[1:]
+
+        if field == "data":
+            self._data.append(value)
+        elif field == "event":
+            self._event_type = value
+        elif field == "id":
+            if "\0" not in value:
+                self.last_event_id = value
+        elif field == "retry":
+            if value.isascii() and value.isdigit():
+                self._retry = int(value)
+
+    def _dispatch(self, events: List[SSEEvent]) -> None:
+        """Emit the current event (if it has data) and reset the per-event fields."""
+        if self._data:
+            events.append(SSEEvent(
+                data="\n".join(self._data),
+                event=self._event_type or "message",
+                id=self.last_event_id,
+                retry=self._retry,
+            ))
+        self._data = []
+        self._event_type = ""
+        self._retry = None
+
+
+def decode_sse(stream: Union[bytes, str], chunks: Optional[Iterable[bytes]] = None) -> List[SSEEvent]:
+    """
+    Decode a complete SSE payload.
+
+    Args:
+        stream: Full SSE body as bytes or text (ignored when chunks is given)
+        chunks: Optional iterable of byte chunks to decode instead
+
+    Returns:
+        All events in the payload
+    """
+    decoder = SSEDecoder()
+    events: List[SSEEvent] = []
+
+    if chunks is None:
+        chunks = [stream.encode("utf-8") if isinstance(stream, str) else stream]
+
+    for chunk in chunks:
+        events.extend(decoder.feed(chunk))
+    events.extend(decoder.flush())
+    return events
+
+
+def parse_sse_json(data: str) -> List[Any]:
+    """
+    Parse the JSON payload of an SSE event.
+
+    Falls back to parsing each line separately when a server puts one JSON
+    object per data line without blank lines between them.
+
+    Args:
+        data: Event data
+
+    Returns:
+        Parsed JSON objects (empty if the data is not valid JSON)
+    """
+    try:
+        return [json.loads(data)]
+    except json.JSONDecodeError:
+        pass
+
+    if "\n" not in data:
+        return []
+
+    parsed = []
+    for line in data.split("\n"):
+        line = line.strip()
+        if line and line != "[DONE]":
+            try:
+                parsed.append(json.loads(line))
+            except json.JSONDecodeError:
+                pass
+    return parsed
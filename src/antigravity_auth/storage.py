@@ -3,10 +3,16 @@ Antigravity Account Storage
 
 This module handles persistent storage of multiple Antigravity accounts,
 including file locking, versioning, and deduplication.
+
+The sync functions block while waiting for the file lock; async code should use
+aload_accounts() / asave_accounts(), which run them in a worker thread.
 """
 
+import asyncio
+import hashlib
 import json
 import os
+import sqlite3
 import sys
 import time
 from dataclasses import dataclass, field, asdict
@@ -16,31 +22,73 @@ from typing import Any, Dict, List, Optional
 from filelock import FileLock, Timeout
 
 
+# Storage backends
+STORAGE_BACKEND_JSON = "json"
+STORAGE_BACKEND_SQLITE = "sqlite"
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
 # Storage version for migration support
-STORAGE_VERSION = 3
+# v4: rateLimitResetTimes holds arbitrary quota keys (e.g. per-model keys); accounts have an "id"
+STORAGE_VERSION = 4
 
 
 @dataclass
 class RateLimitResetTimes:
-    """Rate limit reset times for different quotas."""
-    claude: Optional[int] = None
-    gemini_antigravity: Optional[int] = None
-    gemini_cli: Optional[int] = None
+    """Rate limit reset times (ms timestamps) keyed by quota key."""
+    times: Dict[str, int] = field(default_factory=dict)
     
-    def to_dict(self) -> Dict[str, Optional[int]]:
-        return {
-            "claude": self.claude,
-            "gemini-antigravity": self.gemini_antigravity,
-            "gemini-cli": self.gemini_cli,
-        }
+    @property
+    def claude(self) -> Optional[int]:
+        return self.times.get("claude")
+    
+    @property
+    def gemini_antigravity(self) -> Optional[int]:
+        return self.times.get("gemini-antigravity")
+    
+    @property
+    def gemini_cli(self) -> Optional[int]:
+        return self.times.get("gemini-cli")
+    
+    def prune(self, now: Optional[int] = None) -> "RateLimitResetTimes":
+        """
+        Drop reset times that have already passed.
+        
+        Args:
+            now: Current time in ms (defaults to the wall clock)
+            
+        Returns:
+            A new RateLimitResetTimes with only pending resets
+        """
+        if now is None:
+            now = int(time.time() * 1000)
+        return RateLimitResetTimes(times={key: value for key, value in self.times.items() if value > now})
+    
+    def to_dict(self) -> Dict[str, int]:
+        return dict(self.times)
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "RateLimitResetTimes":
-        return cls(
-            claude=data.get("claude"),
-            gemini_antigravity=data.get("gemini-antigravity"),
-            gemini_cli=data.get("gemini-cli"),
-        )
+        # v3 files store the three fixed keys with null for "not limited"
+        return cls(times={key: int(value) for key, value in data.items() if value})
+
+
+def make_account_id(email: Optional[str], refresh_token: str) -> str:
+    """
+    Derive a stable account ID.
+    
+    The ID is based on the email when known (so re-login keeps it), otherwise on
+    the refresh token it was first stored with. It is persisted, so later
+    refresh-token rotation does not change it.
+    
+    Args:
+        email: User's email address
+        refresh_token: OAuth refresh token
+        
+    Returns:
+        16-character hex ID
+    """
+    seed = f"email:{email}" if email else f"token:{refresh_token}"
+    return hashlib.sha256(seed.encode("utf-8")).hexdigest()[:16]
 
 
 @dataclass
@@ -56,9 +104,15 @@ class AccountMetadata:
     rate_limit_reset_times: RateLimitResetTimes = field(default_factory=RateLimitResetTimes)
     cooling_down_until: Optional[int] = None
     cooldown_reason: Optional[str] = None  # "auth-failure", "network-error", "project-error"
+    id: Optional[str] = None  # Stable account ID (derived when missing)
+    
+    def __post_init__(self):
+        if not self.id:
+            self.id = make_account_id(self.email, self.refresh_token)
     
     def to_dict(self) -> Dict[str, Any]:
         return {
+            "id": self.id,
             "refreshToken": self.refresh_token,
             "email": self.email,
             "projectId": self.project_id,
@@ -82,9 +136,10 @@ class AccountMetadata:
             added_at=data.get("addedAt", int(time.time() * 1000)),
             last_used=data.get("lastUsed", int(time.time() * 1000)),
             last_switch_reason=data.get("lastSwitchReason"),
-            rate_limit_reset_times=RateLimitResetTimes.from_dict(rate_limits) if rate_limits else RateLimitResetTimes(),
+            rate_limit_reset_times=RateLimitResetTimes.from_dict(rate_limits).prune() if rate_limits else RateLimitResetTimes(),
             cooling_down_until=data.get("coolingDownUntil"),
             cooldown_reason=data.get("cooldownReason"),
+            id=data.get("id"),
         )
 
 
@@ -123,6 +178,7 @@ class AccountStorage:
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "AccountStorage":
+        data = migrate_storage(data)
         accounts = [AccountMetadata.from_dict(acc) for acc in data.get("accounts", [])]
         active_by_family = data.get("activeIndexByFamily", {})
         return cls(
@@ -133,6 +189,31 @@ class AccountStorage:
         )
 
 
+def migrate_storage(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Upgrade a raw storage dict to the current STORAGE_VERSION.
+    
+    Args:
+        data: Storage data as read from disk
+        
+    Returns:
+        Storage data in the current format
+    """
+    version = data.get("version", 1)
+    
+    if version < 4:
+        # v3 -> v4: reset times become an open map; drop the null placeholders
+        accounts = []
+        for account in data.get("accounts", []):
+            account = dict(account)
+            reset_times = account.get("rateLimitResetTimes") or {}
+            account["rateLimitResetTimes"] = {key: value for key, value in reset_times.items() if value}
+            accounts.append(account)
+        data = {**data, "accounts": accounts, "version": 4}
+    
+    return data
+
+
 def get_config_dir() -> Path:
     """
     Get the configuration directory for storing accounts.
@@ -166,10 +247,35 @@ def get_storage_path(path: Optional[str] = None) -> Path:
     
     if env_path := os.environ.get("ANTIGRAVITY_STORAGE_PATH"):
         return Path(env_path)
+    
+    if os.environ.get("ANTIGRAVITY_STORAGE_BACKEND") == STORAGE_BACKEND_SQLITE:
+        return get_config_dir() / "accounts.db"
         
     return get_config_dir() / "accounts.json"
 
 
+def get_storage_backend(storage_path_str: Optional[str] = None) -> str:
+    """
+    Get the storage backend for a storage path.
+    
+    ANTIGRAVITY_STORAGE_BACKEND ("json" or "sqlite") takes precedence; otherwise
+    paths ending in .db, .sqlite or .sqlite3 use SQLite.
+    
+    Args:
+        storage_path_str: Optional custom storage path
+        
+    Returns:
+        "json" or "sqlite"
+    """
+    if backend := os.environ.get("ANTIGRAVITY_STORAGE_BACKEND"):
+        return backend
+    
+    if get_storage_path(storage_path_str).suffix in SQLITE_SUFFIXES:
+        return STORAGE_BACKEND_SQLITE
+    
+    return STORAGE_BACKEND_JSON
+
+
 def get_lock_path(storage_path: Path) -> Path:
     """
     Get the path to the lock file based on storage path.
@@ -189,6 +295,34 @@ def get_lock_path(storage_path: Path) -> Path:
     return storage_path.parent / f"{storage_path.name}.lock"
 
 
+def get_shared_state_path(storage_path_str: Optional[str] = None) -> Path:
+    """
+    Get the path to the shared rate-limit state file for a storage path.
+    
+    Args:
+        storage_path_str: Optional custom storage path
+        
+    Returns:
+        Path to the memory-mapped state file next to the accounts file
+    """
+    storage_path = get_storage_path(storage_path_str)
+    return storage_path.parent / f"{storage_path.name}.state"
+
+
+def get_token_cache_path(storage_path_str: Optional[str] = None) -> Path:
+    """
+    Get the path to the access token cache for a storage path.
+    
+    Args:
+        storage_path_str: Optional custom storage path
+        
+    Returns:
+        Path to the token cache file next to the accounts file
+    """
+    storage_path = get_storage_path(storage_path_str)
+    return storage_path.parent / f"{storage_path.name}.tokens"
+
+
 def ensure_config_dir(storage_path: Path) -> None:
     """
     Ensure the configuration directory exists.
@@ -232,6 +366,9 @@ def load_accounts(storage_path_str: Optional[str] = None) -> Optional[AccountSto
     Returns:
         AccountStorage or None if file doesn't exist or is invalid
     """
+    if get_storage_backend(storage_path_str) == STORAGE_BACKEND_SQLITE:
+        return SQLiteAccountStore(get_storage_path(storage_path_str)).load()
+    
     storage_path = get_storage_path(storage_path_str)
     ensure_config_dir(storage_path)
     
@@ -246,45 +383,482 @@ def load_accounts(storage_path_str: Optional[str] = None) -> Optional[AccountSto
         return load_accounts_unsafe(storage_path_str)
 
 
-def save_accounts(storage: AccountStorage, storage_path_str: Optional[str] = None) -> None:
+def save_accounts(
+    storage: AccountStorage,
+    storage_path_str: Optional[str] = None,
+    base_refresh_tokens: Optional[Dict[str, str]] = None,
+) -> Dict[str, str]:
     """
     Save accounts to storage with file locking and atomic write.
     
+    With base_refresh_tokens (account ID to the refresh token the caller last
+    read from storage), the file is re-read under the lock first, and a token
+    that changed there since (rotated by another process) is kept instead of
+    being overwritten with the caller's stale copy.
+    
     Args:
         storage: AccountStorage to save
         storage_path_str: Optional custom storage path
+        base_refresh_tokens: Optional refresh tokens as the caller last read them
+        
+    Returns:
+        Refresh tokens kept from storage, by account ID (also set in storage)
     """
+    if get_storage_backend(storage_path_str) == STORAGE_BACKEND_SQLITE:
+        SQLiteAccountStore(get_storage_path(storage_path_str)).save(storage)
+        return {}
+    
     storage_path = get_storage_path(storage_path_str)
     ensure_config_dir(storage_path)
     
     lock_path = get_lock_path(storage_path)
     lock = FileLock(str(lock_path), timeout=10)
     
+    kept: Dict[str, str] = {}
     try:
         with lock:
-            # Atomic write via temp file
-            import secrets
-            temp_path = storage_path.with_suffix(f".{secrets.token_hex(6)}.tmp")
-            
-            try:
-                with open(temp_path, "w", encoding="utf-8") as f:
-                    json.dump(storage.to_dict(), f, indent=2)
-                
-                # Atomic rename (on Windows, need to remove target first)
-                if sys.platform == "win32" and storage_path.exists():
-                    storage_path.unlink()
-                temp_path.rename(storage_path)
-            finally:
-                # Clean up temp file if it still exists
-                if temp_path.exists():
-                    try:
-                        temp_path.unlink()
-                    except Exception:
-                        pass
+            if base_refresh_tokens is not None:
+                kept = _keep_rotated_tokens(storage, storage_path_str, base_refresh_tokens)
+            _write_accounts_unsafe(storage, storage_path)
     except Timeout:
         # If we can't acquire the lock, write directly
+        if base_refresh_tokens is not None:
+            kept = _keep_rotated_tokens(storage, storage_path_str, base_refresh_tokens)
         with open(storage_path, "w", encoding="utf-8") as f:
             json.dump(storage.to_dict(), f, indent=2)
+    return kept
+
+
+def _keep_rotated_tokens(
+    storage: AccountStorage,
+    storage_path_str: Optional[str],
+    base_refresh_tokens: Dict[str, str],
+) -> Dict[str, str]:
+    """Copy refresh tokens changed on disk since base_refresh_tokens into storage."""
+    current = load_accounts_unsafe(storage_path_str)
+    if current is None:
+        return {}
+    
+    stored = {metadata.id: metadata.refresh_token for metadata in current.accounts}
+    kept: Dict[str, str] = {}
+    for account in storage.accounts:
+        token = stored.get(account.id)
+        if token is None or token == base_refresh_tokens.get(account.id) or token == account.refresh_token:
+            continue
+        account.refresh_token = token
+        kept[account.id] = token
+    return kept
+
+
+def _write_accounts_unsafe(storage: AccountStorage, storage_path: Path) -> None:
+    """Atomically replace the storage file (the caller holds the file lock)."""
+    # Atomic write via temp file
+    import secrets
+    temp_path = storage_path.with_suffix(f".{secrets.token_hex(6)}.tmp")
+    
+    try:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(storage.to_dict(), f, indent=2)
+        
+        # Atomic rename (on Windows, need to remove target first)
+        if sys.platform == "win32" and storage_path.exists():
+            storage_path.unlink()
+        temp_path.rename(storage_path)
+    finally:
+        # Clean up temp file if it still exists
+        if temp_path.exists():
+            try:
+                temp_path.unlink()
+            except Exception:
+                pass
+
+
+def update_refresh_token(
+    account_id: str,
+    refresh_token: str,
+    storage_path_str: Optional[str] = None,
+) -> bool:
+    """
+    Replace one account's refresh token in storage, leaving everything else as
+    other writers left it.
+    
+    The file is re-read under the lock and only the matching account is
+    changed, so accounts or state written concurrently by other processes are
+    kept (with SQLite, only the account's row is updated).
+    
+    Args:
+        account_id: Stable account ID
+        refresh_token: New refresh token
+        storage_path_str: Optional custom storage path
+        
+    Returns:
+        True if the account was found and updated
+        
+    Raises:
+        Timeout: If the file lock could not be acquired (an OSError)
+    """
+    if get_storage_backend(storage_path_str) == STORAGE_BACKEND_SQLITE:
+        return SQLiteAccountStore(get_storage_path(storage_path_str)).update_refresh_token(
+            account_id, refresh_token
+        )
+    
+    storage_path = get_storage_path(storage_path_str)
+    ensure_config_dir(storage_path)
+    lock = FileLock(str(get_lock_path(storage_path)), timeout=10)
+    
+    with lock:
+        storage = load_accounts_unsafe(storage_path_str)
+        if storage is None:
+            return False
+        for account in storage.accounts:
+            if account.id == account_id:
+                if account.refresh_token != refresh_token:
+                    account.refresh_token = refresh_token
+                    _write_accounts_unsafe(storage, storage_path)
+                return True
+    return False
+
+
+class SQLiteAccountStore:
+    """
+    Account storage in an SQLite database (WAL mode).
+    
+    Several processes can share one database: each account, rate-limit reset
+    time and the active indices live in their own rows, so writers update only
+    what changed instead of rewriting the whole document, and rate-limit reset
+    times are merged (the later reset wins) rather than overwritten.
+    
+    A connection is opened per call, so the store can be used from any thread.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS accounts (
+            id TEXT PRIMARY KEY,
+            position INTEGER NOT NULL,
+            refresh_token TEXT NOT NULL,
+            email TEXT,
+            project_id TEXT,
+            managed_project_id TEXT,
+            added_at INTEGER NOT NULL,
+            last_used INTEGER NOT NULL,
+            last_switch_reason TEXT,
+            cooling_down_until INTEGER,
+            cooldown_reason TEXT
+        );
+        CREATE TABLE IF NOT EXISTS rate_limits (
+            account_id TEXT NOT NULL REFERENCES accounts(id) ON DELETE CASCADE,
+            quota_key TEXT NOT NULL,
+            reset_time INTEGER NOT NULL,
+            PRIMARY KEY (account_id, quota_key)
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """
+    
+    ACCOUNT_COLUMNS = {
+        "refreshToken": "refresh_token",
+        "email": "email",
+        "projectId": "project_id",
+        "managedProjectId": "managed_project_id",
+        "addedAt": "added_at",
+        "lastUsed": "last_used",
+        "lastSwitchReason": "last_switch_reason",
+        "coolingDownUntil": "cooling_down_until",
+        "cooldownReason": "cooldown_reason",
+    }
+    
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._initialized = False
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection, creating the schema on first use."""
+        if not self._initialized:
+            ensure_config_dir(self.path)
+        conn = sqlite3.connect(str(self.path), timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(self.SCHEMA)
+            self._initialized = True
+        return conn
+    
+    def load(self, now: Optional[int] = None) -> Optional[AccountStorage]:
+        """
+        Load all accounts.
+        
+        Args:
+            now: Current time in ms, for pruning expired reset times
+            
+        Returns:
+            AccountStorage or None if the database has no accounts
+        """
+        if now is None:
+            now = int(time.time() * 1000)
+        
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT * FROM accounts ORDER BY position").fetchall()
+            if not rows:
+                return None
+            reset_times = self._read_rate_limits(conn, now)
+            meta = {row["key"]: json.loads(row["value"]) for row in conn.execute("SELECT key, value FROM meta")}
+        finally:
+            conn.close()
+        
+        accounts = []
+        for row in rows:
+            data = {name: row[column] for name, column in self.ACCOUNT_COLUMNS.items()}
+            data["id"] = row["id"]
+            data["rateLimitResetTimes"] = reset_times.get(row["id"], {})
+            accounts.append(data)
+        
+        return AccountStorage.from_dict({
+            "version": STORAGE_VERSION,
+            "accounts": accounts,
+            "activeIndex": meta.get("activeIndex", 0),
+            "activeIndexByFamily": meta.get("activeIndexByFamily", {}),
+        })
+    
+    def save(self, storage: AccountStorage) -> None:
+        """
+        Replace the stored accounts with storage (rate limits are merged).
+        
+        Args:
+            storage: AccountStorage to save
+        """
+        self.apply_changes(storage.to_dict(), previous=None)
+    
+    def apply_changes(
+        self,
+        current: Dict[str, Any],
+        previous: Optional[Dict[str, Any]] = None,
+        prune_missing: bool = True,
+    ) -> None:
+        """
+        Write the difference between two storage dicts as row-level updates.
+        
+        Args:
+            current: Storage dict to persist
+            previous: Storage dict last persisted by this writer, or None to
+                write every row
+            prune_missing: With previous None, delete stored accounts that are
+                not in current (accounts removed since previous are always deleted)
+        """
+        previous_accounts = {acc["id"]: acc for acc in (previous or {}).get("accounts", [])}
+        previous_positions = {
+            acc["id"]: position for position, acc in enumerate((previous or {}).get("accounts", []))
+        }
+        current_ids = {acc["id"] for acc in current["accounts"]}
+        
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            
+            if previous is None and not prune_missing:
+                stale = []
+            elif previous is None:
+                stale = [
+                    row["id"] for row in conn.execute("SELECT id FROM accounts")
+                    if row["id"] not in current_ids
+                ]
+            else:
+                stale = [account_id for account_id in previous_accounts if account_id not in current_ids]
+            conn.executemany("DELETE FROM accounts WHERE id = ?", [(account_id,) for account_id in stale])
+            
+            for position, account in enumerate(current["accounts"]):
+                self._write_account(
+                    conn,
+                    position,
+                    account,
+                    previous_accounts.get(account["id"]),
+                    previous_positions.get(account["id"]),
+                )
+            
+            for key in ("activeIndex", "activeIndexByFamily"):
+                if previous is None or previous.get(key) != current.get(key):
+                    conn.execute(
+                        "INSERT INTO meta (key, value) VALUES (?, ?) "
+                        "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                        (key, json.dumps(current.get(key))),
+                    )
+            
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+    
+    def _write_account(
+        self,
+        conn: sqlite3.Connection,
+        position: int,
+        account: Dict[str, Any],
+        before: Optional[Dict[str, Any]],
+        before_position: Optional[int],
+    ) -> None:
+        """Insert an account row, or update only the columns that changed."""
+        columns = {column: account.get(name) for name, column in self.ACCOUNT_COLUMNS.items()}
+        columns["position"] = position
+        
+        if before is None:
+            names = ", ".join(["id", *columns])
+            placeholders = ", ".join("?" * (len(columns) + 1))
+            updates = ", ".join(f"{column} = excluded.{column}" for column in columns)
+            conn.execute(
+                f"INSERT INTO accounts ({names}) VALUES ({placeholders}) "
+                f"ON CONFLICT(id) DO UPDATE SET {updates}",
+                (account["id"], *columns.values()),
+            )
+            changed_limits = account.get("rateLimitResetTimes", {})
+        else:
+            changed = {
+                column: account.get(name)
+                for name, column in self.ACCOUNT_COLUMNS.items()
+                if account.get(name) != before.get(name)
+            }
+            if position != before_position:
+                changed["position"] = position
+            if changed:
+                assignments = ", ".join(f"{column} = ?" for column in changed)
+                conn.execute(
+                    f"UPDATE accounts SET {assignments} WHERE id = ?",
+                    (*changed.values(), account["id"]),
+                )
+            old_limits = before.get("rateLimitResetTimes", {})
+            changed_limits = {
+                key: value for key, value in account.get("rateLimitResetTimes", {}).items()
+                if old_limits.get(key) != value
+            }
+        
+        conn.executemany(
+            "INSERT INTO rate_limits (account_id, quota_key, reset_time) VALUES (?, ?, ?) "
+            "ON CONFLICT(account_id, quota_key) DO UPDATE SET reset_time = MAX(reset_time, excluded.reset_time)",
+            [(account["id"], key, value) for key, value in changed_limits.items()],
+        )
+    
+    def update_refresh_token(self, account_id: str, refresh_token: str) -> bool:
+        """
+        Replace one account's refresh token.
+        
+        Args:
+            account_id: Stable account ID
+            refresh_token: New refresh token
+            
+        Returns:
+            True if the account exists
+        """
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "UPDATE accounts SET refresh_token = ? WHERE id = ?",
+                (refresh_token, account_id),
+            )
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
+    
+    def load_quota_state(self, now: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Read the shared rate-limit and cooldown state written by all processes.
+        
+        Args:
+            now: Current time in ms, for skipping expired entries
+            
+        Returns:
+            Dict of account ID to {"rateLimitResetTimes": {...}, "coolingDownUntil": ...}
+        """
+        if now is None:
+            now = int(time.time() * 1000)
+        
+        conn = self._connect()
+        try:
+            reset_times = self._read_rate_limits(conn, now)
+            cooldowns = conn.execute(
+                "SELECT id, cooling_down_until, cooldown_reason FROM accounts WHERE cooling_down_until > ?",
+                (now,),
+            ).fetchall()
+        finally:
+            conn.close()
+        
+        state: Dict[str, Dict[str, Any]] = {
+            account_id: {"rateLimitResetTimes": times} for account_id, times in reset_times.items()
+        }
+        for row in cooldowns:
+            entry = state.setdefault(row["id"], {"rateLimitResetTimes": {}})
+            entry["coolingDownUntil"] = row["cooling_down_until"]
+            entry["cooldownReason"] = row["cooldown_reason"]
+        return state
+    
+    def _read_rate_limits(self, conn: sqlite3.Connection, now: int) -> Dict[str, Dict[str, int]]:
+        """Read pending reset times by account, deleting expired rows."""
+        conn.execute("DELETE FROM rate_limits WHERE reset_time <= ?", (now,))
+        reset_times: Dict[str, Dict[str, int]] = {}
+        for row in conn.execute("SELECT account_id, quota_key, reset_time FROM rate_limits"):
+            reset_times.setdefault(row["account_id"], {})[row["quota_key"]] = row["reset_time"]
+        return reset_times
+
+
+async def aload_accounts(storage_path_str: Optional[str] = None) -> Optional[AccountStorage]:
+    """
+    Load accounts without blocking the event loop.
+    
+    The file lock and file I/O run in a worker thread.
+    
+    Args:
+        storage_path_str: Optional custom storage path
+        
+    Returns:
+        AccountStorage or None if file doesn't exist or is invalid
+    """
+    return await asyncio.to_thread(load_accounts, storage_path_str)
+
+
+async def asave_accounts(
+    storage: AccountStorage,
+    storage_path_str: Optional[str] = None,
+    base_refresh_tokens: Optional[Dict[str, str]] = None,
+) -> Dict[str, str]:
+    """
+    Save accounts without blocking the event loop.
+    
+    The file lock, JSON encoding and atomic write run in a worker thread.
+    
+    Args:
+        storage: AccountStorage to save
+        storage_path_str: Optional custom storage path
+        base_refresh_tokens: Optional refresh tokens as the caller last read
+            them (see save_accounts)
+        
+    Returns:
+        Refresh tokens kept from storage, by account ID
+    """
+    return await asyncio.to_thread(save_accounts, storage, storage_path_str, base_refresh_tokens)
+
+
+async def aupdate_refresh_token(
+    account_id: str,
+    refresh_token: str,
+    storage_path_str: Optional[str] = None,
+) -> bool:
+    """
+    update_refresh_token() without blocking the event loop.
+    
+    Args:
+        account_id: Stable account ID
+        refresh_token: New refresh token
+        storage_path_str: Optional custom storage path
+        
+    Returns:
+        True if the account was found and updated
+    """
+    return await asyncio.to_thread(update_refresh_token, account_id, refresh_token, storage_path_str)
 
 
 def clear_accounts(storage_path_str: Optional[str] = None) -> None:
@@ -297,6 +871,14 @@ def clear_accounts(storage_path_str: Optional[str] = None) -> None:
     storage_path = get_storage_path(storage_path_str)
     lock_path = get_lock_path(storage_path)
     
+    if get_storage_backend(storage_path_str) == STORAGE_BACKEND_SQLITE:
+        for path in (storage_path, Path(f"{storage_path}-wal"), Path(f"{storage_path}-shm")):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        return
+    
     if storage_path.exists():
         try:
             lock = FileLock(str(lock_path), timeout=10)
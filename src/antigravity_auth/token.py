@@ -113,12 +113,27 @@ def calculate_token_expiry(request_time_ms: int, expires_in_seconds: int) -> int
     return request_time_ms + (expires_in_seconds * 1000)
 
 
-async def refresh_access_token(auth: AuthDetails) -> Optional[AuthDetails]:
+async def _post_token_request(client: httpx.AsyncClient, data: dict) -> httpx.Response:
+    """POST a form-encoded request to the Google token endpoint."""
+    return await client.post(
+        GOOGLE_TOKEN_URL,
+        data=data,
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+        timeout=30.0,
+    )
+
+
+async def refresh_access_token(
+    auth: AuthDetails,
+    http_client: Optional[httpx.AsyncClient] = None,
+) -> Optional[AuthDetails]:
     """
     Refresh an access token using the refresh token.
     
     Args:
         auth: Current AuthDetails with refresh token
+        http_client: Optional pooled HTTP client to reuse (a temporary
+            client is created when omitted)
         
     Returns:
         Updated AuthDetails with new access token, or None if refresh failed
@@ -140,35 +155,33 @@ async def refresh_access_token(auth: AuthDetails) -> Optional[AuthDetails]:
         "client_secret": ANTIGRAVITY_CLIENT_SECRET,
     }
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                GOOGLE_TOKEN_URL,
-                data=refresh_data,
-                headers={"Content-Type": "application/x-www-form-urlencoded"},
-                timeout=30.0,
-            )
-            
-            if response.status_code != 200:
-                error_data = response.json()
-                error_code = error_data.get("error", "unknown_error")
-                error_desc = error_data.get("error_description", "Unknown error")
-                
-                # Check for revoked token
-                if error_code == "invalid_grant":
-                    raise TokenRefreshError(
-                        f"Refresh token is invalid or revoked: {error_desc}",
-                        code="invalid_grant",
-                    )
-                
-                return None
+    try:
+        if http_client is not None:
+            response = await _post_token_request(http_client, refresh_data)
+        else:
+            async with httpx.AsyncClient() as client:
+                response = await _post_token_request(client, refresh_data)
+        
+        if response.status_code != 200:
+            error_data = response.json()
+            error_code = error_data.get("error", "unknown_error")
+            error_desc = error_data.get("error_description", "Unknown error")
             
-            tokens = response.json()
+            # Check for revoked token
+            if error_code == "invalid_grant":
+                raise TokenRefreshError(
+                    f"Refresh token is invalid or revoked: {error_desc}",
+                    code="invalid_grant",
+                )
             
-        except TokenRefreshError:
-            raise
-        except Exception:
             return None
+        
+        tokens = response.json()
+        
+    except TokenRefreshError:
+        raise
+    except Exception:
+        return None
     
     access_token = tokens.get("access_token")
     expires_in = tokens.get("expires_in", 3600)
@@ -0,0 +1,167 @@
+"""
+Antigravity Access Token Cache
+
+This module persists short-lived access tokens next to the accounts file so
+that a restarted process, or another worker on the same host, can reuse a
+still-valid token instead of refreshing every account on its first request.
+
+Entries are keyed by stable account ID and remember a hash of the refresh
+token they were issued for, so a re-login invalidates them. The file holds
+live credentials and is created with owner-only (0600) permissions.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from filelock import FileLock, Timeout
+
+
+CACHE_VERSION = 1
+CACHE_FILE_MODE = 0o600
+
+
+@dataclass
+class CachedToken:
+    """An access token as stored in the cache."""
+    access: str
+    expires: int  # Expiry timestamp in milliseconds
+    issued_at: int  # When it was obtained, in milliseconds
+
+
+def hash_refresh_token(refresh_token: str) -> str:
+    """Fingerprint a refresh token without storing it a second time."""
+    return hashlib.sha256(refresh_token.encode("utf-8")).hexdigest()[:16]
+
+
+class AccessTokenCache:
+    """File-backed access token cache shared by local processes."""
+
+    def __init__(self, path: Path):
+        """
+        Initialize the cache.
+
+        Args:
+            path: Path to the cache file (created on first write)
+        """
+        self.path = Path(path)
+        self._lock = FileLock(str(self.path) + ".lock", timeout=10)
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._signature: Optional[tuple] = None
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        """Read the file, reusing the parsed copy if it has not changed."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            self._entries, self._signature = {}, None
+            return self._entries
+
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if signature != self._signature:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                entries = data.get("tokens", {}) if data.get("version") == CACHE_VERSION else {}
+            except (OSError, ValueError, AttributeError):
+                entries = {}
+            self._entries, self._signature = entries, signature
+        return self._entries
+
+    def _write(self, entries: Dict[str, Dict[str, Any]]) -> None:
+        """Atomically replace the file with owner-only permissions."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, CACHE_FILE_MODE)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "tokens": entries}, f)
+            os.chmod(temp_path, CACHE_FILE_MODE)  # In case the file already existed
+            os.replace(temp_path, self.path)
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
+        self._entries, self._signature = entries, None
+
+    def get(self, account_id: str, refresh_token: str) -> Optional[CachedToken]:
+        """
+        Look up an unexpired access token.
+
+        Args:
+            account_id: Stable account ID
+            refresh_token: The account's current refresh token
+
+        Returns:
+            CachedToken, or None if missing, expired or issued for another
+            refresh token
+        """
+        entry = self._read().get(account_id)
+        if not entry or entry.get("refreshHash") != hash_refresh_token(refresh_token):
+            return None
+        if entry.get("expires", 0) <= int(time.time() * 1000):
+            return None
+        return CachedToken(
+            access=entry["access"],
+            expires=entry["expires"],
+            issued_at=entry.get("issuedAt", 0),
+        )
+
+    def put(self, account_id: str, refresh_token: str, token: CachedToken) -> None:
+        """
+        Store a freshly obtained access token, dropping expired entries.
+
+        Args:
+            account_id: Stable account ID
+            refresh_token: Refresh token the access token was issued for
+            token: Token to store
+        """
+        try:
+            with self._lock:
+                self._signature = None  # Always re-read under the lock
+                now = int(time.time() * 1000)
+                entries = {
+                    key: entry for key, entry in self._read().items()
+                    if entry.get("expires", 0) > now
+                }
+                entries[account_id] = {
+                    "access": token.access,
+                    "expires": token.expires,
+                    "issuedAt": token.issued_at,
+                    "refreshHash": hash_refresh_token(refresh_token),
+                }
+                self._write(entries)
+        except Timeout:
+            pass  # Caching is best-effort
+
+    def remove(self, account_id: str) -> None:
+        """
+        Forget an account's token (e.g. after its refresh token was revoked).
+
+        Args:
+            account_id: Stable account ID
+        """
+        try:
+            with self._lock:
+                self._signature = None
+                entries = dict(self._read())
+                if entries.pop(account_id, None) is not None:
+                    self._write(entries)
+        except Timeout:
+            pass
+
+    async def aget(self, account_id: str, refresh_token: str) -> Optional[CachedToken]:
+        """Async get() that reads the file in a worker thread."""
+        return await asyncio.to_thread(self.get, account_id, refresh_token)
+
+    async def aput(self, account_id: str, refresh_token: str, token: CachedToken) -> None:
+        """Async put() that writes the file in a worker thread."""
+        await asyncio.to_thread(self.put, account_id, refresh_token, token)
+
+    async def aremove(self, account_id: str) -> None:
+        """Async remove() that writes the file in a worker thread."""
+        await asyncio.to_thread(self.remove, account_id)
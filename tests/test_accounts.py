@@ -0,0 +1,420 @@
+"""
+Test Account Manager
+
+Offline tests for account persistence.
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from antigravity_auth import storage as storage_module
+from antigravity_auth.accounts import AccountManager
+from antigravity_auth.storage import STORAGE_VERSION, AccountMetadata, AccountStorage
+
+
+def make_manager(tmp_path, count: int = 2, **kwargs) -> AccountManager:
+    """Build a manager over an in-memory pool that saves under tmp_path."""
+    storage = AccountStorage(
+        accounts=[
+            AccountMetadata(refresh_token=f"refresh-{i}", email=f"user{i}@example.com")
+            for i in range(count)
+        ]
+    )
+    return AccountManager(storage=storage, storage_path=str(tmp_path / "accounts.json"), **kwargs)
+
+
+class TestWriteBehind:
+    """Test debounced, off-loop account persistence."""
+
+    @pytest.fixture
+    def writes(self, monkeypatch):
+        """Record every save_accounts call while still writing the file."""
+        calls = []
+        original = storage_module.save_accounts
+
+        def recording_save(storage, path=None, base_refresh_tokens=None):
+            calls.append(storage)
+            return original(storage, path, base_refresh_tokens)
+
+        monkeypatch.setattr(storage_module, "save_accounts", recording_save)
+        return calls
+
+    @pytest.mark.asyncio
+    async def test_saves_are_coalesced(self, tmp_path, writes):
+        """Many saves inside the debounce window produce one write of the latest state."""
+        manager = make_manager(tmp_path, save_debounce_ms=50)
+        account = manager.get_accounts()[0]
+
+        for i in range(20):
+            account.consecutive_failures = i
+            await manager.save_to_disk()
+        assert writes == []
+
+        await asyncio.sleep(0.1)
+        assert len(writes) == 1
+
+        data = json.loads((tmp_path / "accounts.json").read_text())
+        assert [a["email"] for a in data["accounts"]] == ["user0@example.com", "user1@example.com"]
+
+    @pytest.mark.asyncio
+    async def test_unchanged_state_is_not_rewritten(self, tmp_path, writes):
+        """A save with nothing changed since the last write is skipped."""
+        manager = make_manager(tmp_path)
+
+        await manager.save_to_disk()
+        await manager.save_to_disk()
+        assert len(writes) == 1
+
+        manager.mark_account_cooling_down(manager.get_accounts()[1], 30_000, "test")
+        await manager.save_to_disk()
+        assert len(writes) == 2
+
+    @pytest.mark.asyncio
+    async def test_flush_writes_pending_state(self, tmp_path, writes):
+        """flush() writes immediately and cancels the pending delayed write."""
+        manager = make_manager(tmp_path, save_debounce_ms=60_000)
+
+        await manager.save_to_disk()
+        assert writes == []
+
+        await manager.flush()
+        assert len(writes) == 1
+        assert (tmp_path / "accounts.json").exists()
+
+
+class TestAccountIdentity:
+    """Test stable account IDs and leasing."""
+
+    def test_ids_survive_removal_and_reload(self, tmp_path):
+        """Removing an account reindexes positions but keeps IDs and the active account."""
+        manager = make_manager(tmp_path, count=3)
+        first, second, third = manager.get_accounts()
+        manager._active_index_by_family["gemini"] = 2
+
+        assert manager.remove_account(first)
+        assert [a.index for a in manager.get_accounts()] == [0, 1]
+        assert manager.get_account_by_id(third.id) is third
+        assert manager.get_current_account_for_family("gemini") is third
+
+        data = manager._build_storage().to_dict()
+        reloaded = AccountManager(storage=AccountStorage.from_dict(data))
+        assert [a.id for a in reloaded.get_accounts()] == [second.id, third.id]
+
+    def test_id_is_kept_across_token_rotation(self):
+        """A persisted ID does not change when the refresh token does."""
+        metadata = AccountMetadata(refresh_token="old-token")
+        data = metadata.to_dict()
+        data["refreshToken"] = "new-token"
+        assert AccountMetadata.from_dict(data).id == metadata.id
+
+    @pytest.mark.asyncio
+    async def test_concurrent_leases(self, tmp_path):
+        """Concurrent acquires lease consistently and release their counts."""
+        manager = make_manager(tmp_path, count=2)
+
+        leases = await asyncio.gather(*(manager.acquire_for_family("claude") for _ in range(10)))
+        account = leases[0].account
+        assert all(lease.account is account for lease in leases)
+        assert account.active_requests == 10
+
+        for lease in leases:
+            manager.release(lease)
+        assert account.active_requests == 0
+
+
+class TestSelectionStrategies:
+    """Test account selection strategies."""
+
+    def test_round_robin_spreads_requests(self, tmp_path):
+        """Round-robin moves to the next account on every selection."""
+        manager = make_manager(tmp_path, count=3, strategy="round-robin")
+        picks = [manager.get_current_or_next_for_family("claude").index for _ in range(6)]
+        assert picks == [1, 2, 0, 1, 2, 0]
+
+    @pytest.mark.asyncio
+    async def test_least_loaded_uses_idle_accounts(self, tmp_path):
+        """Concurrent leases land on different accounts."""
+        manager = make_manager(tmp_path, count=3, strategy={"claude": "least-loaded"})
+        leases = [await manager.acquire_for_family("claude") for _ in range(3)]
+        assert sorted(lease.account.index for lease in leases) == [0, 1, 2]
+        assert manager.get_strategy("gemini") == "sticky"
+
+    def test_weighted_prefers_accounts_without_429s(self, tmp_path):
+        """Accounts with a history of 429s are picked less often."""
+        manager = make_manager(tmp_path, count=2, strategy="weighted")
+        healthy, throttled = manager.get_accounts()
+        throttled.rate_limit_ewma["claude"] = 0.75
+
+        picks = [manager.get_current_or_next_for_family("claude") for _ in range(100)]
+        assert picks.count(healthy) == 80
+        assert picks.count(throttled) == 20
+
+    def test_weighted_skips_rate_limited_accounts(self, tmp_path):
+        """Rate-limited accounts are never selected."""
+        manager = make_manager(tmp_path, count=2, strategy="weighted")
+        limited = manager.get_accounts()[0]
+        manager.mark_rate_limited(limited, 60_000, "claude", "antigravity")
+
+        picks = {manager.get_current_or_next_for_family("claude").id for _ in range(10)}
+        assert picks == {manager.get_accounts()[1].id}
+
+    def test_unknown_strategy_rejected(self, tmp_path):
+        with pytest.raises(ValueError):
+            make_manager(tmp_path, strategy="random")
+
+
+class TestAsyncStorage:
+    """Test that storage I/O stays off the event loop."""
+
+    @pytest.mark.asyncio
+    async def test_contended_lock_does_not_block_loop(self, tmp_path):
+        """The loop keeps running while a save waits for the file lock."""
+        from filelock import FileLock
+
+        path = tmp_path / "accounts.json"
+        manager = make_manager(tmp_path)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        lock = FileLock(str(storage_module.get_lock_path(path)))
+        lock.acquire()
+        task = asyncio.create_task(ticker())
+        save = asyncio.create_task(manager.save_to_disk())
+        await asyncio.sleep(0.2)
+        lock.release()
+        await save
+        task.cancel()
+
+        assert ticks >= 10
+        assert (await storage_module.aload_accounts(str(path))).accounts[0].email == "user0@example.com"
+
+    @pytest.mark.asyncio
+    async def test_load_from_disk_uses_async_load(self, tmp_path):
+        """AccountManager.load_from_disk reads the file and applies options."""
+        await make_manager(tmp_path).save_to_disk()
+
+        manager = await AccountManager.load_from_disk(
+            storage_path=str(tmp_path / "accounts.json"),
+            strategy="round-robin",
+        )
+        assert manager.get_account_count() == 2
+        assert manager.get_strategy("claude") == "round-robin"
+
+
+class TestHotReload:
+    """Test merging external changes to the accounts file into a running pool."""
+
+    @pytest.mark.asyncio
+    async def test_login_and_logout_are_picked_up(self, tmp_path):
+        """Accounts added or removed on disk appear in or leave the pool."""
+        path = str(tmp_path / "accounts.json")
+        await make_manager(tmp_path, count=2).save_to_disk()
+        manager = await AccountManager.load_from_disk(storage_path=path, reload_interval_ms=1)
+        first, second = manager.get_accounts()
+        manager.mark_rate_limited(first, 60_000, "claude", "antigravity")
+        manager.get_next_for_family("claude")  # Active account is now the second
+
+        storage_module.add_or_update_account(refresh_token="refresh-new", email="new@example.com", storage_path=path)
+        storage_module.remove_account_by_email("user0@example.com", storage_path=path)
+        assert await manager.reload_if_changed()
+
+        assert [account.email for account in manager.get_accounts()] == ["user1@example.com", "new@example.com"]
+        assert manager.get_accounts()[0] is second  # Runtime state kept
+        assert manager.get_current_account_for_family("claude") is second
+        assert not await manager.reload_if_changed()
+
+    @pytest.mark.asyncio
+    async def test_relogin_replaces_refresh_token(self, tmp_path):
+        """A new refresh token on disk wins; local changes are not undone."""
+        path = str(tmp_path / "accounts.json")
+        await make_manager(tmp_path, count=2).save_to_disk()
+        manager = await AccountManager.load_from_disk(storage_path=path, reload_interval_ms=1)
+        first, second = manager.get_accounts()
+        manager.remove_account(second)
+
+        storage_module.add_or_update_account(refresh_token="refresh-relogin", email="user0@example.com", storage_path=path)
+        await manager.reload_if_changed()
+
+        assert manager.get_accounts() == [first]
+        assert first.refresh_token == "refresh-relogin"
+
+    @pytest.mark.asyncio
+    async def test_save_keeps_accounts_added_elsewhere(self, tmp_path):
+        """Saving merges the file first instead of overwriting new accounts."""
+        path = str(tmp_path / "accounts.json")
+        await make_manager(tmp_path, count=1).save_to_disk()
+        manager = await AccountManager.load_from_disk(storage_path=path, reload_interval_ms=60_000)
+        manager._next_reload_check = float("inf")  # Only the pre-save check runs
+
+        storage_module.add_or_update_account(refresh_token="refresh-new", email="new@example.com", storage_path=path)
+        manager.mark_rate_limited(manager.get_accounts()[0], 60_000, "claude", "antigravity")
+        await manager.save_to_disk()
+
+        emails = [account.email for account in storage_module.load_accounts(path).accounts]
+        assert emails == ["user0@example.com", "new@example.com"]
+
+
+class TestTokenRotation:
+    """Test write-through of rotated refresh tokens between processes."""
+
+    @pytest.mark.asyncio
+    async def test_rotation_is_written_through_and_merged(self, tmp_path):
+        """A rotated token reaches disk at once without dropping concurrent changes."""
+        path = str(tmp_path / "accounts.json")
+        await make_manager(tmp_path, count=1).save_to_disk()
+        manager = await AccountManager.load_from_disk(storage_path=path, save_debounce_ms=60_000)
+        storage_module.add_or_update_account(refresh_token="refresh-new", email="new@example.com", storage_path=path)
+
+        await manager.persist_rotated_token(manager.get_accounts()[0], "refresh-rotated")
+
+        stored = storage_module.load_accounts(path).accounts
+        assert [account.refresh_token for account in stored] == ["refresh-rotated", "refresh-new"]
+
+    @pytest.mark.asyncio
+    async def test_sibling_adopts_rotated_token(self, tmp_path):
+        """Another process picks up the rotated token before its next refresh."""
+        path = str(tmp_path / "accounts.json")
+        await make_manager(tmp_path, count=2).save_to_disk()
+        first = await AccountManager.load_from_disk(storage_path=path)
+        second = await AccountManager.load_from_disk(storage_path=path)
+
+        await first.persist_rotated_token(first.get_accounts()[1], "refresh-rotated")
+
+        assert await second.adopt_rotated_tokens() == 1
+        assert [account.refresh_token for account in second.get_accounts()] == ["refresh-0", "refresh-rotated"]
+        assert await second.adopt_rotated_tokens() == 0
+        assert await first.adopt_rotated_tokens() == 0  # Its own write is not adopted again
+
+    @pytest.mark.asyncio
+    async def test_full_save_keeps_token_rotated_elsewhere(self, tmp_path):
+        """With hot reload off, a sibling's regular save does not restore the stale token."""
+        path = str(tmp_path / "accounts.json")
+        await make_manager(tmp_path, count=2).save_to_disk()
+        first = await AccountManager.load_from_disk(storage_path=path, reload_interval_ms=0)
+        second = await AccountManager.load_from_disk(storage_path=path, reload_interval_ms=0)
+
+        await second.persist_rotated_token(second.get_accounts()[0], "refresh-rotated")
+        first.mark_rate_limited(first.get_accounts()[1], 60_000, "claude", "antigravity")
+        await first.save_to_disk()
+
+        stored = storage_module.load_accounts(path).accounts
+        assert [account.refresh_token for account in stored] == ["refresh-rotated", "refresh-1"]
+        assert stored[1].rate_limit_reset_times.claude
+        assert first.get_accounts()[0].refresh_token == "refresh-rotated"
+
+
+class TestQuotaPersistence:
+    """Test that per-model rate limits survive a save/load cycle."""
+
+    @pytest.mark.asyncio
+    async def test_per_model_limits_round_trip(self, tmp_path):
+        """Model-specific quota keys are written and restored."""
+        manager = make_manager(tmp_path)
+        account = manager.get_accounts()[0]
+        manager.mark_rate_limited(account, 60_000, "gemini", "antigravity", "gemini-3-pro")
+        manager.mark_rate_limited(account, 60_000, "claude", "antigravity")
+        await manager.save_to_disk()
+
+        reloaded = AccountManager(storage_path=str(tmp_path / "accounts.json"))
+        restored = reloaded.get_accounts()[0]
+        assert set(restored.rate_limit_reset_times) == {"gemini-antigravity:gemini-3-pro", "claude"}
+        assert reloaded.is_rate_limited_for_header_style(restored, "gemini", "antigravity", "gemini-3-pro")
+
+    def test_expired_limits_are_pruned(self, tmp_path):
+        """Reset times in the past are not persisted."""
+        manager = make_manager(tmp_path)
+        account = manager.get_accounts()[0]
+        account.rate_limit_reset_times["gemini-cli:gemini-3-flash"] = 1
+        account.rate_limit_reset_times["claude"] = 2**52
+
+        data = account.to_metadata().to_dict()
+        assert data["rateLimitResetTimes"] == {"claude": 2**52}
+
+    def test_v3_storage_is_migrated(self):
+        """A v3 file with fixed, nullable keys loads as the current version."""
+        storage = AccountStorage.from_dict({
+            "version": 3,
+            "accounts": [{
+                "refreshToken": "token",
+                "email": "user@example.com",
+                "rateLimitResetTimes": {"claude": 2**52, "gemini-antigravity": None, "gemini-cli": None},
+            }],
+        })
+        assert storage.version == STORAGE_VERSION
+        assert storage.accounts[0].rate_limit_reset_times.times == {"claude": 2**52}
+        assert storage.accounts[0].rate_limit_reset_times.claude == 2**52
+
+
+class TestSQLiteStore:
+    """Test the shared SQLite backend."""
+
+    def test_round_trip_through_storage_api(self, tmp_path):
+        """load_accounts/save_accounts dispatch on the .db suffix and use WAL."""
+        import sqlite3
+
+        path = str(tmp_path / "accounts.db")
+        storage = AccountStorage(accounts=[AccountMetadata(refresh_token="token", email="a@example.com")])
+        storage.accounts[0].rate_limit_reset_times.times["gemini-cli:gemini-3-pro"] = 2**52
+        storage_module.save_accounts(storage, path)
+
+        loaded = storage_module.load_accounts(path)
+        assert loaded.accounts[0].email == "a@example.com"
+        assert loaded.accounts[0].rate_limit_reset_times.times == {"gemini-cli:gemini-3-pro": 2**52}
+        mode = sqlite3.connect(path).execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode == "wal"
+
+    @pytest.mark.asyncio
+    async def test_workers_share_rate_limits(self, tmp_path):
+        """A second process sees limits learned by the first instead of clobbering them."""
+        path = str(tmp_path / "accounts.db")
+        storage_module.save_accounts(
+            AccountStorage(accounts=[AccountMetadata(refresh_token=f"refresh-{i}") for i in range(2)]),
+            path,
+        )
+        worker_a = AccountManager(storage_path=path)
+        worker_b = AccountManager(storage_path=path)
+
+        worker_a.mark_rate_limited(worker_a.get_accounts()[0], 60_000, "claude", "antigravity")
+        await worker_a.save_to_disk()
+
+        worker_b.mark_account_cooling_down(worker_b.get_accounts()[1], 60_000, "test")
+        await worker_b.save_to_disk()
+
+        assert worker_b.is_rate_limited(worker_b.get_accounts()[0], "claude")
+        assert worker_b.get_next_for_family("claude") is None
+
+        stored = storage_module.load_accounts(path)
+        assert stored.accounts[0].rate_limit_reset_times.claude is not None
+        assert stored.accounts[1].cooling_down_until is not None
+
+    @pytest.mark.asyncio
+    async def test_removed_account_rows_are_deleted(self, tmp_path):
+        """Removing an account deletes its row and its rate limits."""
+        path = str(tmp_path / "accounts.db")
+        storage_module.save_accounts(
+            AccountStorage(accounts=[AccountMetadata(refresh_token=f"refresh-{i}") for i in range(2)]),
+            path,
+        )
+        manager = AccountManager(storage_path=path)
+        first = manager.get_accounts()[0]
+        manager.mark_rate_limited(first, 60_000, "claude", "antigravity")
+        await manager.save_to_disk()
+
+        manager.remove_account(first)
+        await manager.save_to_disk()
+
+        stored = storage_module.load_accounts(path)
+        assert [acc.refresh_token for acc in stored.accounts] == ["refresh-1"]
+        assert storage_module.SQLiteAccountStore(Path(path)).load_quota_state() == {}
@@ -0,0 +1,190 @@
+"""
+Test API Server
+
+Offline tests for the OpenAI-compatible API server.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+pytest.importorskip("fastapi")
+
+from fastapi.testclient import TestClient
+
+from antigravity_auth import AllAccountsRateLimitedError, InvalidRequestError
+from antigravity_auth.api_server.api import SERVED_MODELS, app
+from antigravity_auth.storage import AccountMetadata, AccountStorage, save_accounts
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Test client backed by an empty, isolated accounts file."""
+    monkeypatch.setenv("ANTIGRAVITY_STORAGE_PATH", str(tmp_path / "accounts.json"))
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+class TestServiceLifecycle:
+    """Test that one service is shared across requests."""
+
+    def test_service_shared_across_requests(self, client, monkeypatch):
+        """Every request reuses the startup service with a per-request model."""
+        service = app.state.service
+        calls = []
+
+        async def fake_generate(prompt, system_prompt=None, model=None, **kwargs):
+            calls.append((id(service), model))
+            return "ok"
+
+        async def fake_check_capacity(model=None):
+            pass
+
+        monkeypatch.setattr(service, "generate", fake_generate)
+        monkeypatch.setattr(service, "check_capacity", fake_check_capacity)
+
+        for model in ("gemini-3-pro", "claude-sonnet-4-5"):
+            response = client.post(
+                "/v1/chat/completions",
+                json={"model": model, "messages": [{"role": "user", "content": "Hi"}]},
+            )
+            assert response.status_code == 200
+            assert app.state.service is service
+
+        assert calls == [(id(service), "gemini-3-pro"), (id(service), "claude-sonnet-4-5")]
+
+
+@pytest.fixture
+def rate_limited_client(tmp_path, monkeypatch):
+    """Test client whose only account is rate-limited for Claude and gemini-3-pro for 90s."""
+    monkeypatch.setenv("ANTIGRAVITY_STORAGE_PATH", str(tmp_path / "accounts.json"))
+    save_accounts(AccountStorage(accounts=[AccountMetadata(refresh_token="refresh", email="a@example.com")]))
+    with TestClient(app) as test_client:
+        manager = app.state.service.account_manager
+        account = manager.get_accounts()[0]
+        manager.mark_rate_limited(account, 90_000, "claude", "antigravity")
+        manager.mark_rate_limited(account, 90_000, "gemini", "antigravity", model="gemini-3-pro")
+        manager.mark_rate_limited(account, 90_000, "gemini", "gemini-cli", model="gemini-3-pro")
+        yield test_client
+
+
+class TestErrorMapping:
+    """Test OpenAI-style status codes and error bodies for service errors."""
+
+    def test_no_accounts_is_503(self, client):
+        """An empty pool is reported as unavailable, not as a server crash."""
+        response = client.post(
+            "/v1/chat/completions",
+            json={"model": "gemini-3-pro", "messages": [{"role": "user", "content": "Hi"}]},
+        )
+        assert response.status_code == 503
+        assert response.json()["error"]["code"] == "no_accounts"
+
+    def test_exhausted_pool_is_shed_with_retry_after(self, rate_limited_client, monkeypatch):
+        """With no account available, requests get 429 before any upstream call."""
+        service = app.state.service
+        calls = []
+
+        async def fake_generate(*args, **kwargs):
+            calls.append(kwargs)
+            return "ok"
+
+        monkeypatch.setattr(service, "generate", fake_generate)
+        for model, stream in [("claude-sonnet-4-5", False), ("claude-sonnet-4-5", True), ("gemini-3-pro", False)]:
+            response = rate_limited_client.post(
+                "/v1/chat/completions",
+                json={"model": model, "stream": stream, "messages": [{"role": "user", "content": "Hi"}]},
+            )
+            assert response.status_code == 429
+            assert 1 <= int(response.headers["Retry-After"]) <= 90
+            assert response.json()["error"]["code"] == "rate_limit_exceeded"
+        assert calls == []
+
+    def test_stream_error_before_output_keeps_status(self, client, monkeypatch):
+        """A rate limit raised before the first chunk is a 429, not a 200 stream."""
+        service = app.state.service
+
+        async def fake_check_capacity(model=None):
+            pass
+
+        async def fake_generate_stream(**kwargs):
+            raise AllAccountsRateLimitedError("All accounts rate-limited. Retry in 30s.", 30_000)
+            yield  # pragma: no cover
+
+        monkeypatch.setattr(service, "check_capacity", fake_check_capacity)
+        monkeypatch.setattr(service, "generate_stream", fake_generate_stream)
+
+        response = client.post(
+            "/v1/chat/completions",
+            json={"model": "gemini-3-pro", "stream": True, "messages": [{"role": "user", "content": "Hi"}]},
+        )
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "30"
+
+    def test_invalid_request_is_400(self, client, monkeypatch):
+        """A request the API rejects is reported as the client's error."""
+        service = app.state.service
+
+        async def fake_check_capacity(model=None):
+            pass
+
+        async def fake_generate(**kwargs):
+            raise InvalidRequestError("HTTP 400: invalid argument", 400)
+
+        monkeypatch.setattr(service, "check_capacity", fake_check_capacity)
+        monkeypatch.setattr(service, "generate", fake_generate)
+
+        response = client.post(
+            "/v1/chat/completions",
+            json={"model": "gemini-3-pro", "messages": [{"role": "user", "content": "Hi"}]},
+        )
+        assert response.status_code == 400
+        assert response.json()["error"]["type"] == "invalid_request_error"
+
+
+class TestReadiness:
+    """Test /ready and /health computed from live account state."""
+
+    def test_no_accounts_is_not_ready(self, client):
+        """An empty pool fails readiness but stays live."""
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["reasons"] == ["no accounts configured"]
+
+        health = client.get("/health")
+        assert health.status_code == 200
+        assert health.json()["status"] == "degraded"
+
+    def test_ready_until_every_account_is_rate_limited(self, tmp_path, monkeypatch):
+        """Readiness follows per-model rate limits and flips to 503 with Retry-After."""
+        path = tmp_path / "accounts.json"
+        monkeypatch.setenv("ANTIGRAVITY_STORAGE_PATH", str(path))
+        save_accounts(AccountStorage(accounts=[AccountMetadata(refresh_token="refresh", email="a@example.com")]))
+
+        with TestClient(app) as test_client:
+            response = test_client.get("/ready")
+            assert response.status_code == 200
+            assert response.json()["models"]["claude-sonnet-4-5"]["available"] == 1
+
+            manager = app.state.service.account_manager
+            account = manager.get_accounts()[0]
+            manager.mark_rate_limited(account, 90_000, "gemini", "antigravity", model="gemini-3-pro")
+            manager.mark_rate_limited(account, 90_000, "gemini", "gemini-cli", model="gemini-3-pro")
+
+            response = test_client.get("/ready")
+            assert response.status_code == 200  # Other models can still be served
+            assert response.json()["models"]["gemini-3-pro"]["available"] == 0
+            assert response.json()["models"]["gemini-3-flash"]["available"] == 1
+
+            for model in SERVED_MODELS:
+                family = "claude" if "claude" in model else "gemini"
+                for header_style in ("antigravity", "gemini-cli"):
+                    manager.mark_rate_limited(account, 90_000, family, header_style, model=model)
+
+            response = test_client.get("/ready")
+            assert response.status_code == 503
+            assert 1 <= int(response.headers["Retry-After"]) <= 90
@@ -0,0 +1,202 @@
+"""
+Test Antigravity Client
+
+Offline tests for the HTTP client using httpx mock transports.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from antigravity_auth.client import AntigravityClient, StreamTimeouts, prepare_request
+from antigravity_auth.constants import ANTIGRAVITY_ENDPOINT_AUTOPUSH, ANTIGRAVITY_ENDPOINT_DAILY
+
+
+SSE_BODY = 'data: {"response": {"candidates": [{"content": {"parts": [{"text": "hi"}]}}]}}\n\n'
+
+
+def make_request(streaming: bool = True):
+    """Build a minimal prepared request."""
+    return prepare_request(
+        model="gemini-3-pro",
+        contents=[{"role": "user", "parts": [{"text": "Test"}]}],
+        access_token="token",
+        streaming=streaming,
+    )
+
+
+class TestConnectionPool:
+    """Test the shared connection pool lifecycle."""
+
+    def test_http_client_is_reused(self):
+        """The pooled client is created once and shared."""
+        client = AntigravityClient(max_connections_per_host=4)
+        assert client.http_client is client.http_client
+
+    @pytest.mark.asyncio
+    async def test_aclose_recreates_pool(self):
+        """A closed pool is replaced on next use."""
+        client = AntigravityClient()
+        first = client.http_client
+        await client.aclose()
+        assert first.is_closed
+        assert client.http_client is not first
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_requests_share_pool(self):
+        """execute and stream_execute both go through the pooled client."""
+        seen = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(str(request.url))
+            return httpx.Response(200, text=SSE_BODY)
+
+        async with AntigravityClient() as client:
+            client._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            response = await client.execute(make_request())
+            events = [event async for event in client.stream_execute(make_request())]
+
+        assert response.success
+        assert events[-1] == {"done": True}
+        assert len(seen) == 2
+
+    @pytest.mark.asyncio
+    async def test_prewarm_opens_each_endpoint(self):
+        """prewarm() contacts every endpoint and reports which ones answered."""
+        seen = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append((request.method, f"https://{request.url.host}"))
+            if request.url.host in ANTIGRAVITY_ENDPOINT_AUTOPUSH:
+                raise httpx.ConnectError("unreachable", request=request)
+            return httpx.Response(404)
+
+        async with AntigravityClient() as client:
+            client._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            results = await client.prewarm([ANTIGRAVITY_ENDPOINT_DAILY, ANTIGRAVITY_ENDPOINT_AUTOPUSH])
+
+        assert results == {ANTIGRAVITY_ENDPOINT_DAILY: True, ANTIGRAVITY_ENDPOINT_AUTOPUSH: False}
+        assert ("HEAD", ANTIGRAVITY_ENDPOINT_DAILY) in seen
+
+
+class TestHttp2Fallback:
+    """Test the downgrade to HTTP/1.1 after HTTP/2 protocol errors."""
+
+    @staticmethod
+    def make_client(error: Exception):
+        """Build an HTTP/2 client whose first request fails with error."""
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request)
+            if len(calls) == 1:
+                raise error
+            return httpx.Response(200, text=SSE_BODY)
+
+        client = AntigravityClient(http2=True)
+        client._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        client._build_http_client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return client
+
+    @pytest.mark.asyncio
+    async def test_h2_error_swaps_pool_without_closing_it(self):
+        """An h2 protocol error disables HTTP/2 and leaves in-flight requests their pool."""
+        h2_exceptions = pytest.importorskip("h2.exceptions")
+        try:
+            raise h2_exceptions.ProtocolError("invalid frame")
+        except h2_exceptions.ProtocolError as cause:
+            error = httpx.RemoteProtocolError("invalid frame")
+            error.__cause__ = cause
+
+        client = self.make_client(error)
+        first = client.http_client
+        response = await client.execute(make_request())
+
+        assert response.success
+        assert not client.http2
+        assert client.http_client is not first
+        assert not first.is_closed  # Other requests may still be using it
+        await client.aclose()
+        assert first.is_closed
+
+    @pytest.mark.asyncio
+    async def test_http1_protocol_error_keeps_http2(self):
+        """An ordinary protocol error does not disable HTTP/2 or replace the pool."""
+        pytest.importorskip("h2")
+        client = self.make_client(httpx.RemoteProtocolError("Server disconnected"))
+        first = client.http_client
+        response = await client.execute(make_request())
+
+        assert response.success
+        assert client.http2
+        assert client.http_client is first
+        await client.aclose()
+
+
+def slow_body(delay_before: float, chunks_before: int = 0):
+    """Build an async SSE body that stalls after some chunks."""
+    async def body():
+        for _ in range(chunks_before):
+            yield SSE_BODY.encode()
+        await asyncio.sleep(delay_before)
+        yield SSE_BODY.encode()
+    return body()
+
+
+class TestStreamTimeouts:
+    """Test connect/first-byte/idle timeouts on streams."""
+
+    def test_family_and_call_overrides(self):
+        """Per-call timeouts beat per-family ones, which beat the default."""
+        claude = StreamTimeouts(first_byte=180)
+        client = AntigravityClient(family_timeouts={"claude": claude})
+        call = StreamTimeouts(idle=5)
+
+        assert client.get_timeouts("claude-sonnet-4-5") is claude
+        assert client.get_timeouts("gemini-3-pro") is client.stream_timeouts
+        assert client.get_timeouts("claude-sonnet-4-5", call) is call
+
+    @pytest.mark.asyncio
+    async def test_first_byte_timeout_fails_over(self):
+        """An endpoint that sends headers but no body is abandoned for the next."""
+        seen = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(f"https://{request.url.host}")
+            if request.url.host in ANTIGRAVITY_ENDPOINT_DAILY:
+                return httpx.Response(200, content=slow_body(5))
+            return httpx.Response(200, text=SSE_BODY)
+
+        timeouts = StreamTimeouts(first_byte=0.1)
+        async with AntigravityClient() as client:
+            client._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            events = [event async for event in client.stream_execute(make_request(), timeouts=timeouts)]
+
+        assert seen == [ANTIGRAVITY_ENDPOINT_DAILY, ANTIGRAVITY_ENDPOINT_AUTOPUSH]
+        assert "chunk" in events[0]
+        assert events[-1] == {"done": True}
+
+    @pytest.mark.asyncio
+    async def test_idle_timeout_never_fails_over(self):
+        """A stream that stalls after output ends with an error, not a retry."""
+        seen = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(request.url.host)
+            return httpx.Response(200, content=slow_body(5, chunks_before=1))
+
+        timeouts = StreamTimeouts(idle=0.1)
+        async with AntigravityClient() as client:
+            client._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            events = [event async for event in client.stream_execute(make_request(), timeouts=timeouts)]
+
+        assert len(seen) == 1
+        assert "chunk" in events[0]
+        assert events[-1]["error"] and events[-1]["timeout"] == "idle"
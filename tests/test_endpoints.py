@@ -0,0 +1,192 @@
+"""
+Test Endpoint Health
+
+Offline tests for endpoint health tracking and adaptive endpoint ordering.
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from antigravity_auth.client import AntigravityClient, prepare_request
+from antigravity_auth.constants import ANTIGRAVITY_ENDPOINT_FALLBACKS
+from antigravity_auth.endpoints import CIRCUIT_HALF_OPEN, CIRCUIT_OPEN, EndpointHealthTracker, HedgePolicy
+
+
+DAILY, AUTOPUSH, PROD = ANTIGRAVITY_ENDPOINT_FALLBACKS
+SSE_BODY = 'data: {"response": {"candidates": [{"content": {"parts": [{"text": "hi"}]}}]}}\n\n'
+
+
+class TestEndpointHealthTracker:
+    """Test ordering and the circuit breaker."""
+
+    def test_unmeasured_endpoints_keep_configured_order(self):
+        """With no data, endpoints are tried in the configured order."""
+        tracker = EndpointHealthTracker()
+        assert tracker.order(ANTIGRAVITY_ENDPOINT_FALLBACKS) == [DAILY, AUTOPUSH, PROD]
+
+    def test_faster_endpoint_first(self):
+        """Measured endpoints are ordered by latency, ahead of unmeasured ones."""
+        tracker = EndpointHealthTracker()
+        tracker.record_success(DAILY, 0.9)
+        tracker.record_success(PROD, 0.1)
+        assert tracker.order(ANTIGRAVITY_ENDPOINT_FALLBACKS) == [PROD, DAILY, AUTOPUSH]
+
+    def test_circuit_opens_and_probes(self, monkeypatch):
+        """A failing endpoint is skipped, then probed first once the open period ends."""
+        clock = [1000.0]
+        monkeypatch.setattr("antigravity_auth.endpoints.time.monotonic", lambda: clock[0])
+        tracker = EndpointHealthTracker(failure_threshold=2, open_seconds=30)
+
+        tracker.record_failure(DAILY)
+        tracker.record_failure(DAILY)
+        assert tracker.get(DAILY).state == CIRCUIT_OPEN
+        assert tracker.order(ANTIGRAVITY_ENDPOINT_FALLBACKS) == [AUTOPUSH, PROD]
+
+        clock[0] += 31
+        assert tracker.order(ANTIGRAVITY_ENDPOINT_FALLBACKS) == [DAILY, AUTOPUSH, PROD]
+        assert tracker.get(DAILY).state == CIRCUIT_HALF_OPEN
+        # Only one probe at a time
+        assert tracker.order(ANTIGRAVITY_ENDPOINT_FALLBACKS) == [AUTOPUSH, PROD]
+
+        tracker.record_failure(DAILY)  # Failed probe reopens the circuit
+        assert tracker.get(DAILY).state == CIRCUIT_OPEN
+
+        clock[0] += 31
+        tracker.order(ANTIGRAVITY_ENDPOINT_FALLBACKS)
+        tracker.record_success(DAILY, 0.05)
+        assert tracker.order(ANTIGRAVITY_ENDPOINT_FALLBACKS)[0] == DAILY
+
+    def test_all_open_still_returns_endpoints(self):
+        """Requests are not refused when every circuit is open."""
+        tracker = EndpointHealthTracker(failure_threshold=1)
+        for endpoint in ANTIGRAVITY_ENDPOINT_FALLBACKS:
+            tracker.record_failure(endpoint)
+        assert tracker.order(ANTIGRAVITY_ENDPOINT_FALLBACKS) == [DAILY, AUTOPUSH, PROD]
+
+    def test_quiet_mode_suppresses_circuit_message(self, capsys):
+        """A client in quiet mode passes it to its tracker."""
+        client = AntigravityClient(quiet_mode=True)
+        client.endpoint_health.failure_threshold = 1
+        client.endpoint_health.record_failure(DAILY)
+        assert client.endpoint_health.get(DAILY).state == CIRCUIT_OPEN
+        assert capsys.readouterr().out == ""
+
+
+class TestClientEndpointOrdering:
+    """Test that the client skips endpoints with open circuits."""
+
+    @pytest.mark.asyncio
+    async def test_failing_endpoint_skipped(self):
+        """After daily returns 503, requests go straight to autopush."""
+        seen = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(f"{request.url.scheme}://{request.url.host}")
+            if request.url.host in DAILY:
+                return httpx.Response(503)
+            return httpx.Response(200, text=SSE_BODY)
+
+        request = prepare_request(
+            model="gemini-3-pro",
+            contents=[{"role": "user", "parts": [{"text": "Test"}]}],
+            access_token="token",
+        )
+        async with AntigravityClient(endpoint_health=EndpointHealthTracker(failure_threshold=1)) as client:
+            client._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            assert (await client.execute(request)).success
+            assert seen == [DAILY, AUTOPUSH]
+            seen.clear()
+
+            events = [event async for event in client.stream_execute(request)]
+
+        assert events[-1] == {"done": True}
+        assert seen == [AUTOPUSH]
+        states = {health["endpoint"]: health["state"] for health in client.endpoint_health.snapshot()}
+        assert states[DAILY] == CIRCUIT_OPEN
+
+
+class TestHedging:
+    """Test hedged requests in execute()."""
+
+    def test_policy_delay_and_budget(self):
+        """Delay is a latency percentile; hedges are capped by the budget."""
+        policy = HedgePolicy(percentile=0.9, budget=0.5, min_samples=10)
+        for i in range(9):
+            policy.record(DAILY, i / 100)
+        assert policy.delay(DAILY) is None
+
+        policy.record(DAILY, 0.09)
+        assert policy.delay(DAILY) == 0.09
+
+        policy.on_request()
+        assert not policy.try_hedge()
+        policy.on_request()
+        assert policy.try_hedge()
+        assert not policy.try_hedge()
+
+    @pytest.mark.asyncio
+    async def test_slow_endpoint_is_hedged(self):
+        """A late primary is raced against the next endpoint and the loser cancelled."""
+        cancelled = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.host in DAILY:
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    cancelled.append(True)
+                    raise
+            return httpx.Response(200, json={"response": {}})
+
+        policy = HedgePolicy(budget=1.0, min_samples=5)
+        for _ in range(5):
+            policy.record(DAILY, 0.01)
+
+        request = prepare_request(
+            model="gemini-3-pro-image",
+            contents=[{"role": "user", "parts": [{"text": "Test"}]}],
+            access_token="token",
+            streaming=False,
+        )
+        async with AntigravityClient(hedging=policy) as client:
+            client._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            start = time.monotonic()
+            response = await client.execute(request)
+
+        assert response.success
+        assert time.monotonic() - start < 1
+        assert policy.hedges == 1 and policy.hedge_wins == 1
+        assert cancelled == [True]
+
+    @pytest.mark.asyncio
+    async def test_no_hedge_without_budget(self):
+        """With the budget spent, a slow primary is simply awaited."""
+        seen = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(request.url.host)
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json={})
+
+        policy = HedgePolicy(budget=0.0, min_samples=1)
+        policy.record(DAILY, 0.001)
+        request = prepare_request(
+            model="gemini-3-pro",
+            contents=[{"role": "user", "parts": [{"text": "Test"}]}],
+            access_token="token",
+            streaming=False,
+        )
+        async with AntigravityClient(hedging=policy) as client:
+            client._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            assert (await client.execute(request)).success
+
+        assert len(seen) == 1
+        assert policy.hedges == 0
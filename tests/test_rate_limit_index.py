@@ -0,0 +1,88 @@
+"""
+Test Rate Limit Index
+
+Offline tests for the heap/Fenwick availability index.
+"""
+
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from antigravity_auth.accounts import AccountManager
+from antigravity_auth.rate_limit_index import AvailabilityIndex
+from antigravity_auth.storage import AccountMetadata, AccountStorage
+
+
+class TestAvailabilityIndex:
+    """Test next-available and min-wait queries."""
+
+    def test_next_available_wraps(self):
+        """The search starts at the given position and wraps around."""
+        index = AvailabilityIndex(["a", "b", "c", "d"], [0, 500, 0, 500], now=100)
+        assert index.next_available(0) == 0
+        assert index.next_available(1) == 2
+        assert index.next_available(3) == 0
+        assert index.available_count == 2
+
+    def test_blocked_accounts_release_lazily(self):
+        """Accounts become available once a refresh passes their reset time."""
+        index = AvailabilityIndex(["a", "b"], [300, 200], now=100)
+        assert index.next_available(0) is None
+        assert index.min_wait(100) == 100
+
+        index.refresh(250)
+        assert index.next_available(0) == 1
+        assert index.min_wait(250) == 0
+
+    def test_update_moves_reset_time(self):
+        """Re-blocking with a later time leaves the earlier heap entry stale."""
+        index = AvailabilityIndex(["a"], [0], now=100)
+        index.update("a", 200, now=100)
+        index.update("a", 400, now=100)
+
+        index.refresh(300)
+        assert index.next_available(0) is None
+        assert index.min_wait(300) == 100
+
+        index.update("a", 0, now=300)
+        assert index.next_available(0) == 0
+
+
+class TestManagerIndex:
+    """Test that AccountManager keeps its indexes in sync."""
+
+    def make_manager(self, count: int) -> AccountManager:
+        storage = AccountStorage(
+            accounts=[AccountMetadata(refresh_token=f"refresh-{i}") for i in range(count)]
+        )
+        return AccountManager(storage=storage)
+
+    def test_min_wait_tracks_soonest_reset(self):
+        """Min wait is the soonest time any account frees up for the family."""
+        manager = self.make_manager(3)
+        for i, account in enumerate(manager.get_accounts()):
+            manager.mark_rate_limited(account, 60_000 * (i + 1), "claude", "antigravity")
+
+        assert 59_000 < manager.get_min_wait_time_for_family("claude") <= 60_000
+        assert manager.get_min_wait_time_for_family("gemini") == 0
+
+    def test_gemini_needs_both_quotas_exhausted(self):
+        """At family level a Gemini account stays available while one quota is left."""
+        manager = self.make_manager(2)
+        first, second = manager.get_accounts()
+        manager.mark_rate_limited(first, 60_000, "gemini", "antigravity", "gemini-3-pro")
+
+        assert manager.get_next_for_family("gemini", "gemini-3-pro") is first
+        assert manager.get_next_for_family("gemini", "gemini-3-pro", header_style="antigravity") is second
+
+    def test_removal_rebuilds_index(self):
+        """Positions stay correct after an account is removed."""
+        manager = self.make_manager(3)
+        first, second, third = manager.get_accounts()
+        manager.mark_rate_limited(second, 60_000, "claude", "antigravity")
+        assert manager.get_next_for_family("claude") is first
+
+        manager.remove_account(first)
+        assert manager.get_next_for_family("claude") is third
@@ -0,0 +1,508 @@
+"""
+Test Antigravity Service
+
+Offline tests for service internals (token refresh, request execution).
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from antigravity_auth import service as service_module
+from antigravity_auth import storage as storage_module
+from antigravity_auth.accounts import AccountManager
+from antigravity_auth.client import AntigravityClient, AntigravityResponse, StreamTimeouts
+from antigravity_auth.service import (
+    AntigravityError,
+    AntigravityService,
+    DeadlineExceededError,
+    InvalidRequestError,
+)
+from antigravity_auth.storage import AccountMetadata, AccountStorage
+from antigravity_auth.token import AuthDetails, TokenRefreshError
+
+
+@pytest.fixture(autouse=True)
+def isolated_storage(tmp_path, monkeypatch):
+    """Keep account writes away from the real config directory."""
+    monkeypatch.setenv("ANTIGRAVITY_STORAGE_PATH", str(tmp_path / "accounts.json"))
+    return tmp_path / "accounts.json"
+
+
+def make_service(count: int = 1, **kwargs) -> AntigravityService:
+    """Build a service over an in-memory pool of accounts."""
+    storage = AccountStorage(
+        accounts=[
+            AccountMetadata(refresh_token=f"refresh-{i}", email=f"user{i}@example.com", project_id="proj")
+            for i in range(count)
+        ]
+    )
+    service = AntigravityService(quiet_mode=True, **kwargs)
+    service._account_manager = AccountManager(
+        storage=storage,
+        save_debounce_ms=service.save_debounce_ms,
+        strategy=service.selection_strategy,
+        shared_state_path=service.shared_state_path,
+    )
+    return service
+
+
+class TestTokenRefresh:
+    """Test single-flight and refresh-ahead token handling."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_refreshes_are_coalesced(self, monkeypatch):
+        """Concurrent callers for one account share a single refresh."""
+        calls = []
+
+        async def fake_refresh(auth, http_client=None):
+            calls.append(auth.refresh)
+            await asyncio.sleep(0.05)
+            return AuthDetails(
+                refresh=auth.refresh,
+                access="access",
+                expires=int(time.time() * 1000) + 3600_000,
+                email=auth.email,
+            )
+
+        monkeypatch.setattr(service_module, "refresh_access_token", fake_refresh)
+        service = make_service()
+        account = service.account_manager.get_accounts()[0]
+
+        results = await asyncio.gather(*(service._get_auth_for_account(account) for _ in range(20)))
+
+        assert len(calls) == 1
+        assert all(result.access == "access" for result in results)
+        assert service.refresh_stats.refreshes == 1
+        assert service.refresh_stats.coalesced_waiters == 19
+        await service.aclose()
+
+    @pytest.mark.asyncio
+    async def test_refresh_ahead_renews_token(self, monkeypatch):
+        """Tokens past the refresh-ahead fraction are renewed in the background."""
+        calls = []
+
+        async def fake_refresh(auth, http_client=None):
+            calls.append(auth.refresh)
+            return AuthDetails(
+                refresh=auth.refresh,
+                access=f"access-{len(calls)}",
+                expires=int(time.time() * 1000) + 3600_000,
+                email=auth.email,
+            )
+
+        monkeypatch.setattr(service_module, "refresh_access_token", fake_refresh)
+        service = make_service(refresh_ahead_fraction=0.5)
+        account = service.account_manager.get_accounts()[0]
+
+        await service._get_auth_for_account(account)
+        # Pretend the token was issued long enough ago to be due for renewal
+        service._token_issued_at[account.id] -= 3600_000
+        service._refresh_ahead_task.cancel()
+        service._refresh_ahead_task = None
+        service._ensure_refresh_ahead()
+        await asyncio.sleep(0.05)
+
+        assert len(calls) == 2
+        assert service.refresh_stats.refresh_ahead == 1
+        assert (await service._get_auth_for_account(account)).access == "access-2"
+        await service.aclose()
+
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_waiters(self, monkeypatch):
+        """The first caller going away leaves the shared refresh running for others."""
+        async def fake_refresh(auth, http_client=None):
+            await asyncio.sleep(0.05)
+            return AuthDetails(
+                refresh=auth.refresh,
+                access="access",
+                expires=int(time.time() * 1000) + 3600_000,
+                email=auth.email,
+            )
+
+        monkeypatch.setattr(service_module, "refresh_access_token", fake_refresh)
+        service = make_service()
+        account = service.account_manager.get_accounts()[0]
+
+        first = asyncio.create_task(service._get_auth_for_account(account))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(service._get_auth_for_account(account))
+        await asyncio.sleep(0.01)
+        first.cancel()
+
+        assert (await second).access == "access"
+        assert first.cancelled()
+        await service.aclose()
+
+    @pytest.mark.asyncio
+    async def test_failed_refresh_ahead_backs_off(self, monkeypatch):
+        """A renewal that keeps failing is retried with backoff, not in a tight loop."""
+        calls = []
+
+        async def failing_refresh(auth, http_client=None):
+            calls.append(auth.refresh)
+            return None
+
+        monkeypatch.setattr(service_module, "refresh_access_token", failing_refresh)
+        service = make_service(refresh_ahead_fraction=0.5)
+        account = service.account_manager.get_accounts()[0]
+        service._current_auth[account.id] = AuthDetails(
+            refresh=account.refresh_token,
+            access="access",
+            expires=int(time.time() * 1000) + 3600_000,
+            email=account.email,
+        )
+        service._token_issued_at[account.id] = int(time.time() * 1000) - 3600_000  # Long overdue
+
+        service._ensure_refresh_ahead()
+        await asyncio.sleep(0.2)
+
+        assert len(calls) == 1
+        assert service._refresh_ahead_retry_at[account.id] > int(time.time() * 1000)
+        await service.aclose()
+
+    @pytest.mark.asyncio
+    async def test_token_cache_shared_across_services(self, monkeypatch):
+        """A second process reuses the cached access token instead of refreshing."""
+        calls = []
+
+        async def fake_refresh(auth, http_client=None):
+            calls.append(auth.refresh)
+            return AuthDetails(
+                refresh=auth.refresh,
+                access="cached-access",
+                expires=int(time.time() * 1000) + 3600_000,
+                email=auth.email,
+            )
+
+        monkeypatch.setattr(service_module, "refresh_access_token", fake_refresh)
+        first = make_service(token_cache=True)
+        await first._get_auth_for_account(first.account_manager.get_accounts()[0])
+
+        second = make_service(token_cache=True)
+        auth = await second._get_auth_for_account(second.account_manager.get_accounts()[0])
+
+        assert auth.access == "cached-access"
+        assert len(calls) == 1
+        assert second.refresh_stats.cache_hits == 1
+        await first.aclose()
+        await second.aclose()
+
+    @pytest.mark.asyncio
+    async def test_invalid_grant_retries_with_token_rotated_elsewhere(self, isolated_storage, monkeypatch):
+        """A token rotated by another process is used instead of removing the account."""
+        calls = []
+
+        async def fake_refresh(auth, http_client=None):
+            calls.append(auth.refresh)
+            if auth.refresh == "refresh-0":
+                # Meanwhile another process rotated the token and saved it
+                storage_module.update_refresh_token(account.id, "refresh-rotated", str(isolated_storage))
+                raise TokenRefreshError("revoked", code="invalid_grant")
+            return AuthDetails(
+                refresh=auth.refresh,
+                access="access",
+                expires=int(time.time() * 1000) + 3600_000,
+                email=auth.email,
+            )
+
+        monkeypatch.setattr(service_module, "refresh_access_token", fake_refresh)
+        service = make_service()
+        await service.account_manager.flush()
+        account = service.account_manager.get_accounts()[0]
+
+        auth = await service._get_auth_for_account(account)
+
+        assert auth.access == "access"
+        assert calls == ["refresh-0", "refresh-rotated"]
+        assert service.account_manager.get_account_count() == 1
+        await service.aclose()
+
+
+def prime_auth(service: AntigravityService) -> None:
+    """Cache valid access tokens for every account so no refresh happens."""
+    for account in service.account_manager.get_accounts():
+        service._current_auth[account.id] = AuthDetails(
+            refresh=account.refresh_token,
+            access=f"access-{account.index}",
+            expires=int(time.time() * 1000) + 3600_000,
+            email=account.email,
+        )
+
+
+class TestGenerate:
+    """Test generate() over the streaming path."""
+
+    @pytest.mark.asyncio
+    async def test_generate_accumulates_stream(self, monkeypatch):
+        """Text chunks are joined and timing metrics are recorded."""
+        service = make_service()
+        prime_auth(service)
+        monkeypatch.setattr(service.account_manager, "save_to_disk", _noop_save)
+
+        async def fake_stream(**kwargs):
+            for text in ("Hel", "lo", "!"):
+                yield {"text": text}
+            yield {"done": True}
+
+        monkeypatch.setattr(service.client, "generate_content_stream", fake_stream)
+        seen = []
+        service.metrics_callback = seen.append
+
+        assert await service.generate("Hi") == "Hello!"
+        assert seen[0].ttfb_ms is not None
+        assert seen[0].output_chars == 6
+        await service.aclose()
+
+    @pytest.mark.asyncio
+    async def test_generate_rotates_on_rate_limit(self, monkeypatch):
+        """A long 429 marks the account and the next account is used."""
+        service = make_service(count=2, model="claude-sonnet-4-5")
+        prime_auth(service)
+        monkeypatch.setattr(service.account_manager, "save_to_disk", _noop_save)
+        tokens = []
+
+        async def fake_stream(access_token, **kwargs):
+            tokens.append(access_token)
+            if access_token == "access-0":
+                yield {"error": True, "status_code": 429, "retry_after_ms": 60_000}
+                return
+            yield {"text": "ok"}
+            yield {"done": True}
+
+        monkeypatch.setattr(service.client, "generate_content_stream", fake_stream)
+
+        assert await service.generate("Hi") == "ok"
+        assert tokens == ["access-0", "access-1"]
+        await service.aclose()
+
+
+class TestExecutionEngine:
+    """Test the shared retry/rotation engine behind every entry point."""
+
+    @pytest.mark.asyncio
+    async def test_gemini_rotates_on_rate_limit(self, monkeypatch):
+        """A Gemini 429 on the preferred quota moves to the next account."""
+        service = make_service(count=2, model="gemini-3-pro", quota_fallback=False)
+        prime_auth(service)
+        monkeypatch.setattr(service.account_manager, "save_to_disk", _noop_save)
+        tokens = []
+
+        async def fake_stream(access_token, **kwargs):
+            tokens.append(access_token)
+            if access_token == "access-0":
+                yield {"error": True, "status_code": 429, "retry_after_ms": 60_000}
+                return
+            yield {"text": "ok"}
+            yield {"done": True}
+
+        monkeypatch.setattr(service.client, "generate_content_stream", fake_stream)
+
+        assert await service.generate("Hi") == "ok"
+        assert tokens == ["access-0", "access-1"]
+        await service.aclose()
+
+    @pytest.mark.asyncio
+    async def test_stream_fails_over_before_first_chunk(self, monkeypatch):
+        """generate_stream rotates accounts when the error precedes any text."""
+        service = make_service(count=2, model="claude-sonnet-4-5")
+        prime_auth(service)
+        monkeypatch.setattr(service.account_manager, "save_to_disk", _noop_save)
+
+        async def fake_stream(access_token, **kwargs):
+            if access_token == "access-0":
+                yield {"error": True, "status_code": 500, "message": "boom"}
+                return
+            for text in ("a", "b"):
+                yield {"text": text}
+            yield {"done": True}
+
+        monkeypatch.setattr(service.client, "generate_content_stream", fake_stream)
+
+        chunks = [chunk async for chunk in service.generate_stream("Hi")]
+        assert chunks == ["a", "b"]
+        await service.aclose()
+
+    @pytest.mark.asyncio
+    async def test_stream_error_after_first_chunk_raises(self, monkeypatch):
+        """Errors after output has started are raised, not retried."""
+        service = make_service(count=2, model="claude-sonnet-4-5")
+        prime_auth(service)
+        monkeypatch.setattr(service.account_manager, "save_to_disk", _noop_save)
+        tokens = []
+
+        async def fake_stream(access_token, **kwargs):
+            tokens.append(access_token)
+            yield {"text": "partial"}
+            yield {"error": True, "status_code": 500, "message": "reset"}
+
+        monkeypatch.setattr(service.client, "generate_content_stream", fake_stream)
+
+        chunks = []
+        with pytest.raises(AntigravityError, match="reset"):
+            async for chunk in service.generate_stream("Hi"):
+                chunks.append(chunk)
+        assert chunks == ["partial"]
+        assert tokens == ["access-0"]
+        await service.aclose()
+
+    @pytest.mark.asyncio
+    async def test_generate_image_uses_engine(self, monkeypatch):
+        """Image requests rotate past a failing account too."""
+        service = make_service(count=2, model="claude-sonnet-4-5")
+        prime_auth(service)
+        monkeypatch.setattr(service.account_manager, "save_to_disk", _noop_save)
+        body = {"response": {"candidates": [{"content": {"parts": [
+            {"inlineData": {"mimeType": "image/png", "data": "aW1n"}}
+        ]}}]}}
+
+        async def fake_generate_content(access_token, **kwargs):
+            if access_token == "access-0":
+                return AntigravityResponse(success=False, status_code=503, headers={}, body=None, error="unavailable")
+            return AntigravityResponse(success=True, status_code=200, headers={}, body=body)
+
+        monkeypatch.setattr(service.client, "generate_content", fake_generate_content)
+
+        images = await service.generate_image("A cat", model="gemini-3-pro-image")
+        assert images == [{"mimeType": "image/png", "data": "aW1n"}]
+        await service.aclose()
+
+    @pytest.mark.asyncio
+    async def test_bad_requests_do_not_cool_accounts_down(self, monkeypatch):
+        """Repeated 400s are raised without rotating, and every account stays available."""
+        service = make_service(count=3, model="claude-sonnet-4-5")
+        prime_auth(service)
+        monkeypatch.setattr(service.account_manager, "save_to_disk", _noop_save)
+        tokens = []
+
+        async def fake_stream(access_token, **kwargs):
+            tokens.append(access_token)
+            yield {"error": True, "status_code": 400, "message": "HTTP 400", "body": "invalid argument"}
+
+        monkeypatch.setattr(service.client, "generate_content_stream", fake_stream)
+
+        for _ in range(6):
+            with pytest.raises(InvalidRequestError, match="invalid argument"):
+                await service.generate("Hi")
+        assert len(tokens) == 6
+        assert all(account.consecutive_failures == 0 for account in service.account_manager.get_accounts())
+        await service.check_capacity("claude-sonnet-4-5")
+        assert service.get_readiness()["ready"]
+        await service.aclose()
+
+
+async def _noop_save():
+    """Stand-in for AccountManager.save_to_disk."""
+
+
+class TestDeadline:
+    """Test that a request timeout bounds every stage of the engine."""
+
+    @pytest.mark.asyncio
+    async def test_rate_limit_wait_beyond_deadline_fails_fast(self):
+        """A rate-limit wait longer than the time left raises instead of sleeping."""
+        service = make_service(count=1, model="claude-sonnet-4-5")
+        prime_auth(service)
+        manager = service.account_manager
+        manager.mark_rate_limited(manager.get_accounts()[0], 60_000, "claude", "antigravity")
+
+        start = time.monotonic()
+        with pytest.raises(DeadlineExceededError):
+            await service.generate("Hi", timeout=10)
+        assert time.monotonic() - start < 1
+        await service.aclose()
+
+    @pytest.mark.asyncio
+    async def test_slow_token_refresh_is_bounded(self, monkeypatch):
+        """A hanging refresh gives up at the deadline but keeps running for others."""
+        finished = asyncio.Event()
+
+        async def slow_refresh(auth, http_client=None):
+            await asyncio.sleep(0.3)
+            finished.set()
+            return None
+
+        monkeypatch.setattr(service_module, "refresh_access_token", slow_refresh)
+        monkeypatch.setattr(service_module, "MIN_ATTEMPT_SECONDS", 0)
+        service = make_service(count=1)
+
+        with pytest.raises(DeadlineExceededError, match="token refresh"):
+            await service.generate("Hi", timeout=0.1)
+        await asyncio.wait_for(finished.wait(), 1)
+        await service.aclose()
+
+    def test_attempt_timeouts_capped_at_deadline(self):
+        """Stream connect and total timeouts never outlive the request deadline."""
+        service = make_service()
+        timeouts = service._attempt_timeouts("gemini-3-pro", None, time.monotonic() + 2)
+
+        assert timeouts.total <= 2
+        assert timeouts.connect <= 2
+        assert service._attempt_timeouts("gemini-3-pro", None, None) is None
+
+
+class TestWarmup:
+    """Test startup warm-up of tokens and connections."""
+
+    @pytest.mark.asyncio
+    async def test_warmup_refreshes_accounts_with_bounded_concurrency(self, monkeypatch):
+        """Every account is refreshed, never more than `concurrency` at once."""
+        running = []
+        peak = []
+
+        async def fake_refresh(auth, http_client=None):
+            running.append(auth.refresh)
+            peak.append(len(running))
+            await asyncio.sleep(0.02)
+            running.remove(auth.refresh)
+            return AuthDetails(
+                refresh=auth.refresh,
+                access="access",
+                expires=int(time.time() * 1000) + 3600_000,
+                email=auth.email,
+            )
+
+        async def fake_prewarm(endpoints=None, timeout=None):
+            return {"https://endpoint": True}
+
+        monkeypatch.setattr(service_module, "refresh_access_token", fake_refresh)
+        service = make_service(count=5)
+        monkeypatch.setattr(service.client, "prewarm", fake_prewarm)
+
+        report = await service.warmup(concurrency=2)
+
+        assert service.warmed_up
+        assert report["accounts"] == report["accountsReady"] == 5
+        assert report["endpoints"] == {"https://endpoint": True}
+        assert max(peak) == 2
+        assert len(service._current_auth) == 5
+        await service.aclose()
+
+    @pytest.mark.asyncio
+    async def test_warmup_timeout_without_connect_timeout(self, monkeypatch):
+        """With no connect timeout configured, prewarm is bounded by the warm-up timeout."""
+        timeouts = []
+
+        async def fake_refresh(auth, http_client=None):
+            return None
+
+        async def fake_prewarm(endpoints=None, timeout=None):
+            timeouts.append(timeout)
+            return {}
+
+        monkeypatch.setattr(service_module, "refresh_access_token", fake_refresh)
+        service = make_service(count=1, client=AntigravityClient(stream_timeouts=StreamTimeouts(connect=None)))
+        monkeypatch.setattr(service.client, "prewarm", fake_prewarm)
+
+        await service.warmup(timeout=5)
+
+        assert service.warmed_up
+        assert 0 < timeouts[0] <= 5
+        await service.aclose()
@@ -0,0 +1,179 @@
+"""
+Test Shared State
+
+Offline tests for the memory-mapped rate-limit table shared between processes.
+"""
+
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from filelock import Timeout
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from antigravity_auth.accounts import AccountManager
+from antigravity_auth.shared_state import INFLIGHT_KEY, SharedStateTable, owned_key
+from antigravity_auth.storage import AccountMetadata, AccountStorage
+
+
+def make_manager(state_path: Path, count: int = 2, **kwargs) -> AccountManager:
+    """Build a manager over an in-memory pool that shares the given state file."""
+    storage = AccountStorage(
+        accounts=[AccountMetadata(refresh_token=f"refresh-{i}") for i in range(count)]
+    )
+    return AccountManager(
+        storage=storage,
+        storage_path=str(state_path.parent / "accounts.json"),
+        shared_state_path=str(state_path),
+        **kwargs,
+    )
+
+
+class TestSharedStateTable:
+    """Test the table itself."""
+
+    def test_two_mappings_see_the_same_values(self, tmp_path):
+        """Writes through one mapping are visible through another."""
+        first = SharedStateTable(tmp_path / "state", capacity=64)
+        second = SharedStateTable(tmp_path / "state", capacity=64)
+
+        first.update_max("acc", "claude", 5000)
+        assert second.get("acc", "claude") == 5000
+        assert second.generation == 1
+
+        second.update_max("acc", "claude", 1000)  # Never lowers
+        assert first.get("acc", "claude") == 5000
+        assert first.generation == 1
+
+        first.close()
+        second.close()
+
+    def test_counters_clamp_at_zero(self, tmp_path):
+        """Counters do not bump the generation or go negative."""
+        table = SharedStateTable(tmp_path / "state", capacity=64)
+        assert table.add("acc", INFLIGHT_KEY, 2) == 2
+        assert table.add("acc", INFLIGHT_KEY, -3) == 0
+        assert table.generation == 0
+        assert table.snapshot() == {"acc": {INFLIGHT_KEY: 0}}
+        table.close()
+
+    def test_long_keys_are_hashed(self, tmp_path):
+        """Keys too long for a slot are still shared, under a hashed name."""
+        table = SharedStateTable(tmp_path / "state", capacity=64)
+        long_key = "gemini-antigravity:" + "x" * 80
+        other_key = "gemini-antigravity:" + "x" * 79 + "y"
+
+        table.update_max("acc", long_key, 5000)
+        assert table.get("acc", long_key) == 5000
+        assert table.get("acc", other_key) == 0
+
+        stored_key = SharedStateTable.stored_key("acc", long_key)
+        assert stored_key != long_key
+        assert SharedStateTable.is_hashed_key("acc", stored_key)
+        assert table.snapshot() == {"acc": {stored_key: 5000}}
+        table.close()
+
+    def test_dead_owner_share_is_reaped(self, tmp_path):
+        """In-flight counts of a process that exited without releasing are reclaimed."""
+        table = SharedStateTable(tmp_path / "state", capacity=64)
+        exited = subprocess.Popen([sys.executable, "-c", "pass"])
+        exited.wait()
+
+        table.add_owned("acc", INFLIGHT_KEY, 2, owner=str(exited.pid))
+        table.add_owned("acc", INFLIGHT_KEY, 1)
+        assert table.get("acc", INFLIGHT_KEY) == 3
+
+        assert table.reap_dead_owners(INFLIGHT_KEY) == 1
+        assert table.get("acc", INFLIGHT_KEY) == 1
+        assert table.get("acc", owned_key(INFLIGHT_KEY, str(exited.pid))) == 0
+        assert table.reap_dead_owners(INFLIGHT_KEY) == 0
+
+        # A reaped slot is reused rather than leaking table capacity
+        table.add_owned("acc", INFLIGHT_KEY, 1, owner=str(exited.pid))
+        assert table.get("acc", INFLIGHT_KEY) == 2
+        table.close()
+
+    def test_owner_cannot_release_more_than_it_holds(self, tmp_path):
+        """A release beyond an owner's share leaves other owners' counts intact."""
+        table = SharedStateTable(tmp_path / "state", capacity=64)
+        table.add_owned("acc", INFLIGHT_KEY, 1, owner="1.1")
+        table.add_owned("acc", INFLIGHT_KEY, 1, owner="1.2")
+        assert table.add_owned("acc", INFLIGHT_KEY, -2, owner="1.1") == 1
+        table.close()
+
+    def test_posted_write_swallows_lock_timeout(self, tmp_path, monkeypatch):
+        """A lock timeout on the writer thread is dropped instead of raised."""
+        table = SharedStateTable(tmp_path / "state", capacity=64)
+
+        def timed_out(*args):
+            raise Timeout(str(tmp_path / "state.lock"))
+
+        monkeypatch.setattr(table, "add_owned", timed_out)
+        table.post_add_owned("acc", INFLIGHT_KEY, -1)
+        table.flush()
+        table.close()
+
+
+class TestSharedManagers:
+    """Test managers in different processes sharing one state file."""
+
+    def test_rate_limit_visible_to_other_manager(self, tmp_path):
+        """A 429 recorded by one manager steers the other away from the account."""
+        first = make_manager(tmp_path / "state")
+        second = make_manager(tmp_path / "state")
+        account = first.get_accounts()[0]
+
+        assert second.get_next_for_family("claude") is second.get_accounts()[0]
+        first.mark_rate_limited(account, 60_000, "claude", "antigravity")
+        first._shared.flush()
+
+        other = second.get_accounts()[0]
+        assert second.is_rate_limited(other, "claude")
+        assert second.get_next_for_family("claude") is second.get_accounts()[1]
+
+    def test_cooldown_visible_to_other_manager(self, tmp_path):
+        """Cooldowns are shared too."""
+        first = make_manager(tmp_path / "state")
+        second = make_manager(tmp_path / "state")
+        first.mark_account_cooling_down(first.get_accounts()[1], 60_000, "auth-failure")
+        first._shared.flush()
+
+        other = second.get_accounts()[1]
+        assert second.is_rate_limited(other, "gemini")
+        assert other.cooling_down_until > int(time.time() * 1000)
+
+    def test_long_model_key_visible_to_other_manager(self, tmp_path):
+        """Rate limits on quota keys too long for a slot are still shared."""
+        first = make_manager(tmp_path / "state")
+        second = make_manager(tmp_path / "state")
+        model = "gemini-" + "experimental-" * 6
+        first.mark_rate_limited(first.get_accounts()[0], 60_000, "gemini", "antigravity", model)
+        first.mark_rate_limited(first.get_accounts()[0], 60_000, "gemini", "gemini-cli", model)
+        first._shared.flush()
+
+        other = second.get_accounts()[0]
+        assert second.is_rate_limited(other, "gemini", model)
+        assert not second.is_rate_limited(other, "gemini", "gemini-3-pro")
+
+    async def test_least_loaded_counts_other_processes(self, tmp_path):
+        """Least-loaded selection sees leases held by other managers."""
+        first = make_manager(tmp_path / "state", strategy="least-loaded")
+        second = make_manager(tmp_path / "state", strategy="least-loaded")
+
+        lease = await first.acquire_for_family("claude", None, "antigravity", False)
+        assert first.get_in_flight(lease.account) == 1  # Counted before the shared write lands
+        await first.flush()
+        held = second.get_account_by_id(lease.account.id)
+        assert second.get_in_flight(held) == 1
+
+        other = await second.acquire_for_family("claude", None, "antigravity", False)
+        assert other.account.id != lease.account.id
+
+        first.release(lease)
+        second.release(other)
+        await first.flush()
+        await second.flush()
+        assert second._shared.get(lease.account.id, INFLIGHT_KEY) == 0
@@ -0,0 +1,71 @@
+"""
+Test SSE Decoder
+
+Tests for the incremental Server-Sent Events decoder.
+"""
+
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from antigravity_auth.client import parse_sse_response
+from antigravity_auth.sse import SSEDecoder, decode_sse
+
+
+def decode_in_pieces(payload: bytes, size: int):
+    """Decode a payload fed in fixed-size chunks."""
+    return decode_sse(b"", chunks=[payload[i:i + size] for i in range(0, len(payload), size)])
+
+
+class TestSSEDecoder:
+    """Test SSE field handling and chunking."""
+
+    def test_multiline_data_and_fields(self):
+        """Multiple data lines are joined and event/id/retry are parsed."""
+        events = decode_sse(b"event: update\nid: 7\nretry: 1500\ndata: a\ndata: b\n\n")
+        assert len(events) == 1
+        assert events[0].data == "a\nb"
+        assert events[0].event == "update"
+        assert events[0].id == "7"
+        assert events[0].retry == 1500
+
+    def test_line_endings(self):
+        """CRLF, CR and LF terminators are all accepted."""
+        for sep in (b"\r\n", b"\r", b"\n"):
+            events = decode_sse(b"data: x" + sep + sep + b"data: y" + sep + sep)
+            assert [e.data for e in events] == ["x", "y"]
+
+    def test_comments_and_empty_events_ignored(self):
+        """Comment lines and events without data are not dispatched."""
+        events = decode_sse(b": keep-alive\n\nevent: ping\n\ndata: z\n\n")
+        assert [e.data for e in events] == ["z"]
+        assert events[0].event == "message"
+
+    def test_chunk_boundaries(self):
+        """Results don't depend on how the stream is split."""
+        payload = "﻿data: {\"a\": \"é\"}\r\n\r\nid: 1\r\ndata: two\r\n\r\n".encode("utf-8")
+        expected = [(e.data, e.id) for e in decode_sse(payload)]
+        assert expected == [('{"a": "é"}', None), ("two", "1")]
+        for size in (1, 2, 3, 7, 64):
+            assert [(e.data, e.id) for e in decode_in_pieces(payload, size)] == expected
+
+    def test_flush_dispatches_unterminated_event(self):
+        """A final event without a trailing blank line is still returned."""
+        decoder = SSEDecoder()
+        assert decoder.feed(b"data: last") == []
+        assert [e.data for e in decoder.flush()] == ["last"]
+
+
+class TestParseSSEResponse:
+    """Test JSON extraction from SSE bodies."""
+
+    def test_parse_json_events(self):
+        """JSON payloads are parsed and [DONE] is skipped."""
+        body = 'data: {"n": 1}\r\n\r\ndata: {"n": 2}\r\n\r\ndata: [DONE]\r\n\r\n'
+        assert parse_sse_response(body) == [{"n": 1}, {"n": 2}]
+
+    def test_parse_json_per_line(self):
+        """One JSON object per data line without separators still parses."""
+        assert parse_sse_response(b'data: {"n": 1}\ndata: {"n": 2}\n') == [{"n": 1}, {"n": 2}]
@@ -0,0 +1,56 @@
+"""
+Test Token Cache
+
+Offline tests for the on-disk access token cache.
+"""
+
+import os
+import stat
+import sys
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from antigravity_auth.token_cache import AccessTokenCache, CachedToken
+
+
+def make_token(expires_in_ms: int = 3600_000) -> CachedToken:
+    now = int(time.time() * 1000)
+    return CachedToken(access="access", expires=now + expires_in_ms, issued_at=now)
+
+
+class TestAccessTokenCache:
+    """Test storing and looking up access tokens."""
+
+    def test_round_trip_between_instances(self, tmp_path):
+        """A token written by one process is visible to another."""
+        AccessTokenCache(tmp_path / "tokens").put("acc", "refresh", make_token())
+
+        token = AccessTokenCache(tmp_path / "tokens").get("acc", "refresh")
+        assert token is not None and token.access == "access"
+
+    def test_file_is_owner_only(self, tmp_path):
+        """The cache holds live credentials, so only the owner may read it."""
+        AccessTokenCache(tmp_path / "tokens").put("acc", "refresh", make_token())
+
+        if os.name == "posix":
+            assert stat.S_IMODE(os.stat(tmp_path / "tokens").st_mode) == 0o600
+
+    def test_stale_entries_ignored(self, tmp_path):
+        """Expired tokens and tokens for an old refresh token are not returned."""
+        cache = AccessTokenCache(tmp_path / "tokens")
+        cache.put("expired", "refresh", make_token(expires_in_ms=-1000))
+        cache.put("acc", "old-refresh", make_token())
+
+        assert cache.get("expired", "refresh") is None
+        assert cache.get("acc", "new-refresh") is None
+        assert cache.get("missing", "refresh") is None
+
+    def test_remove(self, tmp_path):
+        """Removed accounts are forgotten."""
+        cache = AccessTokenCache(tmp_path / "tokens")
+        cache.put("acc", "refresh", make_token())
+        cache.remove("acc")
+        assert AccessTokenCache(tmp_path / "tokens").get("acc", "refresh") is None